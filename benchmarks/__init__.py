@@ -0,0 +1,4 @@
+# benchmarks/__init__.py
+#
+# 无界面的性能基准: 确定性合成草图 (scene_generator) + 计时用例 (cases)，
+# 结果以 JSON 输出，便于不同版本之间对比。用法见 __main__.py。
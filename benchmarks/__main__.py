@@ -0,0 +1,74 @@
+# benchmarks/__main__.py
+#
+# 在仓库根目录运行:
+#   python -m benchmarks                              全部用例, 1k/10k/100k 笔画
+#   python -m benchmarks --sizes 1000 --cases selection -o run.json
+#   python -m benchmarks -o new.json --baseline old.json   与上次结果对比
+
+import argparse
+import json
+import sys
+
+from benchmarks.cases import CASES
+from benchmarks.runner import DEFAULT_SIZES, compare, load_results, \
+    run_benchmarks, save_results, select_cases
+from benchmarks.scene_generator import SCENE_KINDS
+
+
+def _log(message):
+    print(message, file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Headless benchmarks on deterministic synthetic sketches.")
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=list(DEFAULT_SIZES),
+                        help="stroke counts per scene")
+    parser.add_argument("--scenes", nargs="+", choices=SCENE_KINDS,
+                        default=list(SCENE_KINDS))
+    parser.add_argument("--cases", nargs="+", default=None,
+                        help="run only cases whose name contains one of these")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output",
+                        help="write JSON results here (default: stdout)")
+    parser.add_argument("--baseline",
+                        help="earlier JSON results to compare against")
+    parser.add_argument("--list", action="store_true",
+                        help="list case names and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name in CASES:
+            print(name)
+        return 0
+
+    case_names = select_cases(args.cases)
+    if not case_names:
+        parser.error("no case matches %s" % args.cases)
+
+    results = run_benchmarks(sizes=args.sizes, kinds=args.scenes,
+                             case_names=case_names, repeat=args.repeat,
+                             warmup=args.warmup, seed=args.seed, log=_log)
+    if args.output:
+        save_results(results, args.output)
+        _log("results written to %s" % args.output)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+
+    if args.baseline:
+        _log("%-42s %-9s %7s %11s %11s %7s" % (
+            "case", "scene", "strokes", "base ms", "now ms", "ratio"))
+        for case, scene, strokes, old_ms, new_ms, ratio in compare(
+                load_results(args.baseline), results):
+            _log("%-42s %-9s %7d %11.3f %11.3f %6.2fx" % (
+                case, scene, strokes, old_ms, new_ms, ratio))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
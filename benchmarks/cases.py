@@ -0,0 +1,200 @@
+# benchmarks/cases.py
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from data.file_manager import StrokeFileManager
+from data.stroke_manager_2d import StrokeManager2D
+from data.stroke_manager_3d import StrokeManager3D
+from logic.Modifier.axis_2dto3d_modifier import Axis2Dto3DModifier
+from logic.Modifier.free_hand_line import FreeHandModifier
+from logic.selection_manager import SelectionManager
+from logic.stroke_2d_to_3d import convert_2d_stroke_to_3d
+from logic.stroke_commit_worker import StrokeCommitContext
+from logic.stroke_intersection import StrokeEndpoints
+from rendering.renderer_3d import Renderer3D
+
+# 逐笔画操作 (modifier / 单笔画转换) 每次计时处理的笔画数
+PER_STROKE_SAMPLE = 64
+# 复用索引时每次计时做的圈选查询次数
+SELECTION_QUERIES = 16
+SELECTION_RADIUS = 50.0
+
+
+class BenchmarkCase:
+    """
+    一个已准备好的计时用例:
+      - run(): 被计时的部分
+      - reset(): 每次计时前调用 (不计时)，用于恢复被 run 修改的输入
+      - items: run 一次处理的对象数 (用于折算单个耗时)
+      - cleanup(): 全部计时结束后调用
+    setup 函数在场景中没有适用的笔画时返回 None (该组合跳过)。
+    """
+
+    def __init__(self, run, items=1, reset=None, cleanup=None):
+        self.run = run
+        self.items = items
+        self.reset = reset
+        self.cleanup = cleanup
+
+
+def _commit_context(scene):
+    """
+    与后台提交线程相同的只读上下文: 相机快照 + 场景中所有 3D 笔画的端点。
+    """
+    return StrokeCommitContext(
+        scene.camera, StrokeEndpoints.from_strokes(scene.strokes_3d))
+
+
+def _selection(scene, index_key, queries):
+    strokes = scene.strokes_3d
+    screen = scene.camera.project_points(
+        np.concatenate([s.coords_3d for s in strokes])).astype(np.float32)
+    bounds = np.cumsum([len(s.coords_3d) for s in strokes])[:-1]
+    for stroke, coords in zip(strokes, np.split(screen, bounds)):
+        stroke.screen_coords = coords
+
+    rng = np.random.default_rng(scene.seed)
+    w, h = scene.camera.viewport_size
+    centers = rng.uniform((0, 0), (w, h), size=(queries, 2))
+    centers = [tuple(c) for c in centers.tolist()]
+    selection_manager = SelectionManager()
+
+    def run():
+        for center in centers:
+            selection_manager.find_strokes_in_circle(
+                strokes, center, SELECTION_RADIUS, index_key=index_key)
+    return BenchmarkCase(run, items=len(centers))
+
+
+def selection_cold(scene):
+    """
+    重建屏幕网格索引并查询一次 (相机刚变化后的第一次圈选)。
+    """
+    return _selection(scene, None, 1)
+
+
+def selection_warm(scene):
+    """
+    相机不变，复用已建好的网格索引 (拖动圈选时的常态)。
+    """
+    return _selection(scene, "bench", SELECTION_QUERIES)
+
+
+def _per_stroke(scene, kind, prepare, call):
+    """
+    对场景中至多 PER_STROKE_SAMPLE 条 kind 类笔画调用 call(stroke2d)。
+    prepare(strokes_2d) 在每次计时前对新拷贝的输入做预处理 (不计时)。
+    """
+    indices = scene.sample(PER_STROKE_SAMPLE, kind)
+    if not indices:
+        return None
+    inputs = []
+
+    def reset():
+        inputs[:] = scene.copy_strokes_2d(indices)
+        prepare(inputs)
+
+    def run():
+        for stroke2d in inputs:
+            call(stroke2d)
+    return BenchmarkCase(run, items=len(indices), reset=reset)
+
+
+def axis_apply_2d(scene):
+    modifier = Axis2Dto3DModifier()
+    context = _commit_context(scene)
+    return _per_stroke(scene, "axis", lambda strokes: None,
+                       lambda s: modifier.apply_2d(s, context))
+
+
+def axis_apply_2dto3d(scene):
+    """
+    输入为 apply_2d 的输出 (两个端点 + meta['axis'])；
+    与场景中全部已有笔画求交，耗时随笔画总数增长。
+    """
+    modifier = Axis2Dto3DModifier()
+    context = _commit_context(scene)
+
+    def prepare(strokes):
+        for stroke2d in strokes:
+            modifier.apply_2d(stroke2d, context)
+    return _per_stroke(scene, "axis", prepare,
+                       lambda s: modifier.apply_2dto3d(s, context))
+
+
+def freehand_apply_2dto3d(scene):
+    modifier = FreeHandModifier()
+    context = _commit_context(scene)
+
+    def prepare(strokes):
+        for stroke2d in strokes:
+            modifier.apply_2d(stroke2d, context)
+    return _per_stroke(scene, None, prepare,
+                       lambda s: modifier.apply_2dto3d(s, context))
+
+
+def convert_stroke_to_3d(scene):
+    camera = scene.camera
+    return _per_stroke(scene, None, lambda strokes: None,
+                       lambda s: convert_2d_stroke_to_3d(s, camera))
+
+
+def project_to_screen_batch(scene):
+    renderer = Renderer3D()
+    strokes = scene.strokes_3d
+    mvp = scene.camera.mvp
+    viewport_size = scene.camera.viewport_size
+
+    def run():
+        renderer.project_to_screen_batch(strokes, mvp, viewport_size)
+    return BenchmarkCase(run, items=len(strokes))
+
+
+def _file_case(scene, make_run):
+    tmp_dir = tempfile.mkdtemp(prefix="sketch_bench_")
+    path = os.path.join(tmp_dir, "scene.skb")
+    manager_2d, manager_3d = scene.build_managers()
+    file_manager = StrokeFileManager(manager_2d, manager_3d)
+    file_manager.save_strokes(path)
+    return BenchmarkCase(make_run(file_manager, path), items=len(scene),
+                         cleanup=lambda: shutil.rmtree(tmp_dir, True))
+
+
+def file_save(scene):
+    def make_run(file_manager, path):
+        return lambda: file_manager.save_strokes(path)
+    return _file_case(scene, make_run)
+
+
+def _file_load(scene, mmap):
+    def make_run(file_manager, path):
+        target = StrokeFileManager(StrokeManager2D(), StrokeManager3D())
+        return lambda: target.load_strokes(path, mmap=mmap)
+    return _file_case(scene, make_run)
+
+
+def file_load_mmap(scene):
+    return _file_load(scene, True)
+
+
+def file_load_copy(scene):
+    return _file_load(scene, False)
+
+
+# 用例名 -> setup(scene) -> BenchmarkCase，按此顺序执行
+CASES = {
+    "selection.find_strokes_in_circle.cold": selection_cold,
+    "selection.find_strokes_in_circle.warm": selection_warm,
+    "axis_2d_to_3d.apply_2d": axis_apply_2d,
+    "axis_2d_to_3d.apply_2dto3d": axis_apply_2dto3d,
+    "free_hand_line.apply_2dto3d": freehand_apply_2dto3d,
+    "renderer.project_to_screen_batch": project_to_screen_batch,
+    "stroke_2d_to_3d.convert_2d_stroke_to_3d": convert_stroke_to_3d,
+    "file_manager.save": file_save,
+    "file_manager.load.mmap": file_load_mmap,
+    "file_manager.load.copy": file_load_copy,
+}
@@ -0,0 +1,409 @@
+# benchmarks/replay_input.py
+#
+# 离线回放画布输入记录 (.skinput，见 data/input_trace.py):
+#   python -m benchmarks.replay_input session.skinput -o report.json
+#   python -m benchmarks.replay_input session.skinput --realtime --save-scene out.skb
+#   python -m benchmarks.replay_input session.skinput --baseline old_report.json
+#
+# 使用 Qt offscreen 平台和 ReplayCanvas 替身，把事件依次交给 DrawingTool / SelectionTool
+# (笔画经 StrokeProcessor 与后台提交线程处理)，输出每类事件的耗时分布与最终场景摘要。
+# 同一份记录可以分别在新旧版本上回放，对比报告。
+
+import os
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import argparse
+import collections
+import contextlib
+import hashlib
+import json
+import sys
+import time
+
+import numpy as np
+from PyQt5.QtCore import QEvent, QPoint, QPointF, Qt
+from PyQt5.QtGui import QGuiApplication, QMouseEvent, QWheelEvent
+
+from benchmarks.runner import environment
+from benchmarks.scene_generator import default_camera
+from data.file_manager import StrokeFileManager
+from data.input_trace import EVENT_NAMES, EVENT_PRESS, EVENT_MOVE, \
+    EVENT_RELEASE, EVENT_WHEEL, EVENT_FLAG_OVERLAY, read_input_trace
+from data.stroke_history import StrokeHistory
+from data.stroke_manager_2d import StrokeManager2D
+from data.stroke_manager_3d import StrokeManager3D
+from logic.feature_toggle_manager import FeatureToggleManager
+from logic.selection_manager import SelectionManager
+from logic.stroke_intersection import StrokeEndpointTracker
+from logic.stroke_processor import create_default_stroke_processor
+from rendering.projection_cache import ScreenProjectionCache
+from tools.drawing_tool import DrawingTool
+from tools.selection_tool import SelectionTool
+from ui.repaint_scheduler import REPAINT_ALL, REPAINT_3D, REPAINT_CAMERA
+
+REPORT_FORMAT = 1
+
+_MOUSE_EVENT_TYPES = {EVENT_PRESS: QEvent.MouseButtonPress,
+                      EVENT_MOVE: QEvent.MouseMove,
+                      EVENT_RELEASE: QEvent.MouseButtonRelease}
+
+
+class ReplayCanvas:
+    """
+    CanvasWidget 的无界面替身，只提供工具与笔画提交用到的接口。
+    相机状态由回放逐事件设置；request_repaint() / update() 只累计脏标记，
+    由回放驱动调用 paint() 模拟一帧中的屏幕投影 (真实画布在 paintGL 中做)。
+    """
+
+    def __init__(self, viewport_size=(1280, 800)):
+        self.command_log = StrokeHistory()
+        self.stroke_manager_2d = StrokeManager2D(history=self.command_log)
+        self.stroke_manager_3d = StrokeManager3D(history=self.command_log)
+        self.selection_manager = SelectionManager()
+
+        self.viewable2d_stroke = []
+        self.pending_strokes_2d = []
+        self.temp_stroke_2d = None
+
+        self.camera_rot = [45, 15]
+        self.camera_distance = 10.0
+        self.look_at = [0, 0, 0]
+        self.viewport_size = tuple(viewport_size)
+
+        self.projection_cache = ScreenProjectionCache()
+        self._stroke_endpoints = StrokeEndpointTracker()
+        self._camera = None
+        self._camera_key = None
+        self.update_requested = False
+        self.update_requests = 0
+        self.dirty = 0
+
+    def width(self):
+        return self.viewport_size[0]
+
+    def height(self):
+        return self.viewport_size[1]
+
+    def request_repaint(self, flags):
+        self.dirty |= flags
+        self.update_requested = True
+        self.update_requests += 1
+
+    def update(self):
+        self.request_repaint(REPAINT_ALL)
+
+    def set_camera_state(self, event):
+        """
+        按记录恢复事件到达时的相机与视口。
+        (相机被未回放的工具改变时，与画布上一样需要重画 3D 层)
+        """
+        camera_rot = [float(v) for v in event["camera_rot"]]
+        camera_distance = float(event["camera_distance"])
+        look_at = [float(v) for v in event["look_at"]]
+        viewport_size = (int(event["width"]), int(event["height"]))
+        if (camera_rot, camera_distance, look_at, viewport_size) != (
+                self.camera_rot, self.camera_distance, self.look_at,
+                self.viewport_size):
+            self.request_repaint(REPAINT_CAMERA)
+        self.camera_rot = camera_rot
+        self.camera_distance = camera_distance
+        self.look_at = look_at
+        self.viewport_size = viewport_size
+
+    def get_camera(self):
+        key = (tuple(self.camera_rot), self.camera_distance,
+               tuple(self.look_at), self.viewport_size)
+        if key != self._camera_key:
+            self._camera = default_camera(self.viewport_size,
+                                          self.camera_rot,
+                                          self.camera_distance, self.look_at)
+            self._camera_key = key
+        return self._camera
+
+    def get_stroke_endpoints(self):
+        return self._stroke_endpoints.get(self.stroke_manager_3d)
+
+    def get_all_strokes_for_selection(self):
+        return self.stroke_manager_3d.get_all_strokes()
+
+    def get_selection_index_key(self):
+        return self.projection_cache.camera_revision
+
+    def paint(self):
+        """
+        一帧中与交互相关的 CPU 工作: 维护笔画的屏幕坐标 (与 Renderer3D.render 相同的调用)。
+        与画布一样，只有 2D 层变化的帧不重画 3D 层。
+        """
+        dirty, self.dirty = self.dirty, 0
+        self.update_requested = False
+        if not dirty & REPAINT_3D:
+            return
+        manager = self.stroke_manager_3d
+        strokes_3d = list(manager.get_all_strokes())
+        if strokes_3d:
+            self.projection_cache.update(
+                strokes_3d, manager.version, self.get_camera(),
+                arena=manager.arena, changes=manager.changes)
+
+
+def _qt_event(event):
+    pos = QPointF(float(event["x"]), float(event["y"]))
+    buttons = Qt.MouseButtons(int(event["buttons"]))
+    modifiers = Qt.KeyboardModifiers(int(event["modifiers"]))
+    if event["kind"] == EVENT_WHEEL:
+        return QWheelEvent(pos, pos, QPoint(0, 0),
+                           QPoint(0, int(event["delta"])), buttons,
+                           modifiers, Qt.NoScrollPhase, False)
+    return QMouseEvent(_MOUSE_EVENT_TYPES[int(event["kind"])], pos,
+                       Qt.MouseButton(int(event["button"])), buttons,
+                       modifiers)
+
+
+def _dispatch(tool, kind, qt_event, canvas):
+    if kind == EVENT_PRESS:
+        tool.mouse_press(qt_event, canvas)
+    elif kind == EVENT_MOVE:
+        tool.mouse_move(qt_event, canvas)
+    elif kind == EVENT_RELEASE:
+        tool.mouse_release(qt_event, canvas)
+    else:
+        tool.wheelEvent(qt_event, canvas)
+
+
+class _CommitTracker:
+    """
+    记录每条提交的端到端耗时 (松开鼠标 -> 结果在 GUI 线程落地)。
+    任务按提交顺序落地，pending_count() 减少几个就是最早的几个已落地。
+    """
+
+    def __init__(self, commit_worker):
+        self.commit_worker = commit_worker
+        self.outstanding = collections.deque()
+        self.latencies = []
+
+    def submitted(self, start_ns):
+        while len(self.outstanding) < self.commit_worker.pending_count():
+            self.outstanding.append(start_ns)
+
+    def poll(self):
+        now = time.perf_counter_ns()
+        while len(self.outstanding) > self.commit_worker.pending_count():
+            self.latencies.append(now - self.outstanding.popleft())
+
+    def wait(self, app, timeout_s=30.0):
+        deadline = time.perf_counter() + timeout_s
+        while self.commit_worker.pending_count() > 0:
+            app.processEvents()
+            self.poll()
+            if time.perf_counter() > deadline:
+                raise RuntimeError("stroke commits did not land within %ss"
+                                   % timeout_s)
+            time.sleep(0.0005)
+        self.poll()
+
+
+def latency_summary(samples_ns):
+    ms = np.asarray(samples_ns, dtype=np.float64) / 1e6
+    p50, p95, p99 = np.percentile(ms, (50, 95, 99)).tolist()
+    return {"count": int(len(ms)), "mean_ms": float(ms.mean()),
+            "p50_ms": p50, "p95_ms": p95, "p99_ms": p99,
+            "max_ms": float(ms.max())}
+
+
+def scene_summary(canvas):
+    """
+    回放结束后的场景: 数量统计与内容摘要 (按 stroke_id 排序后的坐标做 SHA-1)。
+    新旧版本摘要相同即生成了完全相同的笔画。
+    """
+    digest = hashlib.sha1()
+    strokes_2d = sorted(canvas.stroke_manager_2d.get_all_strokes(),
+                        key=lambda s: s.stroke_id)
+    strokes_3d = sorted(canvas.stroke_manager_3d.get_all_strokes(),
+                        key=lambda s: s.stroke_id)
+    for stroke in strokes_2d:
+        digest.update(b"2%d:" % stroke.stroke_id)
+        digest.update(np.ascontiguousarray(stroke.points_2d).tobytes())
+    for stroke in strokes_3d:
+        digest.update(b"3%d:" % stroke.stroke_id)
+        digest.update(np.ascontiguousarray(
+            stroke.coords_3d, dtype=np.float32).tobytes())
+    return {
+        "strokes_2d": len(strokes_2d),
+        "strokes_3d": len(strokes_3d),
+        "points_2d": int(sum(len(s.points_2d) for s in strokes_2d)),
+        "points_3d": int(sum(len(s.coords_3d) for s in strokes_3d)),
+        "selected": len(canvas.selection_manager.selected_strokes),
+        "digest": digest.hexdigest(),
+    }
+
+
+def replay(trace, realtime=False, selection_radius=50, app=None):
+    """
+    回放一份 InputTrace。
+    :param realtime: True 时按记录的时间间隔派发事件 (提交与后续输入交叠，接近真实会话)；
+                     False 时尽快派发，每次松开鼠标后等提交落地 (结果稳定，便于对比)
+    :return: (报告 dict, ReplayCanvas)
+    """
+    if app is None:
+        app = QGuiApplication.instance() or QGuiApplication(sys.argv[:1])
+
+    feature_toggle_manager = FeatureToggleManager()
+    for name, enabled in trace.meta.get("features", {}).items():
+        feature_toggle_manager.set_feature(name, enabled)
+    stroke_processor = create_default_stroke_processor(feature_toggle_manager)
+
+    canvas = ReplayCanvas()
+    draw_tool = DrawingTool(canvas.stroke_manager_2d,
+                            canvas.stroke_manager_3d, stroke_processor,
+                            feature_toggle_manager)
+    tools = {"DrawingTool": draw_tool,
+             "SelectionTool": SelectionTool(canvas.selection_manager,
+                                            radius=selection_radius)}
+    commits = _CommitTracker(draw_tool.commit_worker)
+
+    latencies = collections.defaultdict(list)
+    frames = []
+    skipped = collections.Counter()
+    start_ns = time.perf_counter_ns()
+    try:
+        for event in trace.events:
+            kind = int(event["kind"])
+            if kind & EVENT_FLAG_OVERLAY:
+                # 记录时被 overlay 处理 (拖拽消失点等)，没有交给工具
+                skipped["overlay"] += 1
+                continue
+            tool_name = trace.tool_name(event["tool"])
+            tool = tools.get(tool_name)
+            if tool is None:
+                skipped[str(tool_name)] += 1
+                continue
+            canvas.set_camera_state(event)
+            qt_event = _qt_event(event)
+            if realtime:
+                delay = (start_ns + int(event["t_ns"])
+                         - time.perf_counter_ns())
+                if delay > 0:
+                    time.sleep(delay / 1e9)
+
+            t0 = time.perf_counter_ns()
+            _dispatch(tool, kind, qt_event, canvas)
+            t1 = time.perf_counter_ns()
+            latencies[(tool_name, EVENT_NAMES[kind])].append(t1 - t0)
+
+            if tool is draw_tool and kind == EVENT_RELEASE:
+                commits.submitted(t0)
+                if not realtime:
+                    commits.wait(app)
+            if canvas.update_requested:
+                canvas.paint()
+                frames.append(time.perf_counter_ns() - t1)
+            app.processEvents()
+            commits.poll()
+        commits.wait(app)
+        if canvas.update_requested:
+            canvas.paint()
+    finally:
+        draw_tool.shutdown()
+
+    rows = [dict(tool=tool_name, event=kind, **latency_summary(samples))
+            for (tool_name, kind), samples in latencies.items()]
+    if commits.latencies:
+        rows.append(dict(tool="DrawingTool", event="commit",
+                         **latency_summary(commits.latencies)))
+    if frames:
+        rows.append(dict(tool="canvas", event="frame",
+                         **latency_summary(frames)))
+
+    events = trace.events
+    report = {
+        "format": REPORT_FORMAT,
+        "environment": environment(),
+        "trace": {
+            "events": len(events),
+            "duration_s": (float(events["t_ns"][-1]) / 1e9
+                           if len(events) else 0.0),
+            "meta": trace.meta,
+        },
+        "mode": "realtime" if realtime else "asap",
+        "wall_s": (time.perf_counter_ns() - start_ns) / 1e9,
+        "skipped_events": dict(skipped),
+        "latency": rows,
+        "scene": scene_summary(canvas),
+    }
+    return report, canvas
+
+
+def _log(message):
+    print(message, file=sys.stderr)
+
+
+def _print_report(report, baseline=None):
+    base = {}
+    if baseline is not None:
+        base = {(r["tool"], r["event"]): r for r in baseline["latency"]}
+    _log("%-14s %-8s %6s %9s %9s %9s %9s %8s" % (
+        "tool", "event", "count", "p50 ms", "p95 ms", "p99 ms", "max ms",
+        "p95 vs"))
+    for r in report["latency"]:
+        old = base.get((r["tool"], r["event"]))
+        ratio = ("%7.2fx" % (r["p95_ms"] / old["p95_ms"])
+                 if old and old["p95_ms"] > 0 else "")
+        _log("%-14s %-8s %6d %9.3f %9.3f %9.3f %9.3f %8s" % (
+            r["tool"], r["event"], r["count"], r["p50_ms"], r["p95_ms"],
+            r["p99_ms"], r["max_ms"], ratio))
+    scene = report["scene"]
+    _log("scene: %d 2D / %d 3D strokes, digest %s" % (
+        scene["strokes_2d"], scene["strokes_3d"], scene["digest"]))
+    if baseline is not None:
+        same = baseline["scene"]["digest"] == scene["digest"]
+        _log("scene matches baseline" if same else
+             "scene DIFFERS from baseline (%s)"
+             % baseline["scene"]["digest"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.replay_input",
+        description="Replay a recorded canvas input session headlessly.")
+    parser.add_argument("trace", help=".skinput file recorded by the app")
+    parser.add_argument("--realtime", action="store_true",
+                        help="keep the recorded timing between events")
+    parser.add_argument("--selection-radius", type=float, default=50)
+    parser.add_argument("-o", "--output",
+                        help="write the JSON report here (default: stdout)")
+    parser.add_argument("--save-scene",
+                        help="save the resulting sketch (.skb / .json)")
+    parser.add_argument("--baseline",
+                        help="earlier JSON report to compare against")
+    args = parser.parse_args(argv)
+
+    app = QGuiApplication.instance() or QGuiApplication(sys.argv[:1])
+    trace = read_input_trace(args.trace)
+    # 被回放代码 (包括后台提交线程) 的 print 输出转到 stderr，stdout 只留给报告
+    with contextlib.redirect_stdout(sys.stderr):
+        report, canvas = replay(trace, realtime=args.realtime,
+                                selection_radius=args.selection_radius,
+                                app=app)
+        if args.save_scene:
+            StrokeFileManager(canvas.stroke_manager_2d,
+                              canvas.stroke_manager_3d).save_strokes(
+                args.save_scene)
+    report["trace"]["path"] = os.path.abspath(args.trace)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    _print_report(report, baseline)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+# benchmarks/runner.py
+
+import contextlib
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+
+import numpy as np
+
+from benchmarks.cases import CASES
+from benchmarks.scene_generator import SCENE_KINDS, generate_scene
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+RESULT_FORMAT = 1
+
+
+def measure(case, repeat=5, warmup=1):
+    """
+    对一个 BenchmarkCase 计时: 先运行 warmup 次 (不记录)，再记录 repeat 次。
+    每次运行前调用 case.reset() (不计时)。
+    :return: 每次运行的耗时列表 (秒)
+    """
+    samples = []
+    for i in range(warmup + repeat):
+        if case.reset is not None:
+            case.reset()
+        start = time.perf_counter()
+        case.run()
+        elapsed = time.perf_counter() - start
+        if i >= warmup:
+            samples.append(elapsed)
+    return samples
+
+
+def summarize(samples, items):
+    ms = [s * 1000.0 for s in samples]
+    median = statistics.median(ms)
+    return {
+        "repeat": len(ms),
+        "items": items,
+        "min_ms": min(ms),
+        "median_ms": median,
+        "mean_ms": statistics.fmean(ms),
+        "max_ms": max(ms),
+        "stdev_ms": statistics.stdev(ms) if len(ms) > 1 else 0.0,
+        "per_item_us": median * 1000.0 / max(items, 1),
+    }
+
+
+def _git_commit():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        out = subprocess.run(["git", "rev-parse", "HEAD"], cwd=root,
+                             capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def environment():
+    return {
+        "created": datetime.datetime.now(
+            datetime.timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def select_cases(patterns=None):
+    """
+    :param patterns: 子串列表，用例名包含其中任一即选中；为空时选全部
+    """
+    if not patterns:
+        return list(CASES)
+    return [name for name in CASES
+            if any(p in name for p in patterns)]
+
+
+def _run_scene(kind, n_strokes, case_names, repeat, warmup, seed, sink,
+               log):
+    start = time.perf_counter()
+    scene = generate_scene(kind, n_strokes, seed=seed)
+    if log:
+        log("scene %s: %.2fs" % (scene.name, time.perf_counter() - start))
+    results = []
+    for name in case_names:
+        with contextlib.redirect_stdout(sink):
+            case = CASES[name](scene)
+            if case is None:
+                continue
+            try:
+                samples = measure(case, repeat=repeat, warmup=warmup)
+            finally:
+                if case.cleanup is not None:
+                    case.cleanup()
+        entry = {"case": name, "scene": kind, "strokes": n_strokes}
+        entry.update(summarize(samples, case.items))
+        results.append(entry)
+        if log:
+            log("  %-42s median %9.3f ms  (%8.2f us/item)" % (
+                name, entry["median_ms"], entry["per_item_us"]))
+    return results
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, kinds=SCENE_KINDS, case_names=None,
+                   repeat=5, warmup=1, seed=0, log=None):
+    """
+    对每个 (场景类型, 笔画数) 生成一次场景，依次运行选中的用例。
+    被测代码的 print 输出丢弃 (既不混进结果，也不把终端输出计入耗时)。
+    :param log: 进度回调 log(str)，可为 None
+    :return: 结果 dict (可直接写成 JSON)
+    """
+    if case_names is None:
+        case_names = list(CASES)
+    results = []
+    devnull = open(os.devnull, "w")
+    try:
+        for kind in kinds:
+            for n_strokes in sizes:
+                results.extend(_run_scene(kind, n_strokes, case_names,
+                                          repeat, warmup, seed, devnull,
+                                          log))
+    finally:
+        devnull.close()
+    return {
+        "format": RESULT_FORMAT,
+        "environment": environment(),
+        "config": {"sizes": list(sizes), "scenes": list(kinds),
+                   "repeat": repeat, "warmup": warmup, "seed": seed},
+        "results": results,
+    }
+
+
+def compare(baseline, current):
+    """
+    按 (case, scene, strokes) 对齐两次结果。
+    :return: [(case, scene, strokes, 基线 median_ms, 本次 median_ms, 本次/基线)]
+    """
+    base = {(r["case"], r["scene"], r["strokes"]): r
+            for r in baseline.get("results", [])}
+    rows = []
+    for r in current.get("results", []):
+        old = base.get((r["case"], r["scene"], r["strokes"]))
+        if old is None:
+            continue
+        ratio = (r["median_ms"] / old["median_ms"]
+                 if old["median_ms"] > 0 else float("inf"))
+        rows.append((r["case"], r["scene"], r["strokes"],
+                     old["median_ms"], r["median_ms"], ratio))
+    return rows
+
+
+def load_results(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_results(results, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
@@ -0,0 +1,182 @@
+# benchmarks/scene_generator.py
+
+import numpy as np
+
+from data.stroke_2d import Stroke2D
+from data.stroke_3d import Stroke3D
+from data.stroke_manager_2d import StrokeManager2D
+from data.stroke_manager_3d import StrokeManager3D
+from rendering.camera_snapshot import CameraSnapshot
+from rendering.renderer_3d import look_at, perspective, polar_to_cartesian
+
+SCENE_KINDS = ("axis", "freehand", "mixed")
+
+# mixed 场景中轴对齐直线所占比例
+MIXED_AXIS_RATIO = 0.7
+# 笔画分布在以原点为中心、边长为 2*EXTENT 的立方体内 (y >= 0)
+EXTENT = 5.0
+# 轴对齐直线在屏幕上绘制时采样的点数 (模拟真实输入，apply_2d 会收为两个端点)
+AXIS_DRAWN_POINTS = 16
+# 手绘笔画点数范围
+FREEHAND_POINTS = (8, 48)
+# 屏幕输入抖动 (像素)
+JITTER_PX = 0.75
+
+
+def default_camera(viewport_size=(1280, 800), camera_rot=(45.0, 15.0),
+                   camera_dist=10.0, lookat=(0.0, 0.0, 0.0)):
+    """
+    与 CanvasWidget 初始视角一致的相机快照 (Renderer3D.render 中的同一套计算)。
+    """
+    w, h = viewport_size
+    center = np.array(lookat, dtype=np.float32)
+    eye = polar_to_cartesian(camera_dist, camera_rot[0],
+                             camera_rot[1]) + center
+    view = look_at(eye, center, np.array([0.0, 1.0, 0.0], dtype=np.float32))
+    proj = perspective(45.0, w / h if h != 0 else 1.0, 0.1, 100.0)
+    return CameraSnapshot(view, proj, (w, h), eye=eye)
+
+
+class SyntheticScene:
+    """
+    一个确定性的合成草图 (同样的 kind / n_strokes / seed 总是生成同样的数据):
+      - strokes_3d: Stroke3D 列表 (不属于任何管理器)
+      - strokes_2d: 对应的屏幕输入 Stroke2D (3D 笔画投影后加抖动，stroke_id 相同)
+      - axes: 每条笔画的轴 ('x' / 'y' / 'z')，手绘笔画为 None
+      - camera: 生成与投影所用的 CameraSnapshot
+    各基准用例不应修改这些对象，需要修改时先 copy_strokes_2d() 等取拷贝。
+    """
+
+    def __init__(self, kind, n_strokes, seed, camera, strokes_2d,
+                 strokes_3d, axes):
+        self.kind = kind
+        self.n_strokes = n_strokes
+        self.seed = seed
+        self.camera = camera
+        self.strokes_2d = strokes_2d
+        self.strokes_3d = strokes_3d
+        self.axes = axes
+
+    def __len__(self):
+        return len(self.strokes_3d)
+
+    @property
+    def name(self):
+        return "%s-%d" % (self.kind, self.n_strokes)
+
+    def sample(self, indices_count, kind=None):
+        """
+        确定性地取至多 indices_count 条笔画的下标 (kind 为 'axis' / 'freehand' 时只取该类)。
+        """
+        if kind == "axis":
+            candidates = [i for i, a in enumerate(self.axes) if a is not None]
+        elif kind == "freehand":
+            candidates = [i for i, a in enumerate(self.axes) if a is None]
+        else:
+            candidates = list(range(len(self.axes)))
+        step = max(len(candidates) // max(indices_count, 1), 1)
+        return candidates[::step][:indices_count]
+
+    def copy_strokes_2d(self, indices):
+        return [Stroke2D(self.strokes_2d[i].stroke_id,
+                         self.strokes_2d[i].points_2d.copy())
+                for i in indices]
+
+    def copy_strokes_3d(self):
+        return [Stroke3D(s.coords_3d.copy(), color=s.color,
+                         stroke_id=s.stroke_id) for s in self.strokes_3d]
+
+    def build_managers(self):
+        """
+        :return: 新建的 (StrokeManager2D, StrokeManager3D)，装入本场景笔画的拷贝
+        """
+        manager_2d = StrokeManager2D()
+        manager_3d = StrokeManager3D()
+        manager_2d.add_strokes(self.copy_strokes_2d(range(len(self))))
+        manager_3d.add_strokes(self.copy_strokes_3d())
+        return manager_2d, manager_3d
+
+
+def _axis_coords(rng, n):
+    """
+    n 条轴对齐线段: (n,2,3) 坐标与轴名。
+    """
+    axis_index = rng.integers(0, 3, size=n)
+    start = rng.uniform(-EXTENT, EXTENT, size=(n, 3))
+    start[:, 1] = rng.uniform(0.0, EXTENT, size=n)
+    length = rng.uniform(0.3, 3.0, size=n) * rng.choice([-1.0, 1.0], size=n)
+    end = start.copy()
+    end[np.arange(n), axis_index] += length
+    coords = np.stack([start, end], axis=1).astype(np.float32)
+    return coords, ["xyz"[i] for i in axis_index.tolist()]
+
+
+def _freehand_coords(rng, n):
+    """
+    n 条随机游走折线: 所有点拼成一个 (total,3) 数组及每条的长度。
+    """
+    lengths = rng.integers(FREEHAND_POINTS[0], FREEHAND_POINTS[1] + 1,
+                           size=n)
+    total = int(lengths.sum())
+    steps = rng.normal(0.0, 0.08, size=(total, 3))
+    first = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    origins = rng.uniform(-EXTENT, EXTENT, size=(n, 3))
+    origins[:, 1] = rng.uniform(0.0, EXTENT, size=n)
+    # 每条笔画的第一步换成起点，分段累加即得各自的游走轨迹
+    steps[first] = origins
+    walk = np.cumsum(steps, axis=0)
+    walk -= np.repeat(walk[first] - origins, lengths, axis=0)
+    return walk.astype(np.float32), lengths
+
+
+def generate_scene(kind, n_strokes, seed=0, viewport_size=(1280, 800)):
+    """
+    生成合成草图。
+    :param kind: "axis" 轴对齐直线 / "freehand" 手绘折线 / "mixed" 两者混合
+    :param n_strokes: 笔画数量
+    :param seed: 随机种子，相同参数生成完全相同的场景
+    """
+    if kind not in SCENE_KINDS:
+        raise ValueError("unknown scene kind: %r" % (kind,))
+    rng = np.random.default_rng([seed, n_strokes, SCENE_KINDS.index(kind)])
+    camera = default_camera(viewport_size)
+
+    if kind == "axis":
+        n_axis = n_strokes
+    elif kind == "freehand":
+        n_axis = 0
+    else:
+        n_axis = int(round(n_strokes * MIXED_AXIS_RATIO))
+    n_free = n_strokes - n_axis
+
+    coords_list, drawn_list, axes = [], [], []
+
+    if n_axis:
+        axis_coords, axis_names = _axis_coords(rng, n_axis)
+        ends_2d = camera.project_points(
+            axis_coords.reshape(-1, 3)).reshape(n_axis, 2, 2)
+        t = np.linspace(0.0, 1.0, AXIS_DRAWN_POINTS)[None, :, None]
+        drawn = ends_2d[:, :1] + t * (ends_2d[:, 1:] - ends_2d[:, :1])
+        drawn += rng.normal(0.0, JITTER_PX, size=drawn.shape)
+        coords_list.extend(axis_coords)
+        drawn_list.extend(drawn)
+        axes.extend(axis_names)
+
+    if n_free:
+        walk, lengths = _freehand_coords(rng, n_free)
+        screen = camera.project_points(walk)
+        screen += rng.normal(0.0, JITTER_PX, size=screen.shape)
+        bounds = np.cumsum(lengths)[:-1]
+        coords_list.extend(np.split(walk, bounds))
+        drawn_list.extend(np.split(screen, bounds))
+        axes.extend([None] * n_free)
+
+    # 两类笔画交错排列，使 stroke_id 顺序与类型无关
+    order = rng.permutation(n_strokes)
+    strokes_3d, strokes_2d, scene_axes = [], [], []
+    for stroke_id, i in enumerate(order.tolist(), start=1):
+        strokes_3d.append(Stroke3D(coords_list[i], stroke_id=stroke_id))
+        strokes_2d.append(Stroke2D(stroke_id, drawn_list[i]))
+        scene_axes.append(axes[i])
+    return SyntheticScene(kind, n_strokes, seed, camera, strokes_2d,
+                          strokes_3d, scene_axes)
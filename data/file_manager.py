@@ -3,12 +3,128 @@
 import json
 import os
 
+import numpy as np
+
+from data.sketch_binary import is_sketch_binary, read_sketch_binary, \
+    write_sketch_binary
+from data.stroke_2d import Stroke2D
+from data.stroke_stream_loader import read_strokes_streaming
+
+
 class StrokeFileManager:
+    """
+    草图的保存与加载。默认使用二进制格式 (.skb，见 data/sketch_binary.py)，
+    扩展名为 .json 时按 JSON 导出；JSON 文件通过 load_strokes_streaming 加载。
+    """
+
     def __init__(self, stroke_manager_2d, stroke_manager_3d):
         self.stroke_manager_2d = stroke_manager_2d
         self.stroke_manager_3d = stroke_manager_3d
+        # 当前笔画数据所映射的 .skb 文件 (没有映射时为 None)
+        self.mapped_path = None
 
     def save_strokes(self, filepath):
+        """
+        按扩展名保存: .json => JSON，其余 => 二进制。
+        """
+        if filepath.lower().endswith(".json"):
+            self.export_json(filepath)
+        else:
+            self.save_binary(filepath)
+
+    def load_strokes(self, filepath, mmap=True):
+        """
+        按文件头判断格式加载 (二进制或 JSON)。
+        mmap=False 时二进制数据会拷贝进内存，不再引用文件。
+        """
+        if not os.path.exists(filepath):
+            print("File not found:", filepath)
+            return None, None
+        if is_sketch_binary(filepath):
+            self.load_binary(filepath, mmap=mmap)
+        else:
+            self.load_strokes_streaming(filepath)
+
+    def replace_scene(self, strokes_2d, ids_3d, coords_3d, lengths_3d):
+        """
+        整体替换 2D / 3D 管理器的内容 (不记录撤销)，并清空撤销历史:
+        旧场景的记录不能再作用到新场景上。
+        """
+        self.stroke_manager_2d.load_strokes(strokes_2d)
+        self.stroke_manager_3d.load_block(ids_3d, coords_3d, lengths_3d)
+        self.stroke_manager_2d.history.clear()
+        if self.stroke_manager_3d.history is not self.stroke_manager_2d.history:
+            self.stroke_manager_3d.history.clear()
+
+    def _arena_strokes_3d(self):
+        """
+        [(stroke_id, coords (N,3))]，coords 为 arena 上的视图。
+        """
+        arena = self.stroke_manager_3d.arena
+        out = []
+        for stroke3d in self.stroke_manager_3d.get_all_strokes():
+            off = int(arena.offsets[stroke3d.arena_slot])
+            out.append((stroke3d.stroke_id, arena.coords[
+                off:off + int(arena.lengths[stroke3d.arena_slot])]))
+        return out
+
+    def _is_mapped(self, filepath):
+        if self.mapped_path is None or not os.path.exists(filepath):
+            return False
+        try:
+            return os.path.samefile(filepath, self.mapped_path)
+        except OSError:
+            return False
+
+    def release_mapping(self):
+        """
+        把仍引用文件映射的数组 (2D 点列、3D 坐标池、撤销历史中的 2D 笔画) 拷贝进内存，
+        之后映射随最后一个视图释放，映射的文件可以被覆盖或删除
+        (Windows 上映射中的文件无法被替换)。
+        """
+        if self.mapped_path is None:
+            return
+        history = self.stroke_manager_2d.history
+        for stroke in list(self.stroke_manager_2d.get_all_strokes()) + list(
+                history.strokes(self.stroke_manager_2d.HISTORY_DIM)):
+            stroke.points_2d = np.array(stroke.points_2d)
+        arena = self.stroke_manager_3d.arena
+        arena.coords = np.array(arena.coords)
+        self.mapped_path = None
+
+    def save_binary(self, filepath):
+        """
+        2D和3D笔画保存为二进制草图文件。
+        覆盖当前映射的文件 (加载后原地保存) 前先把数据拷贝出映射。
+        """
+        if self._is_mapped(filepath):
+            self.release_mapping()
+        strokes_2d = [(s.stroke_id, s.points_2d)
+                      for s in self.stroke_manager_2d.get_all_strokes()]
+        write_sketch_binary(filepath, strokes_2d, self._arena_strokes_3d())
+        print(f"Strokes saved to {filepath}.")
+
+    def load_binary(self, filepath, mmap=True):
+        """
+        内存映射方式加载二进制草图文件:
+        2D 笔画的 points_2d 与 3D 坐标池都直接是文件映射上的视图 (copy-on-write)。
+        mmap=False 时把各区块整体拷贝进内存 (仍然不逐笔画建数组)。
+        """
+        blocks = read_sketch_binary(filepath)
+        if not mmap:
+            blocks = blocks.copy()
+        self.mapped_path = os.path.abspath(filepath) if mmap else None
+
+        self.replace_scene(
+            [Stroke2D(stroke_id, points) for stroke_id, points
+             in zip(blocks.index_2d["stroke_id"].tolist(),
+                    blocks.all_points_2d())],
+            blocks.index_3d["stroke_id"].tolist(),
+            blocks.coords_3d,
+            blocks.index_3d["length"])
+        print(f"Strokes loaded from {filepath}.")
+
+    def export_json(self, filepath):
         """
         将当前的camera信息 + 2D和3D笔画保存到JSON文件
         """
@@ -19,15 +135,19 @@ class StrokeFileManager:
         for stroke2d in self.stroke_manager_2d.get_all_strokes():
             stroke_dict = {
                 "stroke_id": stroke2d.stroke_id,
-                "points_2d": stroke2d.points_2d,
+                "points_2d": stroke2d.points_2d.tolist(),
             }
             strokes_2d_data.append(stroke_dict)
         data["strokes_2d"] = strokes_2d_data
 
-        # 保存3D
+        # 保存3D: 整个坐标池一次性转成 list，再按每条笔画的区间切片
         strokes_3d_data = []
+        arena = self.stroke_manager_3d.arena
+        all_coords = arena.coords[:arena.used].tolist()
         for stroke3d in self.stroke_manager_3d.get_all_strokes():
-            coords_list = stroke3d.coords_3d.tolist()  # numpy -> list
+            off = int(arena.offsets[stroke3d.arena_slot])
+            coords_list = all_coords[
+                off:off + int(arena.lengths[stroke3d.arena_slot])]
             stroke_dict = {
                 "stroke_id": stroke3d.stroke_id,
                 "coords_3d": coords_list
@@ -39,42 +159,17 @@ class StrokeFileManager:
             json.dump(data, f, ensure_ascii=False, indent=2)
         print(f"Strokes saved to {filepath}.")
 
-    def load_strokes(self, filepath):
+    def load_strokes_streaming(self, filepath, progress_callback=None,
+                               is_cancelled=None):
         """
-        加载JSON文件, 并分别写回 stroke_manager_2d / stroke_manager_3d 的数据结构。
-        同时返回camera参数(给外部设置camera用)。
+        流式加载JSON文件: 逐条解析笔画，3D 坐标直接写入一块连续缓冲，
+        读完后再一次性替换管理器内容。读取失败或被取消 (LoadCancelled) 时旧内容保持不变。
         """
-        if not os.path.exists(filepath):
-            print("File not found:", filepath)
-            return None, None
-
-        with open(filepath, "r", encoding="utf-8") as f:
-            data = json.load(f)
-
-        # 清空manager旧数据
-        self.stroke_manager_2d.strokes_2d.clear()
-        self.stroke_manager_3d.strokes_3d.clear()
-
-
-        # 加载2D
-        strokes_2d_data = data.get("strokes_2d", [])
-        for s2d_dict in strokes_2d_data:
-            from data.stroke_2d import Stroke2D
-            stroke_id = s2d_dict["stroke_id"]
-            points_2d = s2d_dict["points_2d"]
-            st = Stroke2D(stroke_id, points_2d)
-
-            self.stroke_manager_2d.add_stroke(st)
-
-        # 加载3D
-        strokes_3d_data = data.get("strokes_3d", [])
-        for s3d_dict in strokes_3d_data:
-            from data.stroke_3d import Stroke3D
-            stroke_id = s3d_dict["stroke_id"]
-            coords_3d = s3d_dict["coords_3d"]
-            import numpy as np
-            coords_3d_array = np.array(coords_3d, dtype=np.float32)
-            st3d = Stroke3D(coords_3d_array, stroke_id=stroke_id)
-            self.stroke_manager_3d.add_stroke(st3d)
+        staged = read_strokes_streaming(filepath, progress_callback,
+                                        is_cancelled)
+        self.mapped_path = None
 
+        # 暂存缓冲 (含尾部空余) 直接作为 3D 坐标池
+        self.replace_scene(staged.strokes_2d, staged.ids_3d,
+                           staged.coords_3d, staged.lengths_3d)
         print(f"Strokes loaded from {filepath}.")
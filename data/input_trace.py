@@ -0,0 +1,155 @@
+# data/input_trace.py
+"""
+画布输入事件记录文件 (.skinput)，小端序:
+
+  header (16 字节)
+    magic        8s   b"SKINPUT\\0"
+    version      u32
+    meta_len     u32
+  meta       meta_len 字节 UTF-8 JSON (工具名表、记录时的开关状态等)，补齐到 16 字节
+  events     EVENT_DTYPE 定长记录直到文件末尾
+
+每条记录带有相对记录开始的时间戳，以及事件到达时的相机状态与视口大小，
+回放时据此恢复相机，不依赖工具自身的相机操作。
+kind 的最高位 (EVENT_FLAG_OVERLAY) 表示事件被 overlay (消失点、HUD 等) 处理、
+没有交给工具，回放时跳过。
+"""
+
+import json
+import struct
+import time
+
+import numpy as np
+
+
+MAGIC = b"SKINPUT\0"
+VERSION = 1
+
+_HEADER = struct.Struct("<8sII")
+_ALIGN = 16
+
+EVENT_PRESS = 1
+EVENT_MOVE = 2
+EVENT_RELEASE = 3
+EVENT_WHEEL = 4
+
+# kind 中的标志位 (低位为 EVENT_*)
+EVENT_FLAG_OVERLAY = 0x80
+
+EVENT_NAMES = {EVENT_PRESS: "press", EVENT_MOVE: "move",
+               EVENT_RELEASE: "release", EVENT_WHEEL: "wheel"}
+
+EVENT_DTYPE = np.dtype([
+    ("t_ns", "<i8"),          # 相对记录开始的时间
+    ("kind", "u1"),           # EVENT_* | EVENT_FLAG_*
+    ("tool", "u1"),           # meta["tools"] 中的下标 (0 = 无工具)
+    ("delta", "<i2"),         # 滚轮 angleDelta().y()
+    ("button", "<u4"),        # Qt.MouseButton
+    ("buttons", "<u4"),       # Qt.MouseButtons
+    ("modifiers", "<u4"),     # Qt.KeyboardModifiers
+    ("x", "<f4"),
+    ("y", "<f4"),
+    ("camera_rot", "<f4", (2,)),
+    ("camera_distance", "<f4"),
+    ("look_at", "<f4", (3,)),
+    ("width", "<u2"),
+    ("height", "<u2"),
+])
+
+
+class InputTrace:
+    """
+    读取结果: meta (dict) 与 events (EVENT_DTYPE 结构数组)。
+    """
+
+    def __init__(self, meta, events):
+        self.meta = meta
+        self.events = events
+
+    def __len__(self):
+        return len(self.events)
+
+    def tool_name(self, tool_index):
+        return self.meta["tools"][int(tool_index)]
+
+
+class InputTraceRecorder:
+    """
+    逐条记录画布输入事件。记录缓冲预先分配、容量按 2 倍增长，
+    每个事件只写一行定长记录，不影响交互本身的耗时。
+    """
+
+    def __init__(self, meta=None, capacity=4096):
+        self.meta = dict(meta or {})
+        self._events = np.zeros(capacity, dtype=EVENT_DTYPE)
+        self.count = 0
+        # 工具类名表，下标 0 表示没有工具
+        self.tools = [None]
+        self._tool_index = {None: 0}
+        self._t0 = time.perf_counter_ns()
+
+    def __len__(self):
+        return self.count
+
+    def _tool(self, tool):
+        name = type(tool).__name__ if tool is not None else None
+        index = self._tool_index.get(name)
+        if index is None:
+            index = self._tool_index[name] = len(self.tools)
+            self.tools.append(name)
+        return index
+
+    def record(self, kind, x, y, tool, camera_rot, camera_distance, look_at,
+               viewport_size, button=0, buttons=0, modifiers=0, delta=0):
+        if self.count == len(self._events):
+            grown = np.zeros(2 * len(self._events), dtype=EVENT_DTYPE)
+            grown[:self.count] = self._events
+            self._events = grown
+        self._events[self.count] = (
+            time.perf_counter_ns() - self._t0, kind, self._tool(tool),
+            delta, button, buttons, modifiers, x, y, tuple(camera_rot),
+            camera_distance, tuple(look_at), viewport_size[0],
+            viewport_size[1])
+        self.count += 1
+
+    def events(self):
+        return self._events[:self.count]
+
+    def save(self, filepath):
+        meta = dict(self.meta)
+        meta["tools"] = list(self.tools)
+        write_input_trace(filepath, meta, self.events())
+
+
+def write_input_trace(filepath, meta, events):
+    meta_bytes = json.dumps(meta).encode("utf-8")
+    events_off = (_HEADER.size + len(meta_bytes) + _ALIGN - 1) \
+        // _ALIGN * _ALIGN
+    with open(filepath, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(meta_bytes)))
+        f.write(meta_bytes)
+        f.write(b"\0" * (events_off - f.tell()))
+        f.write(np.ascontiguousarray(events, dtype=EVENT_DTYPE).tobytes())
+
+
+def read_input_trace(filepath):
+    """
+    :return: InputTrace
+    """
+    with open(filepath, "rb") as f:
+        raw = f.read(_HEADER.size)
+        if len(raw) < _HEADER.size:
+            raise ValueError("truncated input trace: " + str(filepath))
+        magic, version, meta_len = _HEADER.unpack(raw)
+        if magic != MAGIC:
+            raise ValueError("not an input trace: " + str(filepath))
+        if version > VERSION:
+            raise ValueError("unsupported input trace version %d" % version)
+        meta = json.loads(f.read(meta_len).decode("utf-8"))
+        events_off = (_HEADER.size + meta_len + _ALIGN - 1) \
+            // _ALIGN * _ALIGN
+        f.seek(events_off)
+        data = f.read()
+    count = len(data) // EVENT_DTYPE.itemsize
+    events = np.frombuffer(data, dtype=EVENT_DTYPE, count=count).copy()
+    return InputTrace(meta, events)
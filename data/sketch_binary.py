@@ -0,0 +1,178 @@
+# data/sketch_binary.py
+"""
+二进制草图文件 (.skb)，小端序，所有区块按 16 字节对齐:
+
+  header (72 字节)
+    magic        8s   b"SKETCHB\\0"
+    version      u32
+    n_2d / n_3d  u32 x2
+    reserved     u32
+    index_2d_off / index_3d_off / coords_2d_off / coords_3d_off   u64 x4
+    total_2d / total_3d                                           u64 x2  (顶点数)
+  index_2d   n_2d 条 INDEX_DTYPE (stroke_id, offset, length)，offset/length 以顶点计
+  index_3d   n_3d 条 INDEX_DTYPE
+  coords_2d  (total_2d, 2) float32
+  coords_3d  (total_3d, 3) float32
+"""
+
+import os
+import struct
+
+import numpy as np
+
+
+MAGIC = b"SKETCHB\0"
+VERSION = 1
+
+_HEADER = struct.Struct("<8sIIII6Q")
+_ALIGN = 16
+
+INDEX_DTYPE = np.dtype([("stroke_id", "<i8"),
+                        ("offset", "<i8"),
+                        ("length", "<i8")])
+
+
+class SketchBlocks:
+    """
+    读取结果。所有数组都是文件映射上的视图 (copy-on-write)，不做拷贝:
+      - index_2d / index_3d: INDEX_DTYPE 结构化数组
+      - coords_2d: (total_2d, 2) float32
+      - coords_3d: (total_3d, 3) float32
+    """
+
+    def __init__(self, version, index_2d, index_3d, coords_2d, coords_3d):
+        self.version = version
+        self.index_2d = index_2d
+        self.index_3d = index_3d
+        self.coords_2d = coords_2d
+        self.coords_3d = coords_3d
+
+    def copy(self):
+        """
+        各区块拷贝进内存的副本，不再引用文件映射。
+        """
+        return SketchBlocks(self.version,
+                            np.array(self.index_2d),
+                            np.array(self.index_3d),
+                            np.array(self.coords_2d),
+                            np.array(self.coords_3d))
+
+    def points_2d(self, i):
+        off = int(self.index_2d["offset"][i])
+        return self.coords_2d[off:off + int(self.index_2d["length"][i])]
+
+    def all_points_2d(self):
+        """
+        按 index_2d 的顺序返回每条 2D 笔画的点列视图。
+        索引列一次转成 list，不逐笔画访问结构化数组。
+        """
+        coords = self.coords_2d
+        return [coords[off:off + n] for off, n in zip(
+            self.index_2d["offset"].tolist(),
+            self.index_2d["length"].tolist())]
+
+
+def is_sketch_binary(filepath):
+    with open(filepath, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def _aligned(pos):
+    return (pos + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def _build_index(stroke_ids, lengths):
+    index = np.zeros(len(lengths), dtype=INDEX_DTYPE)
+    if len(lengths):
+        index["stroke_id"] = [_int_id(sid) for sid in stroke_ids]
+        index["length"] = lengths
+        index["offset"][1:] = np.cumsum(index["length"])[:-1]
+    return index
+
+
+def _int_id(stroke_id):
+    if isinstance(stroke_id, (bool, np.bool_)) or not isinstance(
+            stroke_id, (int, np.integer)):
+        raise ValueError(
+            "binary sketch format requires integer stroke_id, got %r"
+            % (stroke_id,))
+    return int(stroke_id)
+
+
+def write_sketch_binary(filepath, strokes_2d, strokes_3d):
+    """
+    先写到 filepath + ".tmp" 再替换目标文件: 笔画数据可能正是目标文件映射上的视图
+    (加载后原地保存)，直接截断目标文件会让这些视图失效 (SIGBUS)。
+    :param strokes_2d: [(stroke_id, points (N,2))]
+    :param strokes_3d: [(stroke_id, coords (N,3))]
+    """
+    pts_2d = [np.asarray(p, dtype=np.float32).reshape(-1, 2)
+              for _, p in strokes_2d]
+    pts_3d = [np.asarray(c, dtype=np.float32).reshape(-1, 3)
+              for _, c in strokes_3d]
+    index_2d = _build_index([sid for sid, _ in strokes_2d],
+                            [len(p) for p in pts_2d])
+    index_3d = _build_index([sid for sid, _ in strokes_3d],
+                            [len(c) for c in pts_3d])
+    total_2d = sum(len(p) for p in pts_2d)
+    total_3d = sum(len(c) for c in pts_3d)
+
+    index_2d_off = _aligned(_HEADER.size)
+    index_3d_off = _aligned(index_2d_off + index_2d.nbytes)
+    coords_2d_off = _aligned(index_3d_off + index_3d.nbytes)
+    coords_3d_off = _aligned(coords_2d_off + total_2d * 2 * 4)
+
+    header = _HEADER.pack(MAGIC, VERSION, len(pts_2d), len(pts_3d), 0,
+                          index_2d_off, index_3d_off,
+                          coords_2d_off, coords_3d_off,
+                          total_2d, total_3d)
+
+    tmp = filepath + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(header)
+        for off, blocks in ((index_2d_off, [index_2d]),
+                            (index_3d_off, [index_3d]),
+                            (coords_2d_off, pts_2d),
+                            (coords_3d_off, pts_3d)):
+            f.write(b"\0" * (off - f.tell()))
+            for block in blocks:
+                f.write(block.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, filepath)
+
+
+def read_sketch_binary(filepath):
+    """
+    以内存映射方式打开 .skb 文件，返回 SketchBlocks。
+    映射是 copy-on-write 的: 修改视图不会写回文件。
+    """
+    with open(filepath, "rb") as f:
+        raw = f.read(_HEADER.size)
+    if len(raw) < _HEADER.size:
+        raise ValueError("truncated sketch file: " + str(filepath))
+    (magic, version, n_2d, n_3d, _,
+     index_2d_off, index_3d_off, coords_2d_off, coords_3d_off,
+     total_2d, total_3d) = _HEADER.unpack(raw)
+    if magic != MAGIC:
+        raise ValueError("not a binary sketch file: " + str(filepath))
+    if version > VERSION:
+        raise ValueError("unsupported sketch file version %d" % version)
+
+    # 各区块从普通 ndarray 视图切出: np.memmap 子类每次切片都要走
+    # __getitem__ / __array_finalize__，逐笔画切片时开销比拷贝还大。
+    # 视图的 base 仍持有映射，最后一个视图释放时映射才关闭。
+    mm = np.memmap(filepath, dtype=np.uint8, mode="c").view(np.ndarray)
+    if len(mm) < coords_3d_off + total_3d * 3 * 4:
+        raise ValueError("truncated sketch file: " + str(filepath))
+
+    def block(off, dtype, count, shape=None):
+        arr = mm[off:off + count * np.dtype(dtype).itemsize].view(dtype)
+        return arr if shape is None else arr.reshape(shape)
+
+    return SketchBlocks(
+        version,
+        block(index_2d_off, INDEX_DTYPE, n_2d),
+        block(index_3d_off, INDEX_DTYPE, n_3d),
+        block(coords_2d_off, np.float32, total_2d * 2, (-1, 2)),
+        block(coords_3d_off, np.float32, total_3d * 3, (-1, 3)))
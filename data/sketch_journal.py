@@ -0,0 +1,353 @@
+# data/sketch_journal.py
+"""
+自动保存日志: 草图文件旁边的只追加操作日志 + 定期压缩出的完整快照。
+
+  <sketch>.journal       日志，JOURNAL_MAGIC 之后是一条条记录:
+                           _RECORD (op, dim, stroke_id, n_points, crc32)
+                           + n_points * dim 个 float32 (只有 add 有坐标)
+  <sketch>.autosave.skb  最近一次压缩得到的快照 (二进制草图格式)
+
+恢复时先载入快照 (没有则载入草图文件本身)，再按顺序重放日志。
+add / remove / clear 都是幂等的，所以压缩过程中崩溃导致的"新快照 + 旧日志"
+重放后结果仍然正确。末尾写了一半 (crc 不符或长度不足) 的记录直接丢弃。
+"""
+
+import os
+import queue
+import struct
+import threading
+import zlib
+
+import numpy as np
+
+from data.sketch_binary import write_sketch_binary
+from data.stroke_events import STROKES_REMOVED, STROKES_RESET
+from data.stroke_2d import Stroke2D
+from data.stroke_3d import Stroke3D
+
+JOURNAL_MAGIC = b"SKJOURN1"
+
+OP_ADD = 1
+OP_REMOVE = 2
+OP_CLEAR = 3
+# 撤销历史溢出文件中的事务头 (stroke_id 字段为其后的操作数)
+OP_TXN = 4
+
+_RECORD = struct.Struct("<BBqII")
+
+
+def journal_path(sketch_path):
+    return sketch_path + ".journal"
+
+
+def autosave_path(sketch_path):
+    return sketch_path + ".autosave.skb"
+
+
+def encode_record(op, dim, stroke_id=0, coords=None):
+    """
+    :param op: OP_ADD / OP_REMOVE / OP_CLEAR
+    :param dim: 2 或 3 (对应 2D / 3D 管理器)
+    """
+    if coords is None:
+        payload = b""
+        n = 0
+    else:
+        coords = np.asarray(coords, dtype=np.float32).reshape(-1, dim)
+        payload = coords.tobytes()
+        n = len(coords)
+    head = _RECORD.pack(op, dim, int(stroke_id), n, 0)[:-4]
+    crc = zlib.crc32(payload, zlib.crc32(head))
+    return head + struct.pack("<I", crc) + payload
+
+
+def decode_record(data, pos):
+    """
+    解析 data[pos:] 处的一条记录。
+    :return: (op, dim, stroke_id, coords (n,dim) float32, end)；记录不完整或校验失败时返回 None
+    """
+    if pos + _RECORD.size > len(data):
+        return None
+    op, dim, stroke_id, n, crc = _RECORD.unpack_from(data, pos)
+    end = pos + _RECORD.size + n * dim * 4
+    if dim not in (2, 3) or end > len(data):
+        return None
+    payload = data[pos + _RECORD.size:end]
+    head = data[pos:pos + _RECORD.size - 4]
+    if zlib.crc32(payload, zlib.crc32(head)) != crc:
+        return None
+    coords = np.frombuffer(payload, dtype=np.float32).reshape(-1, dim)
+    return op, dim, stroke_id, coords, end
+
+
+def read_records(path):
+    """
+    逐条读出日志记录 (op, dim, stroke_id, coords)，遇到不完整的尾部即停止。
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(JOURNAL_MAGIC):
+        return
+    pos = len(JOURNAL_MAGIC)
+    while True:
+        record = decode_record(data, pos)
+        if record is None:
+            return
+        op, dim, stroke_id, coords, pos = record
+        yield op, dim, stroke_id, coords if op == OP_ADD else None
+
+
+def has_recovery(sketch_path):
+    """
+    草图旁边是否留有未合并的自动保存数据 (上次没有正常保存就退出)。
+    """
+    path = journal_path(sketch_path)
+    return (os.path.exists(autosave_path(sketch_path))
+            or (os.path.exists(path)
+                and os.path.getsize(path) > len(JOURNAL_MAGIC)))
+
+
+class SketchJournal:
+    """
+    订阅 StrokeManager2D / StrokeManager3D 的变化事件，
+    每次变化编码成一条紧凑的二进制记录交给后台线程追加写入并 fsync，
+    自动保存的开销只与本次编辑的大小有关。
+
+    日志超过 compact_bytes 后在 GUI 线程拷贝一份当前坐标，由后台线程写成
+    完整快照并清空日志。后台队列是顺序执行的，因此快照之后的记录总是写进新日志。
+
+    写盘出错 (磁盘满、目录只读等) 时后台线程继续处理之后的任务，最近一次错误记在
+    failed 中，并在后台线程调用 on_error(exc)，界面据此提示用户自动保存失效。
+    快照写入失败时旧日志不会被清空。
+    """
+
+    def __init__(self, file_manager, compact_bytes=8 * 1024 * 1024,
+                 on_error=None):
+        self.file_manager = file_manager
+        self.stroke_manager_2d = file_manager.stroke_manager_2d
+        self.stroke_manager_3d = file_manager.stroke_manager_3d
+        self.compact_bytes = compact_bytes
+        self.on_error = on_error
+        # 最近一次写盘错误 (没有时为 None)
+        self.failed = None
+
+        self.sketch_path = None
+        self._journal_bytes = 0
+        self._queue = None
+        self._thread = None
+
+    @property
+    def attached(self):
+        return self.sketch_path is not None
+
+    # -----------------------------
+    # 绑定 / 解绑
+    # -----------------------------
+    def attach(self, sketch_path, reset=True):
+        """
+        开始为 sketch_path 记录日志。草图文件本身此时应与管理器内容一致
+        (刚保存或刚加载)，旧的日志与快照会被清空。
+        reset=False 时保留旧的日志与快照 (恢复之后用): 新记录接在旧日志后面，
+        之后的 compact() 在新快照落盘后才清空旧日志。
+        """
+        self.detach()
+        self.sketch_path = sketch_path
+        self.failed = None
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        if reset:
+            self._queue.put(("reset",))
+        self._journal_bytes = 0
+        self.stroke_manager_2d.changes.subscribe(self._on_2d_changed)
+        self.stroke_manager_3d.changes.subscribe(self._on_3d_changed)
+
+    def detach(self):
+        """
+        停止记录，等待已排队的记录写完 (日志与快照保留在磁盘上)。
+        """
+        if not self.attached:
+            return
+        self.stroke_manager_2d.changes.unsubscribe(self._on_2d_changed)
+        self.stroke_manager_3d.changes.unsubscribe(self._on_3d_changed)
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        self._queue = None
+        self.sketch_path = None
+
+    def discard(self):
+        """
+        草图已完整保存: 清空日志并删除自动保存快照，然后停止记录。
+        """
+        if not self.attached:
+            return
+        self._queue.put(("reset",))
+        self.detach()
+
+    def flush(self):
+        """
+        阻塞直到已排队的记录全部写入并 fsync (后台线程已退出时立即返回)。
+        """
+        if not self.attached:
+            return
+        q = self._queue
+        with q.all_tasks_done:
+            while q.unfinished_tasks and self._thread.is_alive():
+                q.all_tasks_done.wait(0.1)
+
+    # -----------------------------
+    # 恢复
+    # -----------------------------
+    def recover(self, sketch_path):
+        """
+        载入快照 (没有则载入草图文件本身) 并重放日志，得到上次退出前的状态。
+        应在 attach 之前调用；之后用 attach(path, reset=False) + compact() 保存恢复结果，
+        新快照写完之前旧的快照与日志一直保留。
+        """
+        base = autosave_path(sketch_path)
+        if not os.path.exists(base):
+            base = sketch_path
+        if os.path.exists(base):
+            # 不做内存映射: 快照文件随后会被替换或删除
+            self.file_manager.load_strokes(base, mmap=False)
+        else:
+            self.file_manager.replace_scene(
+                [], [], np.zeros((0, 3), dtype=np.float32), [])
+
+        path = journal_path(sketch_path)
+        if not os.path.exists(path):
+            return
+        # 重放不记录撤销 (apply_ops)，恢复后的撤销历史为空
+        for op, dim, stroke_id, coords in read_records(path):
+            manager = (self.stroke_manager_2d if dim == 2
+                       else self.stroke_manager_3d)
+            if op == OP_CLEAR:
+                manager.clear()
+            elif op == OP_REMOVE:
+                stroke = manager.get_stroke_by_id(stroke_id)
+                if stroke is not None:
+                    manager.apply_ops("remove", [stroke])
+            elif op == OP_ADD:
+                if dim == 2:
+                    manager.apply_ops("add", [Stroke2D(stroke_id, coords)])
+                else:
+                    manager.apply_ops(
+                        "add", [Stroke3D(coords, stroke_id=stroke_id)])
+        print(f"Strokes recovered from {path}.")
+
+    # -----------------------------
+    # 记录
+    # -----------------------------
+    def _on_2d_changed(self, event):
+        self._record(event, 2)
+
+    def _on_3d_changed(self, event):
+        self._record(event, 3)
+
+    def _record(self, event, dim):
+        if event.kind == STROKES_RESET:
+            # 集合被整体替换: 直接压缩成快照，比逐条记录更小
+            self.compact()
+            return
+        if event.kind == STROKES_REMOVED:
+            records = [encode_record(OP_REMOVE, dim, s.stroke_id)
+                       for s in event.strokes]
+        else:
+            # added / modified 都记为 add (按 id 覆盖)
+            records = [encode_record(OP_ADD, dim, s.stroke_id,
+                                     s.coords_3d if dim == 3
+                                     else s.points_2d)
+                       for s in event.strokes]
+        record = b"".join(records)
+        self._journal_bytes += len(record)
+        self._queue.put(("append", record))
+        if self._journal_bytes > self.compact_bytes:
+            self.compact()
+
+    def compact(self):
+        """
+        把当前内容写成完整快照并清空日志 (拷贝在 GUI 线程，写盘在后台线程)。
+        """
+        if not self.attached:
+            return
+        strokes_2d = [(s.stroke_id, s.points_2d.copy())
+                      for s in self.stroke_manager_2d.get_all_strokes()]
+        arena = self.stroke_manager_3d.arena
+        coords = arena.coords[:arena.used].copy()
+        strokes_3d = []
+        for s in self.stroke_manager_3d.get_all_strokes():
+            off = int(arena.offsets[s.arena_slot])
+            strokes_3d.append(
+                (s.stroke_id,
+                 coords[off:off + int(arena.lengths[s.arena_slot])]))
+        self._journal_bytes = 0
+        self._queue.put(("snapshot", strokes_2d, strokes_3d))
+
+    # -----------------------------
+    # 后台线程
+    # -----------------------------
+    def _fail(self, exc):
+        self.failed = exc
+        print("autosave failed:", repr(exc))
+        if self.on_error is not None:
+            self.on_error(exc)
+
+    def _run(self):
+        path = journal_path(self.sketch_path)
+        snapshot = autosave_path(self.sketch_path)
+        f = None
+        stop = False
+        try:
+            while not stop:
+                # 一次取完队列里已有的任务，只 fsync 一次
+                jobs = [self._queue.get()]
+                while True:
+                    try:
+                        jobs.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                dirty = False
+                for job in jobs:
+                    if job is None:
+                        stop = True
+                        continue
+                    try:
+                        if f is None or f.closed:
+                            f = open(path, "ab")
+                        if job[0] == "append":
+                            f.write(job[1])
+                            dirty = True
+                        elif job[0] == "snapshot":
+                            # 先写临时文件再替换，快照文件始终完整；
+                            # 快照落盘之后才清空日志
+                            write_sketch_binary(snapshot, job[1], job[2])
+                            f = self._truncate(f, path)
+                            dirty = False
+                        elif job[0] == "reset":
+                            if os.path.exists(snapshot):
+                                os.remove(snapshot)
+                            f = self._truncate(f, path)
+                            dirty = False
+                    except Exception as e:
+                        self._fail(e)
+                try:
+                    if dirty:
+                        f.flush()
+                        os.fsync(f.fileno())
+                except Exception as e:
+                    self._fail(e)
+                for _ in jobs:
+                    self._queue.task_done()
+        finally:
+            if f is not None:
+                f.close()
+
+    @staticmethod
+    def _truncate(f, path):
+        f.close()
+        f = open(path, "wb")
+        f.write(JOURNAL_MAGIC)
+        f.flush()
+        os.fsync(f.fileno())
+        return f
@@ -1,14 +1,32 @@
 #data/stroke_2d.py
+import numpy as np
+
+
+def as_points_2d(points):
+    """
+    把点列统一成 (N,2) float32 数组 (已经是时不拷贝，例如文件映射上的视图)。
+    """
+    points = np.asarray(points, dtype=np.float32)
+    if points.ndim != 2 or points.shape[1] != 2:
+        # reshape 会多出一个视图对象，形状已经正确时不做
+        points = points.reshape(-1, 2)
+    return points
+
+
 class Stroke2D:
+    __slots__ = ("stroke_id", "_points_2d", "_meta",
+                 "camera_rot", "camera_dist", "is_selected", "is_hovered")
+
     def __init__(self, stroke_id, points_2d):
         """
         stroke_id : int 或 str，用于与3D笔画对应
-        points_2d : list of (x, y)
+        points_2d : (N,2) 点列，统一存为 float32 数组 (也接受 list of (x, y))
         """
         self.stroke_id = stroke_id
-        self.points_2d = points_2d  # 2D坐标列表
+        self.points_2d = points_2d  # 2D坐标 (N,2) float32
 
-        self.meta = {}
+        # 只有 modifier 真正写入时才创建 dict
+        self._meta = None
 
         # 如果想记录绘制时的相机信息，也可加在这里
         self.camera_rot = (0.0, 0.0)
@@ -17,3 +35,68 @@ class Stroke2D:
         # 其他属性 (颜色、状态等)
         self.is_selected = False
         self.is_hovered = False
+
+    @property
+    def points_2d(self):
+        return self._points_2d
+
+    @points_2d.setter
+    def points_2d(self, points):
+        self._points_2d = as_points_2d(points)
+
+    @property
+    def meta(self):
+        if self._meta is None:
+            self._meta = {}
+        return self._meta
+
+    @meta.setter
+    def meta(self, meta):
+        self._meta = meta
+
+
+class PointBuffer2D:
+    """
+    绘制过程中逐点追加的 2D 点: 容量按 2 倍增长，
+    view() 返回前 n 个点的 (n,2) float32 视图，不拷贝。
+    扩容后旧视图仍指向旧数组；write() 原地改写时之前取出的视图会看到新内容。
+    """
+
+    __slots__ = ("_data", "count")
+
+    def __init__(self, capacity=256):
+        self._data = np.empty((capacity, 2), dtype=np.float32)
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def _reserve(self, needed):
+        capacity = len(self._data)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        grown = np.empty((capacity, 2), dtype=np.float32)
+        grown[:self.count] = self._data[:self.count]
+        self._data = grown
+
+    def append(self, x, y):
+        self._reserve(self.count + 1)
+        self._data[self.count] = (x, y)
+        self.count += 1
+
+    def truncate(self, n):
+        self.count = min(self.count, n)
+
+    def write(self, start, points):
+        """
+        从下标 start 起写入 points，并把长度截到 start + len(points)。
+        """
+        end = start + len(points)
+        self._reserve(end)
+        self._data[start:end] = points
+        self.count = end
+
+    def view(self):
+        return self._data[:self.count]
@@ -1,29 +1,78 @@
 # data/stroke_3d.py
 import numpy as np
 
+# 尚未投影的笔画共用的空屏幕坐标 (只读)
+_NO_SCREEN_COORDS = np.empty((0, 2), dtype=np.float32)
+_NO_SCREEN_COORDS.flags.writeable = False
+
+
 class Stroke3D:
+    __slots__ = ("_arena", "arena_slot", "_coords_3d", "stroke_id",
+                 "color", "is_hovered", "is_selected", "screen_coords")
+
     def __init__(self, coords_3d, color=(1,1,1),stroke_id=None):
         """
         coords_3d: shape=(N,3)
         color: (r,g,b)
-        status: 'normal', 'hovered', 'selected' 等
         """
-        self.coords_3d = coords_3d
+        # 加入 StrokeManager3D 后坐标存放在其 StrokeCoordArena 中，
+        # coords_3d 变为 arena 上的视图；未加入时使用自己的数组
+        self._arena = None
+        self.arena_slot = None
+        self._coords_3d = coords_3d
         self.stroke_id = stroke_id
 
         self.color = color
         self.is_hovered = False
         self.is_selected = False
-        self.screen_coords = []  # 新增: 存储屏幕坐标 (N,2)
+        self.screen_coords = _NO_SCREEN_COORDS  # 屏幕坐标 (N,2)，由投影缓存维护
+
+    @property
+    def coords_3d(self):
+        if self._arena is not None:
+            return self._arena.view(self.arena_slot)
+        return self._coords_3d
+
+    @coords_3d.setter
+    def coords_3d(self, new_coords):
+        if self._arena is not None:
+            self._arena.update(self.arena_slot, new_coords)
+        else:
+            self._coords_3d = new_coords
+
+    def attach_to_arena(self, arena):
+        """
+        把坐标拷贝进 arena，之后 coords_3d 即为 arena 上的视图。
+        """
+        if self._arena is not None:
+            return
+        self.arena_slot = arena.allocate(self._coords_3d)
+        self._arena = arena
+        self._coords_3d = None
+
+    def bind_to_arena(self, arena, slot):
+        """
+        直接绑定到 arena 中已有数据的 slot (不拷贝)。
+        """
+        self._arena = arena
+        self.arena_slot = slot
+        self._coords_3d = None
+
+    def detach_from_arena(self, free=True):
+        """
+        从 arena 中取回一份独立拷贝并释放 slot (移出 manager / 进入撤销栈时调用)。
+        free=False 时由调用方负责释放 slot (批量移除时一次性释放)。
+        """
+        if self._arena is None:
+            return
+        self._coords_3d = self._arena.view(self.arena_slot).copy()
+        if free:
+            self._arena.free(self.arena_slot)
+        self._arena = None
+        self.arena_slot = None
 
     def get_points(self):
         return self.coords_3d
 
-    def set_status(self, new_status):
-        self.status = new_status
-
     def set_color(self, new_color):
         self.color = new_color
-
-    def set_screen_coordinate(self,new_coordinate):
-        self.screen_coordinate = new_coordinate
@@ -0,0 +1,223 @@
+# data/stroke_coord_arena.py
+
+import numpy as np
+
+
+class StrokeCoordArena:
+    """
+    列式存储的 3D 坐标池:
+      - coords:  (capacity, 3) float32，所有笔画的坐标连续存放
+      - offsets / lengths: 以 slot 为下标，记录每条笔画在 coords 中的区间
+      - alive:   slot 是否在使用
+    Stroke3D 绑定到某个 slot 后，coords_3d 就是 coords 上的视图。
+
+    分配总是追加在 used 之后；释放只留下空洞并把 slot 放回 free list，
+    空洞超过一半时整体压缩(生成新的数组)。每次数组被重新分配或压缩，
+    generation 自增，表示所有 offset 都可能已改变，下游缓存需要全量刷新。
+    """
+
+    def __init__(self, initial_capacity=4096, initial_slots=256):
+        self.coords = np.zeros((initial_capacity, 3), dtype=np.float32)
+        self.used = 0
+        self.hole_count = 0
+
+        self.offsets = np.zeros(initial_slots, dtype=np.int64)
+        self.lengths = np.zeros(initial_slots, dtype=np.int64)
+        self.alive = np.zeros(initial_slots, dtype=bool)
+        self.slot_count = 0
+        self.free_slots = []
+
+        self.generation = 0
+
+    @property
+    def capacity(self):
+        return len(self.coords)
+
+    def __len__(self):
+        return self.slot_count - len(self.free_slots)
+
+    # -----------------------------
+    # 分配 / 释放
+    # -----------------------------
+    def allocate(self, coords):
+        """
+        把 coords 拷贝进池中，返回 slot。
+        """
+        coords = np.asarray(coords, dtype=np.float32).reshape(-1, 3)
+        slot = self._take_slot()
+        self._place(slot, coords)
+        return slot
+
+    def allocate_many(self, coords_list):
+        """
+        批量分配: 所有坐标拼接后一次写入 (最多扩容一次)，返回 slots。
+        """
+        arrays = [np.asarray(c, dtype=np.float32).reshape(-1, 3)
+                  for c in coords_list]
+        if not arrays:
+            return np.empty(0, dtype=np.int64)
+        lengths = np.array([len(a) for a in arrays], dtype=np.int64)
+        slots = np.array([self._take_slot() for _ in arrays], dtype=np.int64)
+        total = int(lengths.sum())
+        self._reserve(self.used + total)
+        off = self.used
+        self.coords[off:off + total] = np.concatenate(arrays)
+        self.offsets[slots] = off + np.concatenate(
+            ([0], np.cumsum(lengths)[:-1]))
+        self.lengths[slots] = lengths
+        self.used += total
+        return slots
+
+    def free_many(self, slots):
+        """
+        批量释放，最后只检查一次是否需要压缩。
+        """
+        slots = np.asarray(slots, dtype=np.int64)
+        slots = slots[self.alive[slots]]
+        if len(slots) == 0:
+            return
+        self.alive[slots] = False
+        self.hole_count += int(self.lengths[slots].sum())
+        self.lengths[slots] = 0
+        self.free_slots.extend(slots.tolist())
+        if self.hole_count > max(1024, self.used // 2):
+            self.compact()
+
+    def free(self, slot):
+        if not self.alive[slot]:
+            return
+        self.alive[slot] = False
+        self.hole_count += int(self.lengths[slot])
+        self.lengths[slot] = 0
+        self.free_slots.append(slot)
+        if self.hole_count > max(1024, self.used // 2):
+            self.compact()
+
+    def update(self, slot, coords):
+        """
+        替换 slot 的坐标。长度不变时原地写入，否则在尾部重新分配区间。
+        """
+        coords = np.asarray(coords, dtype=np.float32).reshape(-1, 3)
+        n = len(coords)
+        if n == self.lengths[slot]:
+            off = self.offsets[slot]
+            self.coords[off:off + n] = coords
+            return
+        self.hole_count += int(self.lengths[slot])
+        self.lengths[slot] = 0
+        self._place(slot, coords)
+
+    def adopt_block(self, coords, lengths):
+        """
+        释放全部 slot，并直接以 coords (例如文件映射上的视图) 作为坐标池，不做拷贝。
+        coords 中按顺序紧密排列 len(lengths) 条笔画，依次占用 slot 0..n-1。
+        :return: slots (n,)
+        """
+        lengths = np.asarray(lengths, dtype=np.int64)
+        n = len(lengths)
+        size = max(len(self.offsets), n)
+        self.offsets = np.zeros(size, dtype=np.int64)
+        self.lengths = np.zeros(size, dtype=np.int64)
+        self.alive = np.zeros(size, dtype=bool)
+        if n:
+            self.offsets[1:n] = np.cumsum(lengths)[:-1]
+        self.lengths[:n] = lengths
+        self.alive[:n] = True
+        self.slot_count = n
+        self.free_slots = []
+
+        self.coords = coords
+        self.used = int(lengths.sum())
+        self.hole_count = 0
+        self.generation += 1
+        return np.arange(n)
+
+    def reset(self):
+        """
+        释放全部 slot。
+        """
+        self.coords = np.zeros(self.coords.shape, dtype=np.float32)
+        self.used = 0
+        self.hole_count = 0
+        self.alive[:] = False
+        self.lengths[:] = 0
+        self.slot_count = 0
+        self.free_slots = []
+        self.generation += 1
+
+    def view(self, slot):
+        off = self.offsets[slot]
+        return self.coords[off:off + self.lengths[slot]]
+
+    def live_slots(self):
+        return np.flatnonzero(self.alive[:self.slot_count])
+
+    # -----------------------------
+    # 内部
+    # -----------------------------
+    def _take_slot(self):
+        if self.free_slots:
+            slot = self.free_slots.pop()
+        else:
+            slot = self.slot_count
+            if slot >= len(self.offsets):
+                grow = len(self.offsets) * 2
+                self.offsets = _grow(self.offsets, grow)
+                self.lengths = _grow(self.lengths, grow)
+                self.alive = _grow(self.alive, grow)
+            self.slot_count += 1
+        self.alive[slot] = True
+        self.lengths[slot] = 0
+        return slot
+
+    def _place(self, slot, coords):
+        n = len(coords)
+        self._reserve(self.used + n)
+        off = self.used
+        self.coords[off:off + n] = coords
+        self.offsets[slot] = off
+        self.lengths[slot] = n
+        self.used += n
+
+    def _reserve(self, needed):
+        if needed <= self.capacity:
+            return
+        # 反正要拷贝一次，顺便把空洞压缩掉
+        target = needed - self.hole_count
+        new_capacity = max(self.capacity, 1)
+        while new_capacity < target:
+            new_capacity *= 2
+        self._repack(new_capacity)
+
+    def compact(self):
+        """
+        按 slot 顺序把存活的坐标重新紧密排列。总是写入新数组，
+        因此之前取出的视图仍然指向旧数据，不会被改写。
+        """
+        self._repack(self.capacity)
+
+    def _repack(self, new_capacity):
+        slots = self.live_slots()
+        lengths = self.lengths[slots]
+        total = int(lengths.sum())
+        new_capacity = max(new_capacity, total)
+
+        new_coords = np.zeros((new_capacity, 3), dtype=np.float32)
+        if total > 0:
+            # 向量化收集: 每个顶点的源下标 = offset + (0..len-1)
+            starts = self.offsets[slots]
+            new_offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+            src = np.repeat(starts - new_offsets, lengths) + np.arange(total)
+            new_coords[:total] = self.coords[src]
+            self.offsets[slots] = new_offsets
+
+        self.coords = new_coords
+        self.used = total
+        self.hole_count = 0
+        self.generation += 1
+
+
+def _grow(arr, size):
+    out = np.zeros(size, dtype=arr.dtype)
+    out[:len(arr)] = arr
+    return out
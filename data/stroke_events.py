@@ -0,0 +1,110 @@
+# data/stroke_events.py
+
+# 事件类型
+STROKES_ADDED = "added"
+STROKES_REMOVED = "removed"
+STROKES_MODIFIED = "modified"
+# 集合被整体替换 (clear / 加载)，strokes 为替换后的全部笔画
+STROKES_RESET = "reset"
+
+
+class StrokeChangeEvent:
+    """
+    一次笔画集合变化:
+      - kind: STROKES_ADDED / STROKES_REMOVED / STROKES_MODIFIED / STROKES_RESET
+      - strokes: 涉及的笔画列表 (批量操作只发一个事件)
+      - version: 发出本事件后管理器的版本号
+    """
+
+    __slots__ = ("kind", "strokes", "version")
+
+    def __init__(self, kind, strokes, version):
+        self.kind = kind
+        self.strokes = strokes
+        self.version = version
+
+
+class StrokeChangeBus:
+    """
+    笔画管理器的变化通知。每次 publish 版本号单调自增，
+    订阅者按注册顺序收到 StrokeChangeEvent，据此增量更新自己的缓存。
+    """
+
+    def __init__(self):
+        self.version = 0
+        self._subscribers = []
+
+    def subscribe(self, callback):
+        """
+        callback(event: StrokeChangeEvent)
+        """
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def publish(self, kind, strokes):
+        self.version += 1
+        event = StrokeChangeEvent(kind, strokes, self.version)
+        for callback in list(self._subscribers):
+            callback(event)
+        return event
+
+
+class StrokeChangeQueue:
+    """
+    订阅者常用的辅助: 先把变化攒起来，到真正需要时 (如下一帧绘制) 再一次性处理。
+    事件到达时就按笔画合并，只保留仍在场笔画的引用与被删除笔画的 id，
+    消费者长时间不取 (如一直在绘制、没有悬停) 时占用的内存也不超过在场笔画集合。
+    RESET 之前的变化没有意义，直接丢弃。
+    """
+
+    def __init__(self):
+        self.bus = None
+        self._clear()
+
+    def _clear(self):
+        self.reset = False
+        self.changed = {}
+        self.removed = set()
+
+    def track(self, bus):
+        """
+        开始跟踪 bus (换了 bus 时返回 True，调用方应全量重建)。
+        """
+        if bus is self.bus:
+            return False
+        if self.bus is not None:
+            self.bus.unsubscribe(self._on_event)
+        self.bus = bus
+        self._clear()
+        bus.subscribe(self._on_event)
+        return True
+
+    def _on_event(self, event):
+        if event.kind == STROKES_RESET:
+            self.reset = True
+            self.changed = {s.stroke_id: s for s in event.strokes}
+            self.removed = set()
+        elif event.kind == STROKES_REMOVED:
+            for s in event.strokes:
+                self.changed.pop(s.stroke_id, None)
+                self.removed.add(s.stroke_id)
+        else:
+            for s in event.strokes:
+                self.changed[s.stroke_id] = s
+                self.removed.discard(s.stroke_id)
+
+    def collect(self):
+        """
+        取出攒下的变化 (按笔画合并):
+        :return: (reset, changed, removed)
+          - reset: 期间发生过整体替换，调用方应全量重建
+          - changed: {stroke_id: stroke} 新增或修改、目前仍在场的笔画
+          - removed: 被删除的 stroke_id 集合 (之后又加回的不在其中，见 changed)
+        """
+        result = (self.reset, self.changed, self.removed)
+        self._clear()
+        return result
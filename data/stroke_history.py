@@ -0,0 +1,303 @@
+# data/stroke_history.py
+
+import os
+from collections import deque
+from contextlib import contextmanager
+from itertools import groupby
+
+import numpy as np
+
+from data.sketch_journal import OP_ADD, OP_REMOVE, OP_TXN, decode_record, \
+    encode_record
+from data.stroke_2d import Stroke2D
+from data.stroke_3d import Stroke3D
+
+_OP_CODES = {"add": OP_ADD, "remove": OP_REMOVE}
+_OP_NAMES = {OP_ADD: "add", OP_REMOVE: "remove"}
+
+# 每条记录/笔画对象 (含坐标数组头) 本身的大致开销 (字节)
+_ENTRY_OVERHEAD = 256
+
+
+def stroke_nbytes(stroke):
+    """
+    估算一条笔画在历史记录中占用的内存。
+    """
+    if isinstance(stroke, Stroke3D):
+        return _ENTRY_OVERHEAD + int(np.asarray(stroke.coords_3d).nbytes)
+    return _ENTRY_OVERHEAD + int(stroke.points_2d.nbytes)
+
+
+def _op_kind(op):
+    return op[0], op[1]
+
+
+class Transaction:
+    """
+    历史中的一条记录: 一组按顺序执行的笔画操作，撤销/重做时作为整体处理。
+      - label: 说明 (如 "add stroke"、"delete selection")
+      - ops: [(dim, op_type, stroke)]，dim 为 2 / 3 对应 2D / 3D 管理器
+      - nbytes: ops 中笔画的估算内存
+    """
+
+    def __init__(self, label=""):
+        self.label = label
+        self.ops = []
+        self.nbytes = 0
+
+    def add(self, dim, op_type, stroke, nbytes=None):
+        if nbytes is None:
+            nbytes = stroke_nbytes(stroke)
+        self.ops.append((dim, op_type, stroke))
+        self.nbytes += nbytes
+
+
+class StrokeHistory:
+    """
+    笔画操作的撤销/重做历史 (命令日志)，以 Transaction 为单位。
+    同一个实例可以被 StrokeManager2D 与 StrokeManager3D 共享 (attach)，
+    这样一次绘制产生的 2D+3D 笔画、一次删除的多条笔画都是一条记录，
+    撤销/重做一次就处理一整条记录，两边不会错位。
+
+    - transaction(label): 上下文管理器，其间管理器记录的操作合并为一条记录 (可嵌套，并入最外层)；
+      不在事务中的单个操作 / 批量操作各自成为一条记录
+    - 撤销/重做时相邻的同类操作合并成一次批量调用 (revert_ops / apply_ops)
+    - budget_bytes: 撤销 + 重做记录中笔画的估算内存上限，记录、撤销、重做后超出时淘汰最旧的撤销记录
+      (撤销栈在内存中为空时再淘汰最远的重做记录)
+    - spill_path: 设置后被淘汰的撤销记录以紧凑二进制形式 (与自动保存日志相同的记录格式)
+      追加到该文件，被淘汰的重做记录追加到 spill_path + ".redo"，内存中的记录用完后
+      再从对应文件尾部取回；未设置时直接丢弃。取回的笔画只保留 id 与坐标。
+    - memory_bytes: 当前历史占用的估算内存
+    """
+
+    def __init__(self, budget_bytes=64 * 1024 * 1024, spill_path=None):
+        self.budget_bytes = budget_bytes
+        # dim -> 管理器
+        self.managers = {}
+        # 右端最新
+        self._undo = deque()
+        self._redo = []
+        self.memory_bytes = 0
+
+        self._open = None
+        self._depth = 0
+
+        self.spill_path = spill_path
+        # 溢出到磁盘的撤销记录 (比内存中的都旧) / 重做记录 (比内存中的都远)
+        self._spilled_undo = None
+        self._spilled_redo = None
+        if spill_path is not None:
+            self._spilled_undo = _SpillStack(spill_path)
+            self._spilled_redo = _SpillStack(spill_path + ".redo")
+
+    def attach(self, manager):
+        """
+        由管理器在构造时调用，之后该管理器的操作都记录到这里。
+        """
+        self.managers[manager.HISTORY_DIM] = manager
+        manager.history = self
+
+    def __len__(self):
+        return len(self._undo) + self.spilled_count
+
+    @property
+    def spilled_count(self):
+        return len(self._spilled_undo) if self.spill_path is not None else 0
+
+    def can_undo(self):
+        return bool(self._undo) or self.spilled_count > 0
+
+    def can_redo(self):
+        return bool(self._redo) or (self.spill_path is not None
+                                    and len(self._spilled_redo) > 0)
+
+    # -----------------------------
+    # 记录
+    # -----------------------------
+    @contextmanager
+    def transaction(self, label=""):
+        """
+        with history.transaction("delete selection"):
+            manager.remove_stroke(...)
+            ...
+        """
+        if self._depth == 0:
+            self._open = Transaction(label)
+        self._depth += 1
+        try:
+            yield self._open
+        finally:
+            self._depth -= 1
+            if self._depth == 0:
+                txn, self._open = self._open, None
+                if txn.ops:
+                    self._push_new(txn)
+
+    def record(self, op_type, stroke, dim):
+        """
+        管理器执行了一次操作: 并入当前事务，或单独成为一条记录。
+        """
+        self.record_many(op_type, [stroke], dim)
+
+    def record_many(self, op_type, strokes, dim):
+        """
+        管理器执行了一次批量操作: 整体并入当前事务，或合成一条记录。
+        """
+        txn = self._open
+        if txn is None:
+            txn = Transaction(op_type)
+        for stroke in strokes:
+            txn.add(dim, op_type, stroke)
+        if self._open is None:
+            self._push_new(txn)
+
+    # -----------------------------
+    # 撤销 / 重做
+    # -----------------------------
+    def undo(self):
+        """
+        撤销最近一条记录 (逆序还原其中每个操作)，转入重做栈并返回它；没有时返回 None。
+        """
+        if self._undo:
+            txn = self._undo.pop()
+        elif self.spilled_count:
+            txn = self._load_spilled(self._spilled_undo)
+        else:
+            return None
+        for (dim, op_type), group in groupby(reversed(txn.ops),
+                                             key=_op_kind):
+            self.managers[dim].revert_ops(op_type, [op[2] for op in group])
+        self._redo.append(txn)
+        self._evict()
+        return txn
+
+    def redo(self):
+        """
+        重做最近被撤销的记录，压回撤销栈并返回它；没有时返回 None。
+        """
+        if self._redo:
+            txn = self._redo.pop()
+        elif self.can_redo():
+            txn = self._load_spilled(self._spilled_redo)
+        else:
+            return None
+        for (dim, op_type), group in groupby(txn.ops, key=_op_kind):
+            self.managers[dim].apply_ops(op_type, [op[2] for op in group])
+        self._undo.append(txn)
+        self._evict()
+        return txn
+
+    def strokes(self, dim):
+        """
+        内存中撤销/重做记录里属于 dim (2 / 3) 管理器的笔画 (不含已溢出到磁盘的记录)。
+        """
+        for txn in list(self._undo) + self._redo:
+            for op_dim, _, stroke in txn.ops:
+                if op_dim == dim:
+                    yield stroke
+
+    def clear(self):
+        self._undo.clear()
+        self._redo.clear()
+        self.memory_bytes = 0
+        if self.spill_path is not None:
+            self._spilled_undo.clear()
+            self._spilled_redo.clear()
+
+    def set_budget(self, budget_bytes):
+        self.budget_bytes = budget_bytes
+        self._evict()
+
+    # -----------------------------
+    # 内部
+    # -----------------------------
+    def _push_new(self, txn):
+        # 新操作使得之前的 redo 历史失效
+        for old in self._redo:
+            self.memory_bytes -= old.nbytes
+        self._redo.clear()
+        if self.spill_path is not None:
+            self._spilled_redo.clear()
+        self._push_undo(txn)
+
+    def _push_undo(self, txn):
+        self._undo.append(txn)
+        self.memory_bytes += txn.nbytes
+        self._evict()
+
+    def _evict(self):
+        while self.memory_bytes > self.budget_bytes:
+            if self._undo:
+                # 最旧的撤销记录比已溢出的都新，压在溢出栈顶
+                txn = self._undo.popleft()
+                spilled = self._spilled_undo
+            elif self._redo:
+                # 最远的重做记录比已溢出的都近
+                txn = self._redo.pop(0)
+                spilled = self._spilled_redo
+            else:
+                break
+            if spilled is not None:
+                spilled.push(txn)
+            self.memory_bytes -= txn.nbytes
+
+    def _load_spilled(self, spilled):
+        txn = spilled.pop()
+        self.memory_bytes += txn.nbytes
+        return txn
+
+
+class _SpillStack:
+    """
+    溢出到磁盘的记录栈 (文件末尾为栈顶)。每条记录是一条 OP_TXN 头
+    (stroke_id 字段存操作数) 后跟每个操作一条带坐标的记录。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        # 每条记录的起始偏移 (末尾为栈顶)
+        self._offsets = []
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def push(self, txn):
+        if self._file is None:
+            self._file = open(self.path, "w+b")
+        f = self._file
+        f.seek(0, os.SEEK_END)
+        self._offsets.append(f.tell())
+        f.write(encode_record(OP_TXN, 2, len(txn.ops)))
+        for dim, op_type, stroke in txn.ops:
+            coords = stroke.coords_3d if dim == 3 else stroke.points_2d
+            f.write(encode_record(_OP_CODES[op_type], dim,
+                                  stroke.stroke_id, coords))
+
+    def pop(self):
+        offset = self._offsets.pop()
+        f = self._file
+        f.seek(offset)
+        data = f.read()
+        f.seek(offset)
+        f.truncate()
+
+        _, _, count, _, pos = decode_record(data, 0)
+        txn = Transaction("spilled")
+        for _ in range(count):
+            op, dim, stroke_id, coords, pos = decode_record(data, pos)
+            coords = coords.copy()
+            if dim == 3:
+                stroke = Stroke3D(coords, stroke_id=stroke_id)
+            else:
+                stroke = Stroke2D(stroke_id, coords)
+            txn.add(dim, _OP_NAMES[op], stroke)
+        return txn
+
+    def clear(self):
+        self._offsets = []
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            if os.path.exists(self.path):
+                os.remove(self.path)
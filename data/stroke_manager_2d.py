@@ -1,35 +1,93 @@
 #data/stroke_manager_2d.py
+from data.stroke_history import StrokeHistory
+from data.stroke_events import StrokeChangeBus, STROKES_ADDED, \
+    STROKES_REMOVED, STROKES_MODIFIED, STROKES_RESET
+
+
 class StrokeManager2D:
-    def __init__(self):
+    HISTORY_DIM = 2
+
+    def __init__(self, history=None):
         # 用字典存放 stroke_id -> stroke_3d
         self.strokes_2d = {}
-        # 记录已生效操作（可被撤销）
-        self.undo_stack = []
-        # 记录已被撤销操作（可被重做）
-        self.redo_stack = []
+        # 撤销/重做历史 (有内存上限，可溢出到磁盘)，可与另一个管理器共享
+        self.history = None
+        (history if history is not None else StrokeHistory()).attach(self)
+        # 笔画集合变化通知 (added / removed / modified / reset)，每次变化版本号自增
+        self.changes = StrokeChangeBus()
+
+    @property
+    def version(self):
+        return self.changes.version
+
+    def _insert_many(self, strokes):
+        if not strokes:
+            return
+        self.strokes_2d.update((s.stroke_id, s) for s in strokes)
+        self.changes.publish(STROKES_ADDED, strokes)
+
+    def _discard_many(self, stroke_ids):
+        strokes = [self.strokes_2d.pop(sid) for sid in stroke_ids
+                   if sid in self.strokes_2d]
+        if strokes:
+            self.changes.publish(STROKES_REMOVED, strokes)
+        return strokes
+
+    def clear(self):
+        """
+        清空所有笔画(不记录撤销)。
+        """
+        self.strokes_2d.clear()
+        self.changes.publish(STROKES_RESET, [])
+
+    def load_strokes(self, strokes):
+        """
+        清空后载入一组笔画 (不记录撤销)，只发一次 reset 通知。
+        """
+        self.strokes_2d = {s.stroke_id: s for s in strokes}
+        self.changes.publish(STROKES_RESET, list(self.strokes_2d.values()))
 
     def add_stroke(self, stroke_2d):
         """
-        添加新的笔画到管理器，并记录到 undo_stack。
-        一旦有新操作发生，需要清空 redo_stack。
+        添加新的笔画到管理器，并记录到撤销历史。
+        一旦有新操作发生，重做历史随之清空。
         """
-        self.strokes_2d[stroke_2d.stroke_id] = stroke_2d
-        # 将本次操作("add", stroke对象)压入 undo 栈
-        self.undo_stack.append(("add", stroke_2d))
-        # 新操作使得之前的 redo 历史失效
-        self.redo_stack.clear()
+        self.add_strokes([stroke_2d])
+
+    def add_strokes(self, strokes):
+        """
+        批量添加: 只发一次变化通知，只记一条撤销记录。
+        """
+        strokes = list(strokes)
+        if not strokes:
+            return
+        self._insert_many(strokes)
+        self.history.record_many("add", strokes, self.HISTORY_DIM)
 
     def remove_stroke(self, stroke_id):
         """
-        移除现有笔画，并记录到 undo_stack。
-        同时清空 redo_stack。
+        移除现有笔画，并记录到撤销历史。
+        同时清空重做历史。
+        """
+        self.remove_strokes([stroke_id])
+
+    def remove_strokes(self, stroke_ids):
+        """
+        批量移除 (不存在的 id 忽略)，只发一次变化通知，只记一条撤销记录。
+        """
+        strokes = self._discard_many(stroke_ids)
+        if strokes:
+            self.history.record_many("remove", strokes, self.HISTORY_DIM)
+
+    def update_stroke_points(self, stroke_id, points_2d):
         """
-        if stroke_id in self.strokes_2d:
-            stroke = self.strokes_2d.pop(stroke_id)
-            # 将本次操作("remove", stroke对象)压入 undo 栈
-            self.undo_stack.append(("remove", stroke))
-            # 同样清空 redo 栈
-            self.redo_stack.clear()
+        替换一条笔画的 2D 点列 (不记录撤销)。
+        """
+        stroke = self.strokes_2d.get(stroke_id)
+        if stroke is None:
+            return
+        stroke.points_2d = points_2d
+        self.changes.publish(STROKES_MODIFIED, [stroke])
 
     def get_stroke_by_id(self, stroke_id):
         return self.strokes_2d.get(stroke_id, None)
@@ -39,53 +97,32 @@ class StrokeManager2D:
 
     def undo(self):
         """
-        撤销最近一次操作：
-          - 如果是添加操作，则在字典中删除该笔画
-          - 如果是移除操作，则在字典中重新添加该笔画
-        同时将“反向操作”压入 redo_stack
+        撤销历史中最近一条记录 (若历史与其他管理器共享，该记录可能同时涉及两边)。
         """
-        if not self.undo_stack:
-            return  # 没有可撤销的操作
+        self.history.undo()
 
-        op_type, stroke = self.undo_stack.pop()
+    def redo(self):
+        """
+        重做最近被撤销的一条记录。
+        """
+        self.history.redo()
 
+    def revert_ops(self, op_type, strokes):
+        """
+        由 history 调用，批量还原同一类操作 (不记录历史)：
+          - 如果是添加操作，则删除这些笔画
+          - 如果是移除操作，则重新添加这些笔画
+        """
         if op_type == "add":
-            # 原操作是 add，这里需要“撤销添加”，即把它从字典中删掉
-            if stroke.stroke_id in self.strokes_2d:
-                self.strokes_2d.pop(stroke.stroke_id)
-            # 并且将对应的反向操作 ("add", stroke) 推入 redo_stack
-            # 注意：反向操作是让“下次 redo”可以把它重新加回来
-            self.redo_stack.append(("add", stroke))
-
+            self._discard_many([s.stroke_id for s in strokes])
         elif op_type == "remove":
-            # 原操作是 remove，这里需要“撤销移除”，把该笔画重新加回来
-            self.strokes_2d[stroke.stroke_id] = stroke
-            # 将对应的反向操作 ("remove", stroke) 推入 redo_stack
-            # 这样下次 redo 时可以再次删掉它
-            self.redo_stack.append(("remove", stroke))
+            self._insert_many(strokes)
 
-    def redo(self):
+    def apply_ops(self, op_type, strokes):
         """
-        重做最近被撤销的操作：
-          - 如果是添加操作，则在字典中再次添加
-          - 如果是移除操作，则在字典中再次删除
-        同时将这个操作（同样是它自身）压回 undo_stack
+        由 history 调用，批量重新执行同一类操作 (不记录历史)。
         """
-        if not self.redo_stack:
-            return  # 没有可重做的操作
-
-        op_type, stroke = self.redo_stack.pop()
-
         if op_type == "add":
-            # 把这个笔画添加回来
-            self.strokes_2d[stroke.stroke_id] = stroke
-            # 将本操作压回到 undo_stack
-            self.undo_stack.append(("add", stroke))
-
+            self._insert_many(strokes)
         elif op_type == "remove":
-            # 把这个笔画删除
-            if stroke.stroke_id in self.strokes_2d:
-                self.strokes_2d.pop(stroke.stroke_id)
-            # 将本操作压回到 undo_stack
-            self.undo_stack.append(("remove", stroke))
-
+            self._discard_many([s.stroke_id for s in strokes])
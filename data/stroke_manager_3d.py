@@ -1,38 +1,130 @@
 #data/stroke_manager_3d.py
 
 from data.stroke_3d import Stroke3D
+from data.stroke_coord_arena import StrokeCoordArena
+from data.stroke_history import StrokeHistory
+from data.stroke_events import StrokeChangeBus, STROKES_ADDED, \
+    STROKES_REMOVED, STROKES_MODIFIED, STROKES_RESET
 
 class StrokeManager3D:
-    def __init__(self):
+    HISTORY_DIM = 3
+
+    def __init__(self, history=None):
         # 用字典存放 stroke_id -> stroke_3d
         self.strokes_3d = {}
-        # 记录已生效操作（可被撤销）
-        self.undo_stack = []
-        # 记录已被撤销操作（可被重做）
-        self.redo_stack = []
+        # 撤销/重做历史 (有内存上限，可溢出到磁盘)，可与另一个管理器共享
+        self.history = None
+        (history if history is not None else StrokeHistory()).attach(self)
+        # 所有在场笔画的坐标连续存放于此，Stroke3D.coords_3d 是其视图
+        self.arena = StrokeCoordArena()
+        # 笔画集合变化通知 (added / removed / modified / reset)，每次变化版本号自增，
+        # 渲染缓冲、投影缓存、空间索引等据此增量更新
+        self.changes = StrokeChangeBus()
+
+    @property
+    def version(self):
+        return self.changes.version
+
+    def _insert_many(self, strokes):
+        """
+        一次性把一组笔画的坐标写入 arena (只扩容/拷贝一次)。
+        """
+        if not strokes:
+            return
+        for stroke_3d in strokes:
+            old = self.strokes_3d.get(stroke_3d.stroke_id)
+            if old is not None and old is not stroke_3d:
+                old.detach_from_arena()
+        fresh = [s for s in strokes if s.arena_slot is None]
+        slots = self.arena.allocate_many([s.coords_3d for s in fresh])
+        for stroke_3d, slot in zip(fresh, slots):
+            stroke_3d.bind_to_arena(self.arena, int(slot))
+        for stroke_3d in strokes:
+            self.strokes_3d[stroke_3d.stroke_id] = stroke_3d
+        self.changes.publish(STROKES_ADDED, strokes)
+
+    def _discard_many(self, stroke_ids):
+        """
+        移除一组笔画: 各自取回独立拷贝，arena 中的 slot 一次性释放。
+        """
+        strokes = [self.strokes_3d.pop(sid) for sid in stroke_ids
+                   if sid in self.strokes_3d]
+        if not strokes:
+            return strokes
+        slots = [s.arena_slot for s in strokes]
+        for stroke in strokes:
+            stroke.detach_from_arena(free=False)
+        self.arena.free_many(slots)
+        self.changes.publish(STROKES_REMOVED, strokes)
+        return strokes
+
+    def clear(self):
+        """
+        清空所有笔画(不记录撤销)。
+        """
+        for stroke in self.strokes_3d.values():
+            stroke.detach_from_arena()
+        self.strokes_3d.clear()
+        self.arena.reset()
+        self.changes.publish(STROKES_RESET, [])
+
+    def load_block(self, stroke_ids, coords, lengths):
+        """
+        清空后直接以 coords 作为坐标池载入笔画 (不拷贝，不记录撤销)。
+        coords 中按 stroke_ids 的顺序紧密排列，每条 lengths[i] 个点。
+        """
+        for stroke in self.strokes_3d.values():
+            stroke.detach_from_arena()
+        self.strokes_3d.clear()
+        slots = self.arena.adopt_block(coords, lengths)
+        for stroke_id, slot in zip(stroke_ids, slots):
+            stroke = Stroke3D(None, stroke_id=stroke_id)
+            stroke.bind_to_arena(self.arena, int(slot))
+            self.strokes_3d[stroke_id] = stroke
+        self.changes.publish(STROKES_RESET, list(self.strokes_3d.values()))
 
     def add_stroke(self, stroke_3d):
         """
-        添加新的笔画到管理器，并记录到 undo_stack。
-        一旦有新操作发生，需要清空 redo_stack。
+        添加新的笔画到管理器，并记录到撤销历史。
+        一旦有新操作发生，重做历史随之清空。
+        """
+        self.add_strokes([stroke_3d])
+
+    def add_strokes(self, strokes):
+        """
+        批量添加: 坐标一次写入 arena，只发一次变化通知，只记一条撤销记录。
         """
-        self.strokes_3d[stroke_3d.stroke_id] = stroke_3d
-        # 将本次操作("add", stroke对象)压入 undo 栈
-        self.undo_stack.append(("add", stroke_3d))
-        # 新操作使得之前的 redo 历史失效
-        self.redo_stack.clear()
+        strokes = list(strokes)
+        if not strokes:
+            return
+        self._insert_many(strokes)
+        self.history.record_many("add", strokes, self.HISTORY_DIM)
 
     def remove_stroke(self, stroke_id):
         """
-        移除现有笔画，并记录到 undo_stack。
-        同时清空 redo_stack。
+        移除现有笔画，并记录到撤销历史。
+        同时清空重做历史。
         """
-        if stroke_id in self.strokes_3d:
-            stroke = self.strokes_3d.pop(stroke_id)
-            # 将本次操作("remove", stroke对象)压入 undo 栈
-            self.undo_stack.append(("remove", stroke))
-            # 同样清空 redo 栈
-            self.redo_stack.clear()
+        self.remove_strokes([stroke_id])
+
+    def remove_strokes(self, stroke_ids):
+        """
+        批量移除 (不存在的 id 忽略)，只发一次变化通知，只记一条撤销记录。
+        """
+        strokes = self._discard_many(stroke_ids)
+        if strokes:
+            self.history.record_many("remove", strokes, self.HISTORY_DIM)
+
+    def update_stroke_coords(self, stroke_id, coords_3d):
+        """
+        替换一条笔画的坐标 (不记录撤销)。点数不变时在 arena 中原地写入，
+        否则在尾部重新分配区间。
+        """
+        stroke = self.strokes_3d.get(stroke_id)
+        if stroke is None:
+            return
+        stroke.coords_3d = coords_3d
+        self.changes.publish(STROKES_MODIFIED, [stroke])
 
     def get_stroke_by_id(self, stroke_id):
         return self.strokes_3d.get(stroke_id, None)
@@ -42,53 +134,32 @@ class StrokeManager3D:
 
     def undo(self):
         """
-        撤销最近一次操作：
-          - 如果是添加操作，则在字典中删除该笔画
-          - 如果是移除操作，则在字典中重新添加该笔画
-        同时将“反向操作”压入 redo_stack
+        撤销历史中最近一条记录 (若历史与其他管理器共享，该记录可能同时涉及两边)。
         """
-        if not self.undo_stack:
-            return  # 没有可撤销的操作
+        self.history.undo()
 
-        op_type, stroke = self.undo_stack.pop()
+    def redo(self):
+        """
+        重做最近被撤销的一条记录。
+        """
+        self.history.redo()
 
+    def revert_ops(self, op_type, strokes):
+        """
+        由 history 调用，批量还原同一类操作 (不记录历史)：
+          - 如果是添加操作，则删除这些笔画
+          - 如果是移除操作，则重新添加这些笔画
+        """
         if op_type == "add":
-            # 原操作是 add，这里需要“撤销添加”，即把它从字典中删掉
-            if stroke.stroke_id in self.strokes_3d:
-                self.strokes_3d.pop(stroke.stroke_id)
-            # 并且将对应的反向操作 ("add", stroke) 推入 redo_stack
-            # 注意：反向操作是让“下次 redo”可以把它重新加回来
-            self.redo_stack.append(("add", stroke))
-
+            self._discard_many([s.stroke_id for s in strokes])
         elif op_type == "remove":
-            # 原操作是 remove，这里需要“撤销移除”，把该笔画重新加回来
-            self.strokes_3d[stroke.stroke_id] = stroke
-            # 将对应的反向操作 ("remove", stroke) 推入 redo_stack
-            # 这样下次 redo 时可以再次删掉它
-            self.redo_stack.append(("remove", stroke))
+            self._insert_many(strokes)
 
-    def redo(self):
+    def apply_ops(self, op_type, strokes):
         """
-        重做最近被撤销的操作：
-          - 如果是添加操作，则在字典中再次添加
-          - 如果是移除操作，则在字典中再次删除
-        同时将这个操作（同样是它自身）压回 undo_stack
+        由 history 调用，批量重新执行同一类操作 (不记录历史)。
         """
-        if not self.redo_stack:
-            return  # 没有可重做的操作
-
-        op_type, stroke = self.redo_stack.pop()
-
         if op_type == "add":
-            # 把这个笔画添加回来
-            self.strokes_3d[stroke.stroke_id] = stroke
-            # 将本操作压回到 undo_stack
-            self.undo_stack.append(("add", stroke))
-
+            self._insert_many(strokes)
         elif op_type == "remove":
-            # 把这个笔画删除
-            if stroke.stroke_id in self.strokes_3d:
-                self.strokes_3d.pop(stroke.stroke_id)
-            # 将本操作压回到 undo_stack
-            self.undo_stack.append(("remove", stroke))
-
+            self._discard_many([s.stroke_id for s in strokes])
@@ -0,0 +1,180 @@
+# data/stroke_stream_loader.py
+
+import codecs
+import json
+import os
+
+import numpy as np
+
+from data.stroke_2d import Stroke2D
+
+
+class LoadCancelled(Exception):
+    pass
+
+
+class _JsonStream:
+    """
+    按块读取的 JSON 扫描器: 只在需要时向缓冲区追加数据，
+    数组元素用 raw_decode 一个个解析，已消费的部分及时丢弃。
+    """
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.json_decoder = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.bytes_read = 0
+
+    def _fill(self):
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        self.bytes_read += len(chunk)
+        if not chunk:
+            self.eof = True
+        # 丢弃已消费的部分
+        self.buf = self.buf[self.pos:] + self.decoder.decode(
+            chunk, final=self.eof)
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            n = len(self.buf)
+            while self.pos < n and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < n:
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, ch):
+        if self.peek() != ch:
+            raise ValueError("expected %r at byte %d" % (ch, self.bytes_read))
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                obj, end = self.json_decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # 数字等可能恰好在缓冲区末尾被截断，读到更多数据后再解析一次
+            if end == len(self.buf) and not self.eof:
+                self._fill()
+                continue
+            self.pos = end
+            return obj
+
+    def items(self):
+        """
+        逐个返回当前数组的元素。
+        """
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            ch = self.peek()
+            self.pos += 1
+            if ch == "]":
+                return
+            if ch != ",":
+                raise ValueError(
+                    "expected ',' or ']' at byte %d" % self.bytes_read)
+
+
+class StagedSketch:
+    """
+    流式读取的结果，提交前与管理器完全无关:
+      - strokes_2d: [Stroke2D]
+      - ids_3d / lengths_3d: 3D 笔画的 id 与点数
+      - coords_3d: (capacity, 3) float32，前 sum(lengths_3d) 行按顺序紧密存放
+    """
+
+    def __init__(self):
+        self.strokes_2d = []
+        self.ids_3d = []
+        self.lengths_3d = []
+        self.coords_3d = np.zeros((1024, 3), dtype=np.float32)
+        self.used_3d = 0
+
+    def append_3d(self, stroke_id, coords):
+        coords = np.asarray(coords, dtype=np.float32).reshape(-1, 3)
+        n = len(coords)
+        needed = self.used_3d + n
+        if needed > len(self.coords_3d):
+            # 1.5 倍增长，峰值内存接近最终大小
+            capacity = len(self.coords_3d)
+            while capacity < needed:
+                capacity += capacity // 2
+            grown = np.zeros((capacity, 3), dtype=np.float32)
+            grown[:self.used_3d] = self.coords_3d[:self.used_3d]
+            self.coords_3d = grown
+        self.coords_3d[self.used_3d:needed] = coords
+        self.used_3d = needed
+        self.ids_3d.append(stroke_id)
+        self.lengths_3d.append(n)
+
+
+def read_strokes_streaming(filepath, progress_callback=None,
+                           is_cancelled=None, chunk_size=1 << 20):
+    """
+    流式读取 StrokeFileManager 的 JSON 文件，一次只解析一条笔画。
+    :param progress_callback: callback(fraction) 0~1，按已读字节计
+    :param is_cancelled: 返回 True 时中止读取并抛出 LoadCancelled
+    :return: StagedSketch
+    """
+    total = max(os.path.getsize(filepath), 1)
+    staged = StagedSketch()
+    last_read = [-1]
+
+    def tick(stream):
+        # 每读入一个新的块检查一次
+        if stream.bytes_read == last_read[0]:
+            return
+        last_read[0] = stream.bytes_read
+        if is_cancelled is not None and is_cancelled():
+            raise LoadCancelled(filepath)
+        if progress_callback is not None:
+            progress_callback(min(stream.bytes_read / total, 1.0))
+
+    with open(filepath, "rb") as f:
+        stream = _JsonStream(f, chunk_size)
+        stream.expect("{")
+        if stream.peek() == "}":
+            return staged
+        while True:
+            key = stream.value()
+            stream.expect(":")
+            if key == "strokes_2d":
+                for s2d_dict in stream.items():
+                    staged.strokes_2d.append(Stroke2D(
+                        s2d_dict["stroke_id"], s2d_dict["points_2d"]))
+                    tick(stream)
+            elif key == "strokes_3d":
+                for s3d_dict in stream.items():
+                    staged.append_3d(s3d_dict["stroke_id"],
+                                     s3d_dict["coords_3d"])
+                    tick(stream)
+            else:
+                stream.value()
+            ch = stream.peek()
+            stream.pos += 1
+            if ch == "}":
+                break
+            if ch != ",":
+                raise ValueError(
+                    "expected ',' or '}' at byte %d" % stream.bytes_read)
+
+    if progress_callback is not None:
+        progress_callback(1.0)
+    return staged
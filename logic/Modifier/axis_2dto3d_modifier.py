@@ -5,6 +5,8 @@ from .base_modifier import BaseModifier
 from data.stroke_3d import Stroke3D
 from logic.stroke_2d_to_3d import \
     convert_2d_stroke_to_3d
+from logic.stroke_intersection import \
+    find_stroke_intersections, nearest_intersection
 
 
 class Axis2Dto3DModifier(BaseModifier):
@@ -39,15 +41,51 @@ class Axis2Dto3DModifier(BaseModifier):
         if len(pts) < 2:
             return stroke2d  # 无法构成线
 
-        p0 = np.array(pts[0],
-                      dtype=float)
-        p1 = np.array(pts[-1],
-                      dtype=float)
-        init_dir = p1 - p0
-        if np.linalg.norm(
-                init_dir) < 1e-9:
+        vanish_pts = self.get_axis_vanishing_points(
+            canvas_widget.get_camera())
+        snapped = self.snap_endpoints_to_axis(
+            pts[0], pts[-1], vanish_pts)
+        if snapped is None:
             return stroke2d
 
+        best_axis, endpoints = snapped
+        stroke2d.meta[
+            'axis'] = best_axis  # 记录所选轴
+        if endpoints is None:
+            return stroke2d
+        # 最后只保留2个端点
+        stroke2d.points_2d = endpoints
+        return stroke2d
+
+    def apply_2d_incremental(self, stroke2d, points, dirty_from, state,
+                             canvas_widget):
+        """
+        结果只取决于首尾两点: 每次只重算两个端点，与笔画长度无关。
+        消失点在相机不变时缓存在 state 中。
+        """
+        if len(points) < 2:
+            return points, dirty_from
+
+        camera = canvas_widget.get_camera()
+        if state.get('camera_key') != camera.key:
+            state['vanish_pts'] = self.get_axis_vanishing_points(camera)
+            state['camera_key'] = camera.key
+
+        snapped = self.snap_endpoints_to_axis(
+            points[0], points[-1], state['vanish_pts'])
+        if snapped is None:
+            return points, 0
+
+        best_axis, endpoints = snapped
+        stroke2d.meta['axis'] = best_axis
+        if endpoints is None:
+            return points, 0
+        return endpoints, 0
+
+    def get_axis_vanishing_points(self, camera):
+        """
+        x,y,z 三个轴在当前相机下的消失点 (屏幕坐标)
+        """
         axis_candidates = ["x",
                            "y",
                            "z",]
@@ -56,7 +94,25 @@ class Axis2Dto3DModifier(BaseModifier):
             vanish_pts[
                 axis_name] = self.get_vanishing_point_screen(
                 axis_name,
-                canvas_widget)
+                camera)
+        return vanish_pts
+
+    def snap_endpoints_to_axis(self, first_pt, last_pt, vanish_pts):
+        """
+        - 分别把各轴消失点与起点相连得到候选方向
+        - 选与用户初始绘制方向 (起点->终点) 夹角最小的一条
+        - 把终点投影到该直线上
+        :return: (best_axis, (2,2) [起点, 投影后的终点]) 或 None (笔画方向退化);
+                 候选方向退化时端点为 None
+        """
+        p0 = np.array(first_pt,
+                      dtype=float)
+        p1 = np.array(last_pt,
+                      dtype=float)
+        init_dir = p1 - p0
+        if np.linalg.norm(
+                init_dir) < 1e-9:
+            return None
 
         # 计算与笔画起点相连的方向向量
         cand_dirs = {}
@@ -82,34 +138,25 @@ class Axis2Dto3DModifier(BaseModifier):
                 best_cos = c
                 best_axis = aname
 
-        stroke2d.meta[
-            'axis'] = best_axis  # 记录所选轴
+        if best_axis is None:
+            return None
 
         chosen_dir = cand_dirs[best_axis]
         norm_dir = np.linalg.norm(
             chosen_dir)
         if norm_dir < 1e-9:
-            return stroke2d
+            return best_axis, None
 
         dir_unit = chosen_dir / norm_dir
 
-        # 把所有点投影到 p0 + t*dir_unit
-        proj_pts = []
-        for p in pts:
-            v_p = p - p0
-            t = np.dot(v_p, dir_unit)
-            new_p = p0 + t * dir_unit
-            proj_pts.append(
-                (new_p[0], new_p[1]))
-
-        # 最后只保留2个端点
-        stroke2d.points_2d = [
-            proj_pts[0], proj_pts[-1]]
-        return stroke2d
+        # 把终点投影到 p0 + t*dir_unit (起点投影后仍是自身)
+        t = np.dot(p1 - p0, dir_unit)
+        new_p1 = p0 + t * dir_unit
+        return best_axis, np.array([p0, new_p1], dtype=np.float32)
 
     def get_vanishing_point_screen(self,
                                    axis_name,
-                                   canvas_widget):
+                                   camera):
         """
         在世界坐标中取一个极远点, 正负方向:
          'x+' => (1e6, 0, 0)
@@ -132,7 +179,7 @@ class Axis2Dto3DModifier(BaseModifier):
                 dtype=float)
 
         return self.project_point_3d_to_2d(
-            world_pt, canvas_widget)
+            world_pt, camera)
 
     # -----------------------------
     # 2) apply_2dto3d
@@ -153,89 +200,48 @@ class Axis2Dto3DModifier(BaseModifier):
         axis = stroke2d.meta.get('axis',
                                  'x')  # 默认x
 
+        # 本次提交只取一次相机快照 (MVP 与逆矩阵只算一次)
+        camera = canvas_widget.get_camera()
+
         p0_2d = np.array(pts2d[0],
                          dtype=float)
         p1_2d = np.array(pts2d[1],
                          dtype=float)
 
-        # step1: 查找相交
-        existing_3d_strokes = canvas_widget.stroke_manager_3d.get_all_strokes()
-
-        intersections = []  # 存储 (dist, inter_pt, stroke3d)
-
-        for s3d in existing_3d_strokes:
-            if len(s3d.coords_3d) < 2:
-                continue
-
-            e = 1e-2
-            s3d_p0 = np.array(s3d.coords_3d[0],
-                             dtype=float)
-            s3d_p1= np.array(s3d.coords_3d[-1], dtype=float)
-
-            direction = s3d_p1 - s3d_p0
-            unit_direction = direction / np.linalg.norm(
-                direction)
-
-            # Extend the line
-            new_p1 = s3d_p0 - e * unit_direction
-            new_p2 = s3d_p1 + e * unit_direction
-
-
-            extends3d = Stroke3D([new_p1,new_p2])
-            line2d = self.project_3d_line_to_2d(
-                extends3d, canvas_widget)
-            if len(line2d) < 2:
-                continue
-            # 这里只取首尾
-            L0_2d = np.array(line2d[0],
-                             dtype=float)
-            L1_2d = np.array(line2d[-1],
-                             dtype=float)
-
-            inter_pt = self.intersect_2d_lines(
-                p0_2d, p1_2d, L0_2d,
-                L1_2d)
-            if inter_pt is not None:
-                # 计算 inter_pt 到 p0_2d 的距离
-                dist_to_p0 = np.linalg.norm(
-                    inter_pt - p0_2d)
-                intersections.append((
-                                     dist_to_p0,
-                                     inter_pt,
-                                     s3d))
+        # step1: 查找相交 (所有已有笔画一次性投影 + 求交)
+        existing_endpoints = canvas_widget.get_stroke_endpoints()
+        hit_strokes, inter_pts = find_stroke_intersections(
+            p0_2d, p1_2d, existing_endpoints, camera)
+
         # step2: 如果有 anchor_3d, 则对线段两端做 "反投影 + 轴对齐"
-        if len(intersections) > 0:
+        nearest = nearest_intersection(inter_pts, p0_2d)
+        if nearest is not None:
             # 选距离 p0_2d 最小的
-            intersections.sort(
-                key=lambda x: x[
-                    0])  # dist ascending
-            chosen_inter_pt = \
-            intersections[0][1]  # 2D相交点
-            chosen_s3d = \
-            intersections[0][2]  # 对应线段
+            chosen_inter_pt = inter_pts[nearest]  # 2D相交点
+            chosen_s3d = hit_strokes[nearest]  # 对应线段
 
             # 将 chosen_inter_pt 反投影到 chosen_s3d
             anchor_3d = self.unproject_2d_point_onto_3d_line(
                 chosen_inter_pt,
                 chosen_s3d,
-                canvas_widget)
+                camera)
 
             p0_3d = self.reproject_axis_line_2dpt_to_3d(
                 p0_2d, axis,
                 anchor_3d,
-                canvas_widget)
+                camera)
             p1_3d = self.reproject_axis_line_2dpt_to_3d(
                 p1_2d, axis,
                 anchor_3d,
-                canvas_widget)
+                camera)
         else:
             # step3: 无相交 -> 线段首点落地, 整条线对齐 axis
             p0_3d = self.lift_to_ground_plane(
-                p0_2d, canvas_widget)
+                p0_2d, camera)
             # 由于是 axis 对齐, p0_3d就是 anchor, 再投 p1_2d
             p1_3d = self.reproject_axis_line_2dpt_to_3d(
                 p1_2d, axis, p0_3d,
-                canvas_widget)
+                camera)
 
         coords_3d = np.array(
             [p0_3d, p1_3d],
@@ -248,46 +254,14 @@ class Axis2Dto3DModifier(BaseModifier):
     # 反投影: 将 2D 点 (u,v) 变为 3D 射线与 y=0 平面求交 (真正的射线-平面交点)
     # =================================================================
     def lift_to_ground_plane(self, pt2d,
-                             canvas_widget):
+                             camera):
         """
         通过完整的 'near/far clip -> inv(MVP)' 流程，将 (u,v) 反投影到 y=0 平面。
         """
-        u, v = pt2d
-        renderer = canvas_widget.renderer
-        w, h = canvas_widget.width(), canvas_widget.height()
-
-        # 1) 转换到 NDC
-        x_ndc = (u / w) * 2.0 - 1.0
-        y_ndc = 1.0 - (v / h) * 2.0
-
-        # 构造 near/far clip
-        near_clip = np.array(
-            [x_ndc, y_ndc, -1.0, 1.0],
-            dtype=np.float32)
-        far_clip = np.array(
-            [x_ndc, y_ndc, 1.0, 1.0],
-            dtype=np.float32)
+        # 1) 屏幕点 -> NDC near/far -> inv(MVP), 逆矩阵由相机快照预先算好
+        ray_origin, ray_dir = camera.screen_ray(pt2d)
 
-        # 2) 逆 MVP
-        proj = renderer.projection_matrix  # 4x4
-        view = renderer.view_matrix  # 4x4
-        mvp = proj @ view  # model=I
-        inv_mvp = np.linalg.inv(mvp)
-
-        # 3) 反变换到世界坐标
-        near_world = inv_mvp @ near_clip
-        far_world = inv_mvp @ far_clip
-        if abs(near_world[3]) > 1e-9:
-            near_world /= near_world[3]
-        if abs(far_world[3]) > 1e-9:
-            far_world /= far_world[3]
-
-        ray_origin = near_world[
-                     :3]  # (x,y,z)
-        ray_dir = far_world[
-                  :3] - ray_origin
-
-        # 4) 求与 y=0 平面交点
+        # 2) 求与 y=0 平面交点
         if abs(ray_dir[1]) < 1e-9:
             # 平行或近似平行
             return (ray_origin[0], 0.0,
@@ -310,7 +284,7 @@ class Axis2Dto3DModifier(BaseModifier):
     # =================================================================
     def reproject_axis_line_2dpt_to_3d(
             self, pt2d, axis, anchor_3d,
-            canvas_widget):
+            camera):
         """
         如果笔画对齐 'x' 轴 => 在世界中 (X, anchor_3d.y, anchor_3d.z).
         我们用完整的 2D->3D 反投影拿到 (X',Y',Z') 然后在 yz 上对齐 anchor_3d 的 yz, 仅 x 保持射线计算.
@@ -324,34 +298,8 @@ class Axis2Dto3DModifier(BaseModifier):
 
         示例: axis='x' => Y(t)=anchor_3d.y, Z(t)=anchor_3d.z => 两个方程 => 这个射线只要能同时满足 => 我们得到 t => X(t).
         """
-        # 1) 先拿到 camera + MVP
-        renderer = canvas_widget.renderer
-        w, h = canvas_widget.width(), canvas_widget.height()
-
-        # 2) 构造射线(与 lift_to_ground_plane 同)
-        u, v = pt2d
-        x_ndc = (u / w) * 2.0 - 1.0
-        y_ndc = 1.0 - (v / h) * 2.0
-        near_clip = np.array(
-            [x_ndc, y_ndc, -1, 1],
-            dtype=np.float32)
-        far_clip = np.array(
-            [x_ndc, y_ndc, 1, 1],
-            dtype=np.float32)
-
-        mvp = renderer.projection_matrix @ renderer.view_matrix
-        inv_mvp = np.linalg.inv(mvp)
-
-        near_world = inv_mvp @ near_clip
-        far_world = inv_mvp @ far_clip
-        if abs(near_world[3]) > 1e-9:
-            near_world /= near_world[3]
-        if abs(far_world[3]) > 1e-9:
-            far_world /= far_world[3]
-
-        ray_origin = near_world[:3]
-        ray_dir = far_world[
-                  :3] - ray_origin
+        # 1) + 2) 用相机快照构造射线
+        ray_origin, ray_dir = camera.screen_ray(pt2d)
 
         # 3) 求 axis 对齐下的交点.
         #    设 param = t,  world_pt(t) = ray_origin + t*ray_dir
@@ -498,7 +446,7 @@ class Axis2Dto3DModifier(BaseModifier):
 
     def unproject_2d_point_onto_3d_line(
             self, inter_pt, stroke3d,
-            canvas_widget):
+            camera):
         """
         假设 stroke3d.coords_3d = [L0_3d, L1_3d] 表示一条 3D 线段。
         step:
@@ -511,7 +459,7 @@ class Axis2Dto3DModifier(BaseModifier):
         """
         # 1) 先构造 2D->3D 射线
         r_o, r_d = self.build_ray_from_screen_pt(
-            inter_pt, canvas_widget)
+            inter_pt, camera)
 
         # 2) 线段: P(t)= L0 + t*(L1-L0), t in [0,1]
         L0_3d = stroke3d.coords_3d[0]
@@ -552,78 +500,28 @@ class Axis2Dto3DModifier(BaseModifier):
 
     def build_ray_from_screen_pt(self,
                                  pt2d,
-                                 canvas_widget):
+                                 camera):
         """
         构建 "从相机出发" 的3D射线: r_o, r_d
         """
-        renderer = canvas_widget.renderer
-        w, h = canvas_widget.width(), canvas_widget.height()
-        x_ndc = (pt2d[
-                     0] / w) * 2.0 - 1.0
-        y_ndc = 1.0 - (
-                    pt2d[1] / h) * 2.0
-        near_clip = np.array(
-            [x_ndc, y_ndc, -1, 1],
-            dtype=np.float32)
-        far_clip = np.array(
-            [x_ndc, y_ndc, 1, 1],
-            dtype=np.float32)
-
-        mvp = renderer.projection_matrix @ renderer.view_matrix
-        inv_mvp = np.linalg.inv(mvp)
-
-        p_near = inv_mvp @ near_clip
-        p_far = inv_mvp @ far_clip
-        if abs(p_near[3]) > 1e-9:
-            p_near /= p_near[3]
-        if abs(p_far[3]) > 1e-9:
-            p_far /= p_far[3]
-
-        r_o = p_near[:3]  # origin
-        r_d = p_far[
-              :3] - r_o  # direction
-        return r_o, r_d
+        return camera.screen_ray(pt2d)
 
     # =================================================================
     # 投影相关:  project_point_3d_to_2d / project_3d_line_to_2d
     # =================================================================
     def project_point_3d_to_2d(self,
                                pt3d,
-                               canvas_widget):
+                               camera):
         """
-        用 renderer.projection_matrix/view_matrix 做 MVP 投影，得到(u,v)屏幕坐标
+        用相机快照中的 MVP 投影，得到(u,v)屏幕坐标
         """
-        renderer = canvas_widget.renderer
-        proj = renderer.projection_matrix  # 4x4
-        view = renderer.view_matrix  # 4x4
-        w, h = canvas_widget.width(), canvas_widget.height()
-
-        mvp = proj @ view
-        p4 = np.array(
-            [pt3d[0], pt3d[1], pt3d[2],
-             1.0], dtype=np.float32)
-        clip = mvp @ p4
-        if abs(clip[3]) < 1e-9:
-            return np.array(
-                [9999.0, 9999.0],
-                dtype=float)
-        ndc = clip[:3] / clip[3]
-        u_ = (ndc[0] * 0.5 + 0.5) * w
-        v_ = (1.0 - (ndc[
-                         1] * 0.5 + 0.5)) * h
-        return np.array([u_, v_],
-                        dtype=float)
+        return camera.project_point(pt3d)
 
     def project_3d_line_to_2d(self,
                               stroke3d,
-                              canvas_widget):
-        coords = stroke3d.coords_3d
-        pts2d = []
-        for c in coords:
-            pts2d.append(
-                self.project_point_3d_to_2d(
-                    c, canvas_widget))
-        return pts2d
+                              camera):
+        return list(camera.project_points(
+            stroke3d.coords_3d))
 
     # =================================================================
     # 线段相交(2D)
@@ -5,7 +5,8 @@ class BaseModifier:
     所有Modifier的基类。包含：
       - mod_id: 唯一标识
       - enable_toggle_list: 依赖的FeatureToggle名称列表
-    并提供apply_2d, apply_2dto3d, apply_3d三个方法的空实现。
+    并提供apply_2d, apply_2dto3d, apply_3d三个方法的空实现，
+    以及绘制过程中使用的 apply_2d_incremental。
     """
     def __init__(self, mod_id, enable_toggle_list=None):
         self.mod_id = mod_id
@@ -27,6 +28,27 @@ class BaseModifier:
         """
         return stroke2d
 
+    def apply_2d_incremental(self, stroke2d, points, dirty_from, state,
+                             canvas_widget):
+        """
+        绘制过程中的增量 2D 处理 (实时预览用)。
+        :param stroke2d: 预览用的 Stroke2D，只用来读写 meta
+        :param points: 上一级的完整输出，(n,2) float32 (只读，不要原地修改)
+        :param dirty_from: points 中从该下标起是新增或有变化的点
+        :param state: dict，同一条笔画期间由 StrokeProcessor 保存，供子类缓存中间结果
+        :return: (out_points (m,2), out_dirty_from)
+
+        默认实现对整条笔画重新调用 apply_2d (没有增量能力的 Modifier 仍然可用)，
+        子类应覆盖它，只处理 dirty_from 之后的点。
+        """
+        from data.stroke_2d import Stroke2D
+        tmp = Stroke2D(stroke2d.stroke_id, points.copy())
+        tmp.meta = stroke2d.meta
+        out = self.apply_2d(tmp, canvas_widget)
+        if out is None:
+            out = tmp
+        return out.points_2d, 0
+
     def apply_2dto3d(self, stroke2d, canvas_width, canvas_height,
                      projection_matrix, view_matrix, model_matrix):
         """
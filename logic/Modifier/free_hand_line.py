@@ -3,6 +3,8 @@ from .base_modifier import BaseModifier
 from data.stroke_3d import Stroke3D
 from logic.stroke_2d_to_3d import \
     convert_2d_stroke_to_3d
+from logic.stroke_intersection import \
+    find_stroke_intersections, nearest_intersection
 
 
 class FreeHandModifier(BaseModifier):
@@ -34,19 +36,22 @@ class FreeHandModifier(BaseModifier):
         if len(pts) < 2:
             return stroke2d  # 无法构成线
 
-        p0 = np.array(pts[0],
-                      dtype=float)
-        p1 = np.array(pts[-1],
-                      dtype=float)
-
         # 最后只保留2个端点
-        stroke2d.points_2d = [
-            p0, p1]
+        stroke2d.points_2d = pts[[0, -1]]
         return stroke2d
 
+    def apply_2d_incremental(self, stroke2d, points, dirty_from, state,
+                             canvas_widget):
+        """
+        只保留首尾两点，增量模式下同样是 O(1)。
+        """
+        if len(points) < 2:
+            return points, dirty_from
+        return points[[0, -1]], 0
+
     def get_vanishing_point_screen(self,
                                    axis_name,
-                                   canvas_widget):
+                                   camera):
         """
         在世界坐标中取一个极远点, 正负方向:
          'x+' => (1e6, 0, 0)
@@ -69,7 +74,7 @@ class FreeHandModifier(BaseModifier):
                 dtype=float)
 
         return self.project_point_3d_to_2d(
-            world_pt, canvas_widget)
+            world_pt, camera)
 
     # -----------------------------
     # 2) apply_2dto3d
@@ -90,89 +95,42 @@ class FreeHandModifier(BaseModifier):
         axis = stroke2d.meta.get('axis',
                                  'x')  # 默认x
 
+        # 本次提交只取一次相机快照 (MVP 与逆矩阵只算一次)
+        camera = canvas_widget.get_camera()
+
         p0_2d = np.array(pts2d[0],
                          dtype=float)
         p1_2d = np.array(pts2d[1],
                          dtype=float)
 
-        # step1: 查找相交
-        existing_3d_strokes = canvas_widget.stroke_manager_3d.get_all_strokes()
-
-        intersections = []  # 存储 (dist, inter_pt, stroke3d)
-
-        for s3d in existing_3d_strokes:
-            if len(s3d.coords_3d) < 2:
-                continue
-
-            e = 1e-2
-            s3d_p0 = np.array(s3d.coords_3d[0],
-                             dtype=float)
-            s3d_p1= np.array(s3d.coords_3d[-1], dtype=float)
-
-            direction = s3d_p1 - s3d_p0
-            unit_direction = direction / np.linalg.norm(
-                direction)
-
-            # Extend the line
-            new_p1 = s3d_p0 - e * unit_direction
-            new_p2 = s3d_p1 + e * unit_direction
-
-
-            extends3d = Stroke3D([new_p1,new_p2])
-            line2d = self.project_3d_line_to_2d(
-                extends3d, canvas_widget)
-            if len(line2d) < 2:
-                continue
-            # 这里只取首尾
-            L0_2d = np.array(line2d[0],
-                             dtype=float)
-            L1_2d = np.array(line2d[-1],
-                             dtype=float)
-
-            inter_pt = self.intersect_2d_lines(
-                p0_2d, p1_2d, L0_2d,
-                L1_2d)
-            if inter_pt is not None:
-                # 计算 inter_pt 到 p0_2d 的距离
-                dist_to_p0 = np.linalg.norm(inter_pt - p0_2d)
-                dist_to_p1 = np.linalg.norm(inter_pt - p1_2d)
-                intersections.append((
-                                     dist_to_p0,
-                                     dist_to_p1,
-                                     inter_pt,
-                                     s3d))
+        # step1: 查找相交 (所有已有笔画一次性投影 + 求交)
+        existing_endpoints = canvas_widget.get_stroke_endpoints()
+        hit_strokes, inter_pts = find_stroke_intersections(
+            p0_2d, p1_2d, existing_endpoints, camera)
+
         # step2: 如果有 anchor_3d, 则对线段两端做 "反投影 + 轴对齐"
-        if len(intersections) > 1:
+        if len(hit_strokes) > 1:
             # 选距离 p0_2d 最小的
-            intersections.sort(
-                key=lambda x: x[
-                    0])  # dist ascending
-            chosen_inter_pt_0 = \
-            intersections[0][2]  # 2D相交点
-            chosen_s3d_0 = \
-            intersections[0][3]  # 对应线段
+            nearest_0 = nearest_intersection(inter_pts, p0_2d)
+            chosen_inter_pt_0 = inter_pts[nearest_0]  # 2D相交点
+            chosen_s3d_0 = hit_strokes[nearest_0]  # 对应线段
 
             # 将 chosen_inter_pt 反投影到 chosen_s3d
             anchor_3d1 = self.unproject_2d_point_onto_3d_line(
                 chosen_inter_pt_0,
                 chosen_s3d_0,
-                canvas_widget)
-
-            intersections.sort(
-                key=lambda x: x[
-                    1])  # dist ascending
-            chosen_inter_pt_1 = \
-                intersections[0][
-                    2]  # 2D相交点
-            chosen_s3d_1 = \
-                intersections[0][
-                    3]  # 对应线段
+                camera)
+
+            # 选距离 p1_2d 最小的
+            nearest_1 = nearest_intersection(inter_pts, p1_2d)
+            chosen_inter_pt_1 = inter_pts[nearest_1]  # 2D相交点
+            chosen_s3d_1 = hit_strokes[nearest_1]  # 对应线段
 
             # 将 chosen_inter_pt 反投影到 chosen_s3d
             anchor_3d2 = self.unproject_2d_point_onto_3d_line(
                 chosen_inter_pt_1,
                 chosen_s3d_1,
-                canvas_widget)
+                camera)
 
             pred_coords_3d = np.array(
             [anchor_3d1, anchor_3d2],
@@ -180,10 +138,10 @@ class FreeHandModifier(BaseModifier):
             pred3d = Stroke3D(pred_coords_3d)
             p0_3d = self.unproject_2d_point_onto_3d_line(
                 p0_2d, pred3d,
-                canvas_widget)
+                camera)
             p1_3d = self.unproject_2d_point_onto_3d_line(
                 p1_2d, pred3d,
-                canvas_widget)
+                camera)
         else:
             return None
 
@@ -202,7 +160,7 @@ class FreeHandModifier(BaseModifier):
     # =================================================================
     def unproject_2d_point_onto_3d_line(
             self, inter_pt, stroke3d,
-            canvas_widget):
+            camera):
         """
         假设 stroke3d.coords_3d = [L0_3d, L1_3d] 表示一条 3D 线段。
         step:
@@ -215,7 +173,7 @@ class FreeHandModifier(BaseModifier):
         """
         # 1) 先构造 2D->3D 射线
         r_o, r_d = self.build_ray_from_screen_pt(
-            inter_pt, canvas_widget)
+            inter_pt, camera)
 
         # 2) 线段: P(t)= L0 + t*(L1-L0), t in [0,1]
         L0_3d = stroke3d.coords_3d[0]
@@ -251,78 +209,28 @@ class FreeHandModifier(BaseModifier):
 
     def build_ray_from_screen_pt(self,
                                  pt2d,
-                                 canvas_widget):
+                                 camera):
         """
         构建 "从相机出发" 的3D射线: r_o, r_d
         """
-        renderer = canvas_widget.renderer
-        w, h = canvas_widget.width(), canvas_widget.height()
-        x_ndc = (pt2d[
-                     0] / w) * 2.0 - 1.0
-        y_ndc = 1.0 - (
-                    pt2d[1] / h) * 2.0
-        near_clip = np.array(
-            [x_ndc, y_ndc, -1, 1],
-            dtype=np.float32)
-        far_clip = np.array(
-            [x_ndc, y_ndc, 1, 1],
-            dtype=np.float32)
-
-        mvp = renderer.projection_matrix @ renderer.view_matrix
-        inv_mvp = np.linalg.inv(mvp)
-
-        p_near = inv_mvp @ near_clip
-        p_far = inv_mvp @ far_clip
-        if abs(p_near[3]) > 1e-9:
-            p_near /= p_near[3]
-        if abs(p_far[3]) > 1e-9:
-            p_far /= p_far[3]
-
-        r_o = p_near[:3]  # origin
-        r_d = p_far[
-              :3] - r_o  # direction
-        return r_o, r_d
+        return camera.screen_ray(pt2d)
 
     # =================================================================
     # 投影相关:  project_point_3d_to_2d / project_3d_line_to_2d
     # =================================================================
     def project_point_3d_to_2d(self,
                                pt3d,
-                               canvas_widget):
+                               camera):
         """
-        用 renderer.projection_matrix/view_matrix 做 MVP 投影，得到(u,v)屏幕坐标
+        用相机快照中的 MVP 投影，得到(u,v)屏幕坐标
         """
-        renderer = canvas_widget.renderer
-        proj = renderer.projection_matrix  # 4x4
-        view = renderer.view_matrix  # 4x4
-        w, h = canvas_widget.width(), canvas_widget.height()
-
-        mvp = proj @ view
-        p4 = np.array(
-            [pt3d[0], pt3d[1], pt3d[2],
-             1.0], dtype=np.float32)
-        clip = mvp @ p4
-        if abs(clip[3]) < 1e-9:
-            return np.array(
-                [9999.0, 9999.0],
-                dtype=float)
-        ndc = clip[:3] / clip[3]
-        u_ = (ndc[0] * 0.5 + 0.5) * w
-        v_ = (1.0 - (ndc[
-                         1] * 0.5 + 0.5)) * h
-        return np.array([u_, v_],
-                        dtype=float)
+        return camera.project_point(pt3d)
 
     def project_3d_line_to_2d(self,
                               stroke3d,
-                              canvas_widget):
-        coords = stroke3d.coords_3d
-        pts2d = []
-        for c in coords:
-            pts2d.append(
-                self.project_point_3d_to_2d(
-                    c, canvas_widget))
-        return pts2d
+                              camera):
+        return list(camera.project_points(
+            stroke3d.coords_3d))
 
     # =================================================================
     # 线段相交(2D)
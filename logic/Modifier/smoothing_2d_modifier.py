@@ -1,8 +1,7 @@
 # logic/modifiers/smoothing_2d_modifier.py
 
-from data.stroke_2d import Stroke2D
+from data.stroke_2d import PointBuffer2D
 from .base_modifier import BaseModifier
-from data.stroke_2d import Stroke2D
 class Smoothing2DModifier(BaseModifier):
     """
     mod_id = "smooth_2d", enable_toggle_list = ["debounce"]
@@ -19,14 +18,41 @@ class Smoothing2DModifier(BaseModifier):
         if len(points) < 3:
             return stroke2d
 
-        smoothed_pts = []
-        for i in range(len(points)):
-            if i==0 or i==len(points)-1:
-                smoothed_pts.append(points[i])
-            else:
-                x_avg = (points[i-1][0] + points[i][0] + points[i+1][0]) / 3.0
-                y_avg = (points[i-1][1] + points[i][1] + points[i+1][1]) / 3.0
-                smoothed_pts.append((x_avg, y_avg))
+        # 首尾点不变，中间每个点取相邻三点的平均
+        smoothed_pts = points.copy()
+        smoothed_pts[1:-1] = (points[:-2] + points[1:-1] + points[2:]) / 3.0
 
         stroke2d.points_2d = smoothed_pts
         return stroke2d
+
+    def apply_2d_incremental(self, stroke2d, points, dirty_from, state,
+                             canvas_widget):
+        """
+        第 i 个输出点只依赖输入的 i-1, i, i+1，
+        因此输入从 dirty_from 起变化时，只需重算输出从 dirty_from-1 起的部分
+        (原来的末端点也会从"端点"变为"平滑点")。每次新增一个点只算常数个点。
+        输出保存在 state['out'] (PointBuffer2D) 中，返回其视图。
+        """
+        n = len(points)
+        if n < 3:
+            state['smoothed'] = False
+            return points, 0
+
+        out = state.get('out')
+        if out is None or not state.get('smoothed'):
+            out = state['out'] = PointBuffer2D()
+            start = 0
+        else:
+            start = max(min(dirty_from - 1, len(out)), 0)
+
+        # 输出 [start, n): 中间点取三点平均，首尾点原样
+        lo = max(start, 1)
+        seg = points[start:n].copy()
+        if n - 1 > lo:
+            seg[lo - start:n - 1 - start] = (points[lo - 1:n - 2]
+                                             + points[lo:n - 1]
+                                             + points[lo + 1:n]) / 3.0
+        out.write(start, seg)
+
+        state['smoothed'] = True
+        return out.view(), start
@@ -22,6 +22,21 @@ class FeatureToggleManager:
             "always":True
             # 辅助线/对齐开关
         }
+        # 开关变化监听者: callback(feature_name, enabled)
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """
+        Register a callback invoked as callback(feature_name, enabled)
+        whenever a feature actually changes.
+        注册开关变化回调 (值真正改变时才通知)。
+        """
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
 
     def set_feature(self, feature_name,
                     enabled):
@@ -33,8 +48,12 @@ class FeatureToggleManager:
         :param enabled: bool - True to enable, False to disable.
         """
         if feature_name in self.features:
+            if self.features[feature_name] == enabled:
+                return
             self.features[
                 feature_name] = enabled
+            for callback in list(self._listeners):
+                callback(feature_name, enabled)
 
     def is_enabled(self, feature_name):
         """
@@ -0,0 +1,125 @@
+# logic/frame_profiler.py
+
+import threading
+import time
+
+import numpy as np
+
+
+class _NullStage:
+    """
+    关闭时 stage() 返回的空上下文 (全局唯一，不分配任何对象)。
+    """
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.profiler.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class StageTimings:
+    """
+    一个阶段最近 capacity 次耗时 (毫秒) 的环形缓冲。
+    """
+
+    __slots__ = ("samples", "count", "pos", "last")
+
+    def __init__(self, capacity):
+        self.samples = np.zeros(capacity, dtype=np.float64)
+        self.count = 0
+        self.pos = 0
+        self.last = 0.0
+
+    def add(self, ms):
+        self.samples[self.pos] = ms
+        self.pos = (self.pos + 1) % len(self.samples)
+        self.count = min(self.count + 1, len(self.samples))
+        self.last = ms
+
+    def percentiles(self, qs=(50, 95, 99)):
+        if self.count == 0:
+            return [0.0] * len(qs)
+        return np.percentile(self.samples[:self.count], qs).tolist()
+
+
+class FrameProfiler:
+    """
+    按阶段计时的轻量工具:
+        with profiler.stage("paint.render3d"):
+            ...
+    每个阶段保留最近 capacity 次的耗时，summary() 给出 p50 / p95 / p99。
+    记录的是 CPU 侧耗时 (GL 调用是异步的，GPU 执行时间不在其中)。
+
+    enabled=False 时 stage() 只做一次属性判断并返回共享的空上下文，
+    StrokeProcessor 等热路径在关闭时还会直接使用未包装的方法。
+    record 可能来自后台线程 (笔画提交)，用锁保护。
+    """
+
+    def __init__(self, capacity=240, enabled=False):
+        self.capacity = capacity
+        self.enabled = enabled
+        # 阶段名 -> StageTimings，按首次出现的顺序
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def set_enabled(self, enabled):
+        self.enabled = bool(enabled)
+
+    def stage(self, name):
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def record(self, name, seconds):
+        with self._lock:
+            timings = self.stages.get(name)
+            if timings is None:
+                timings = self.stages[name] = StageTimings(self.capacity)
+            timings.add(seconds * 1000.0)
+
+    def timed(self, name, func):
+        """
+        返回包装后的 func，每次调用计入阶段 name。
+        """
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(name, time.perf_counter() - start)
+        return wrapper
+
+    def summary(self):
+        """
+        :return: [(name, p50, p95, p99, last)]，单位毫秒
+        """
+        with self._lock:
+            items = [(name, t.percentiles(), t.last)
+                     for name, t in self.stages.items()]
+        return [(name, p[0], p[1], p[2], last) for name, p, last in items]
+
+    def reset(self):
+        with self._lock:
+            self.stages = {}
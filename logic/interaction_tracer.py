@@ -0,0 +1,220 @@
+# logic/interaction_tracer.py
+
+import itertools
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+
+_MISSING = object()
+
+_SPAN_DTYPE = np.dtype([("name", np.int32), ("tid", np.int64),
+                        ("start", np.int64), ("end", np.int64)])
+
+
+class _NullSpan:
+    """
+    关闭时 span() 返回的空上下文 (全局唯一)。
+    """
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name_id", "start")
+
+    def __init__(self, tracer, name_id):
+        self.tracer = tracer
+        self.name_id = name_id
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.tracer.record(self.name_id, self.start, time.perf_counter_ns())
+        return False
+
+
+class InteractionTracer:
+    """
+    记录交互过程中嵌套的时间区间 (span)，可导出为 Chrome trace-event JSON
+    (chrome://tracing 或 Perfetto 打开)，用于排查单次卡顿，而不是看平均值。
+
+    两种打点方式:
+      - instrument(obj, method_names, prefix): 登记要跟踪的方法。
+        开启时才在实例上装入包装函数，关闭时移除，关闭状态下没有任何额外开销
+      - span(name): 临时的 with 区块
+
+    span 存放在预先分配的定长环形缓冲 (numpy 结构数组) 中，
+    记录一次只是取下标并写入一行，不分配对象；写满后覆盖最旧的记录。
+    同一线程内的 span 按时间自然嵌套，导出时带上线程 id 与线程名。
+    """
+
+    def __init__(self, capacity=1 << 16):
+        self.capacity = capacity
+        self.enabled = False
+        self._buffer = np.zeros(capacity, dtype=_SPAN_DTYPE)
+        self._cursor = itertools.count()
+        self._written = 0
+        # span 名 <-> 编号
+        self._name_ids = {}
+        self._names = []
+        # 线程 id -> 线程名
+        self._thread_names = {}
+        # 登记的打点: (obj, 方法名, span 名编号)
+        self._probes = []
+        # 已装入的包装: (obj, 方法名, 原先的实例属性或 _MISSING)
+        self._installed = []
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def add_listener(self, callback):
+        """
+        callback(enabled) 在开关变化后调用。
+        """
+        self._listeners.append(callback)
+
+    def name_id(self, name):
+        with self._lock:
+            name_id = self._name_ids.get(name)
+            if name_id is None:
+                name_id = self._name_ids[name] = len(self._names)
+                self._names.append(name)
+            return name_id
+
+    def instrument(self, obj, method_names, prefix=None):
+        """
+        登记 obj 上要跟踪的方法，span 名为 "<prefix>.<方法名>"
+        (prefix 默认为类名)。已经开启时立即生效。
+        """
+        if prefix is None:
+            prefix = type(obj).__name__
+        for method_name in method_names:
+            probe = (obj, method_name,
+                     self.name_id("%s.%s" % (prefix, method_name)))
+            self._probes.append(probe)
+            if self.enabled:
+                self._install(*probe)
+
+    def set_enabled(self, enabled):
+        """
+        开启时清空缓冲并装入包装函数，关闭时移除 (已记录的 span 保留到下次开启)。
+        """
+        enabled = bool(enabled)
+        if enabled == self.enabled:
+            return
+        if enabled:
+            self.clear()
+            for probe in self._probes:
+                self._install(*probe)
+        else:
+            self._uninstall_all()
+        self.enabled = enabled
+        for callback in self._listeners:
+            callback(enabled)
+
+    def _install(self, obj, method_name, name_id):
+        original = obj.__dict__.get(method_name, _MISSING)
+        method = getattr(obj, method_name)
+        setattr(obj, method_name, self.wrap(name_id, method))
+        self._installed.append((obj, method_name, original))
+
+    def _uninstall_all(self):
+        # 倒序恢复，同一方法被登记多次时也能还原到最初的状态
+        for obj, method_name, original in reversed(self._installed):
+            if original is _MISSING:
+                delattr(obj, method_name)
+            else:
+                setattr(obj, method_name, original)
+        self._installed = []
+
+    def wrap(self, name_id, func):
+        """
+        返回包装后的 func，每次调用记录一个 span。
+        """
+        record = self.record
+
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(name_id, start, time.perf_counter_ns())
+        return wrapper
+
+    def span(self, name):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, self.name_id(name))
+
+    def record(self, name_id, start_ns, end_ns):
+        # next() 在 GIL 下是原子的，多个线程同时记录也不会拿到同一下标
+        index = next(self._cursor)
+        tid = threading.get_native_id()
+        if tid not in self._thread_names:
+            self._thread_names[tid] = threading.current_thread().name
+        self._buffer[index % self.capacity] = (name_id, tid, start_ns, end_ns)
+        if index >= self._written:
+            self._written = index + 1
+
+    def clear(self):
+        self._cursor = itertools.count()
+        self._written = 0
+
+    def spans(self):
+        """
+        :return: 按开始时间排序的 span 结构数组 (拷贝)
+        """
+        count = min(self._written, self.capacity)
+        spans = self._buffer[:count].copy()
+        return spans[np.argsort(spans["start"], kind="stable")]
+
+    def to_chrome_trace(self):
+        """
+        :return: Chrome trace-event 格式的 dict
+        """
+        spans = self.spans()
+        pid = os.getpid()
+        origin = int(spans["start"][0]) if len(spans) else 0
+        events = [{"name": "process_name", "ph": "M", "pid": pid, "tid": 0,
+                   "args": {"name": "sketch"}}]
+        for tid in np.unique(spans["tid"]).tolist():
+            events.append({"name": "thread_name", "ph": "M", "pid": pid,
+                           "tid": tid,
+                           "args": {"name": self._thread_names.get(
+                               tid, str(tid))}})
+        names = list(self._names)
+        for name_id, tid, start, end in spans.tolist():
+            name = names[name_id]
+            events.append({
+                "name": name,
+                "cat": name.split(".", 1)[0],
+                "ph": "X",
+                "pid": pid,
+                "tid": tid,
+                "ts": (start - origin) / 1000.0,
+                "dur": (end - start) / 1000.0,
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def dump_chrome_trace(self, path):
+        """
+        把当前缓冲中的 span 写成 Chrome trace-event JSON 文件，返回写出的 span 数。
+        """
+        trace = self.to_chrome_trace()
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(trace, f)
+        return sum(1 for e in trace["traceEvents"] if e["ph"] == "X")
@@ -0,0 +1,246 @@
+# logic/screen_grid_index.py
+
+import numpy as np
+
+
+class ScreenGridIndex:
+    """
+    屏幕空间均匀网格索引，用于加速“哪些笔画与屏幕上的圆相交”的查询。
+
+    - 以笔画的 screen_coords 构建：每条折线拆成线段，长线段再按 cell_size 切成小段，
+      每一小段登记到它包围盒覆盖的(至多 2x2 个)格子里。
+    - 格子用排序后的 key 数组 + CSR 偏移表示，查询时 searchsorted 即可，没有 Python 字典。
+    - 查询只取圆包围盒覆盖的格子中的候选线段，再向量化计算“线段到圆心”的最短距离。
+    - 投影到无穷远 / 切分段数过多的异常线段放入 oversized，每次查询都直接测试。
+    - update(changed, removed): 相机不变时的增量更新。被删除/修改的笔画在网格中标记为失效，
+      新增/修改的笔画放进 pending，查询时按其当前 screen_coords 直接测试；
+      pending 或失效笔画过多时 needs_rebuild 为 True，由调用方重建。
+    """
+
+    def __init__(self, cell_size=32.0, max_pieces_per_segment=256,
+                 max_pending=64):
+        self.cell_size = float(cell_size)
+        self.max_pieces_per_segment = max_pieces_per_segment
+        self.max_pending = max_pending
+        self.clear()
+
+    def clear(self):
+        self.strokes = []
+        # stroke_id -> 在 strokes 中的下标
+        self.stroke_index = {}
+        self.dead = np.zeros(0, dtype=bool)
+        self.dead_count = 0
+        # stroke_id -> stroke，不在网格中、查询时直接测试
+        self.pending = {}
+        self.seg_a = np.empty((0, 2), dtype=np.float32)
+        self.seg_b = np.empty((0, 2), dtype=np.float32)
+        self.seg_stroke = np.empty(0, dtype=np.int64)
+        self.cell_keys = np.empty(0, dtype=np.int64)
+        self.cell_starts = np.zeros(1, dtype=np.int64)
+        self.cell_segments = np.empty(0, dtype=np.int64)
+        self.oversized = np.empty(0, dtype=np.int64)
+        self.build_key = None
+
+    # -----------------------------
+    # 构建
+    # -----------------------------
+    @staticmethod
+    def _cell_key(cx, cy):
+        # 把二维格子坐标压成一个 int64 (格子坐标先加偏移变为非负)
+        return (cx + (1 << 20)) * (1 << 21) + (cy + (1 << 20))
+
+    def build(self, strokes_3d, build_key=None):
+        """
+        :param strokes_3d: 已具有 screen_coords 的笔画列表
+        :param build_key: 任意可比较对象，记录本次构建对应的相机/笔画集合状态
+        """
+        self.clear()
+        self.build_key = build_key
+        for s in strokes_3d:
+            # 还没有投影到当前相机的笔画 (点数对不上) 先放进 pending
+            if len(s.screen_coords) != len(s.coords_3d):
+                self.pending[s.stroke_id] = s
+            else:
+                self.strokes.append(s)
+        self.stroke_index = {s.stroke_id: i
+                             for i, s in enumerate(self.strokes)}
+        self.dead = np.zeros(len(self.strokes), dtype=bool)
+        if not self.strokes:
+            return
+
+        self.seg_a, self.seg_b, self.seg_stroke = polyline_segments(
+            [s.screen_coords for s in self.strokes])
+        if len(self.seg_stroke) == 0:
+            return
+
+        # 长线段切分成长度不超过 cell_size 的小段
+        with np.errstate(invalid='ignore', over='ignore'):
+            seg_len = np.linalg.norm(self.seg_b - self.seg_a, axis=1)
+            pieces = np.ceil(seg_len / self.cell_size)
+        # 超出格子编码范围(含 inf/nan)的线段不进网格
+        limit = (1 << 19) * self.cell_size
+        with np.errstate(invalid='ignore'):
+            in_range = np.all(np.abs(self.seg_a) < limit, axis=1) \
+                & np.all(np.abs(self.seg_b) < limit, axis=1)
+        ok = in_range & np.isfinite(pieces) \
+            & (pieces <= self.max_pieces_per_segment)
+        self.oversized = np.flatnonzero(~ok)
+
+        seg_ids = np.flatnonzero(ok)
+        if len(seg_ids) == 0:
+            return
+        pieces = np.maximum(pieces[seg_ids], 1).astype(np.int64)
+        piece_seg = np.repeat(seg_ids, pieces)
+        piece_first = np.concatenate(([0], np.cumsum(pieces)[:-1]))
+        k = np.arange(int(pieces.sum())) - np.repeat(piece_first, pieces)
+        n = np.repeat(pieces, pieces)
+        a = self.seg_a[piece_seg]
+        d = self.seg_b[piece_seg] - a
+        p0 = a + d * (k / n)[:, None]
+        p1 = a + d * ((k + 1) / n)[:, None]
+
+        lo = np.floor(np.minimum(p0, p1) / self.cell_size).astype(np.int64)
+        hi = np.floor(np.maximum(p0, p1) / self.cell_size).astype(np.int64)
+        # 每个小段至多覆盖 2x2 个格子，四个角都登记(重复的在查询时去重)
+        keys = np.concatenate([
+            self._cell_key(lo[:, 0], lo[:, 1]),
+            self._cell_key(hi[:, 0], lo[:, 1]),
+            self._cell_key(lo[:, 0], hi[:, 1]),
+            self._cell_key(hi[:, 0], hi[:, 1]),
+        ])
+        segs = np.tile(piece_seg, 4)
+
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        segs = segs[order]
+        uniq, starts = np.unique(keys, return_index=True)
+        self.cell_keys = uniq
+        self.cell_starts = np.append(starts, len(keys)).astype(np.int64)
+        self.cell_segments = segs
+
+    def update(self, changed, removed):
+        """
+        :param changed: 新增或修改的笔画
+        :param removed: 被删除笔画的 stroke_id
+        """
+        for sid in removed:
+            self._kill(sid)
+            self.pending.pop(sid, None)
+        for s in changed:
+            self._kill(s.stroke_id)
+            self.pending[s.stroke_id] = s
+
+    def _kill(self, stroke_id):
+        i = self.stroke_index.pop(stroke_id, None)
+        if i is not None:
+            self.dead[i] = True
+            self.dead_count += 1
+
+    @property
+    def needs_rebuild(self):
+        return (len(self.pending) > self.max_pending
+                or self.dead_count > max(self.max_pending,
+                                         len(self.strokes) // 2))
+
+    # -----------------------------
+    # 查询
+    # -----------------------------
+    def query_circle(self, circle_center, circle_radius):
+        """
+        返回与屏幕圆相交的笔画列表(保持构建时的顺序，pending 中的笔画排在最后)。
+        """
+        cx, cy = circle_center
+        r = float(circle_radius)
+        result = self._query_grid(cx, cy, r)
+        if self.pending:
+            pending = list(self.pending.values())
+            seg_a, seg_b, seg_stroke = polyline_segments(
+                [s.screen_coords for s in pending])
+            if len(seg_stroke):
+                hit = segments_within_circle(seg_a, seg_b, (cx, cy), r)
+                result.extend(pending[i]
+                              for i in np.unique(seg_stroke[hit]))
+        return result
+
+    def _query_grid(self, cx, cy, r):
+        if not self.strokes or len(self.seg_stroke) == 0:
+            return []
+
+        gx0 = int(np.floor((cx - r) / self.cell_size))
+        gx1 = int(np.floor((cx + r) / self.cell_size))
+        gy0 = int(np.floor((cy - r) / self.cell_size))
+        gy1 = int(np.floor((cy + r) / self.cell_size))
+        gx, gy = np.meshgrid(np.arange(gx0, gx1 + 1),
+                             np.arange(gy0, gy1 + 1), indexing='ij')
+        query_keys = self._cell_key(gx.ravel(), gy.ravel())
+
+        parts = [self.oversized]
+        if len(self.cell_keys):
+            pos = np.searchsorted(self.cell_keys, query_keys)
+            pos = np.minimum(pos, len(self.cell_keys) - 1)
+            pos = pos[self.cell_keys[pos] == query_keys]
+        else:
+            pos = query_keys[:0]
+        if len(pos):
+            starts = self.cell_starts[pos]
+            ends = self.cell_starts[pos + 1]
+            counts = ends - starts
+            first = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            idx = np.repeat(starts - first, counts) + np.arange(int(counts.sum()))
+            parts.append(self.cell_segments[idx])
+        candidates = np.unique(np.concatenate(parts))
+        if len(candidates) == 0:
+            return []
+
+        hit = segments_within_circle(self.seg_a[candidates],
+                                     self.seg_b[candidates],
+                                     (cx, cy), r)
+        stroke_idx = np.unique(self.seg_stroke[candidates[hit]])
+        if self.dead_count:
+            stroke_idx = stroke_idx[~self.dead[stroke_idx]]
+        return [self.strokes[i] for i in stroke_idx]
+
+
+def polyline_segments(pts_list):
+    """
+    把若干条屏幕折线拆成线段。
+    :param pts_list: 每条折线的 (n,2) 点
+    :return: (seg_a (M,2), seg_b (M,2), seg_stroke (M,) 所属折线下标)
+    """
+    pts_list = [np.asarray(p, dtype=np.float32).reshape(-1, 2)
+                for p in pts_list]
+    lengths = np.array([len(p) for p in pts_list], dtype=np.int64)
+    if len(lengths) == 0 or lengths.sum() == 0:
+        empty = np.empty((0, 2), dtype=np.float32)
+        return empty, empty, np.empty(0, dtype=np.int64)
+    points = np.concatenate(pts_list)
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+
+    # 每条笔画的线段数: n>=2 => n-1; n==1 => 1 个退化线段(两端相同); n==0 => 0
+    seg_counts = np.where(lengths >= 2, lengths - 1, lengths)
+    total = int(seg_counts.sum())
+    seg_stroke = np.repeat(np.arange(len(pts_list)), seg_counts)
+    seg_first = np.concatenate(([0], np.cumsum(seg_counts)[:-1]))
+    local = np.arange(total) - np.repeat(seg_first, seg_counts)
+    a_idx = np.repeat(offsets, seg_counts) + local
+    b_idx = a_idx + np.repeat(lengths >= 2, seg_counts)
+    return points[a_idx], points[b_idx], seg_stroke
+
+
+def segments_within_circle(seg_a, seg_b, circle_center, circle_radius):
+    """
+    向量化计算每条线段到圆心的最短距离是否不超过半径。
+    :param seg_a, seg_b: (M,2) 线段端点
+    :return: (M,) bool
+    """
+    p = np.asarray(circle_center, dtype=np.float64)
+    a = seg_a.astype(np.float64)
+    d = seg_b.astype(np.float64) - a
+    dd = np.einsum('ij,ij->i', d, d)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = np.where(dd > 0, np.einsum('ij,ij->i', p - a, d) / dd, 0.0)
+    t = np.clip(t, 0.0, 1.0)
+    closest = a + d * t[:, None]
+    diff = closest - p
+    dist_sq = np.einsum('ij,ij->i', diff, diff)
+    return dist_sq <= circle_radius * circle_radius
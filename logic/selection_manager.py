@@ -2,6 +2,9 @@
 
 import numpy as np
 
+from data.stroke_events import StrokeChangeQueue
+from logic.screen_grid_index import ScreenGridIndex
+
 
 class SelectionManager:
     def __init__(self):
@@ -11,6 +14,10 @@ class SelectionManager:
         # 临时高亮的笔画（鼠标移动时更新）
         self.hovered_strokes = set()
 
+        # 屏幕空间网格索引，相机变化时才重建，笔画增删改时增量更新
+        self.spatial_index = ScreenGridIndex()
+        self._changes = StrokeChangeQueue()
+
     def clear_selection(self):
         for s in self.selected_strokes:
             s.is_selected = False
@@ -50,31 +57,32 @@ class SelectionManager:
     def find_strokes_in_circle(self,
                                strokes_3d,
                                circle_center,
-                               circle_radius):
+                               circle_radius,
+                               index_key=None,
+                               changes=None):
         """
         给定所有笔画 strokes_3d, 以及一个在"屏幕空间"的圆：
           circle_center = (cx, cy) in screen coords
           circle_radius = float (in screen coords)
         返回与该圆相交的 strokes (的引用或对象)
+
+        index_key: 标识当前屏幕坐标状态的键；与上次构建时相同则复用网格索引，否则重建。
+                   为 None 时每次都重建。
+        changes: 笔画管理器的 StrokeChangeBus。给出时 index_key 只需标识相机状态，
+                 笔画的增删改按事件增量更新索引；不给出时 index_key 还应包含笔画集合版本。
         """
         # 这里要求 strokes_3d 已经变换到屏幕坐标
         # 一般在 canvas_widget 渲染/逻辑里做 "3D->2D投影" 后再传进来判断
-        # 或者将 3D -> 2D 的逻辑写在这里也可以
-
-        result = []
-        cx, cy = circle_center
-        r_sq = circle_radius ** 2
+        index = self.spatial_index
+        rebuild = index_key is None or index_key != index.build_key
+        if changes is not None:
+            rebuild = self._changes.track(changes) or rebuild
+            reset, changed, removed = self._changes.collect()
+            if not (rebuild or reset):
+                index.update(changed.values(), removed)
+            rebuild = rebuild or reset or index.needs_rebuild
+        if rebuild:
+            index.build(strokes_3d, build_key=index_key)
 
-        for stroke in strokes_3d:
-            points_2d = stroke.screen_coords  # 先假设我们给 stroke 扩展了一个属性 screen_coords
-            # 检查 stroke 是否与圆相交：只要有一点落在圆内，就算相交
-            # 或者更严格地检查线段与圆的最短距离
-            for p in points_2d:
-                dx = p[0] - cx
-                dy = p[1] - cy
-                dist_sq = dx * dx + dy * dy
-                if dist_sq <= r_sq:
-                    result.append(
-                        stroke)
-                    break  # 该stroke只要有一点命中就算命中
-        return result
+        # 检查线段到圆心的最短距离，两点的轴向直线即使端点都不在圆内也能命中
+        return index.query_circle(circle_center, circle_radius)
@@ -3,56 +3,73 @@
 import numpy as np
 from data.stroke_3d import Stroke3D
 
+
+def unproject_points_to_plane(points_2d, camera, z=0.0):
+    """
+    把 (N,2) 屏幕点一次性反投影，与平面 Z=z 求交。
+    camera: CameraSnapshot, 其中的逆 MVP 已预先算好，这里不再求逆。
+    :return: (coords (N,3) float32, valid (N,) bool)
+             射线与平面平行、或交点在相机后方 (t < 0) 的点 valid=False
+    """
+    ray_origin, ray_dir = camera.screen_rays(points_2d)
+    dz = ray_dir[:, 2]
+    valid = np.abs(dz) >= 1e-8
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = np.where(valid, (z - ray_origin[:, 2]) / dz, -1.0)
+    valid &= t >= 0
+    coords = ray_origin + t[:, None] * ray_dir
+    return coords.astype(np.float32), valid
+
+
 def convert_2d_stroke_to_3d(
     stroke_2d,
-    canvas_width,
-    canvas_height,
-    projection_matrix,
-    view_matrix,
-    model_matrix=None,
+    camera,
     z=0.0
 ):
     """
     给定 Stroke2D, 转换为 Stroke3D。
+    camera: CameraSnapshot
     """
-    if model_matrix is None:
-        model_matrix = np.eye(4, dtype=np.float32)
-
     points_2d = stroke_2d.points_2d
-    if not points_2d:
+    if len(points_2d) == 0:
         return None
 
-    # 与之前逻辑相同
-    mvp = projection_matrix @ view_matrix @ model_matrix
-    inv_mvp = np.linalg.inv(mvp)
-
-    coords_3d = []
-    for (x_screen, y_screen) in points_2d:
-        x_ndc = (x_screen / canvas_width) * 2.0 - 1.0
-        y_ndc = 1.0 - (y_screen / canvas_height) * 2.0
-
-        near_clip = np.array([x_ndc, y_ndc, -1.0, 1.0], dtype=np.float32)
-        far_clip  = np.array([x_ndc, y_ndc,  1.0, 1.0], dtype=np.float32)
-
-        near_world = inv_mvp @ near_clip
-        far_world  = inv_mvp @ far_clip
-        near_world /= near_world[3]
-        far_world  /= far_world[3]
+    coords_3d, valid = unproject_points_to_plane(points_2d, camera, z)
+    if not valid.any():
+        return None
 
-        ray_origin = near_world[:3]
-        ray_dir    = (far_world[:3] - ray_origin)
+    stroke_3d = Stroke3D(coords_3d[valid], stroke_id=stroke_2d.stroke_id)
+    return stroke_3d
 
-        if abs(ray_dir[2]) < 1e-8:
-            continue
 
-        t = (z - ray_origin[2]) / ray_dir[2]
-        if t >= 0:
-            intersection = ray_origin + t * ray_dir
-            coords_3d.append(intersection)
+def convert_2d_strokes_to_3d(
+    strokes_2d,
+    camera,
+    z=0.0
+):
+    """
+    批量版本: 所有笔画的点拼成一个数组，只做一次反投影。
+    :return: list，与 strokes_2d 一一对应，无法转换的位置为 None
+    """
+    strokes_2d = list(strokes_2d)
+    pts_list = [np.asarray(s.points_2d, dtype=np.float64).reshape(-1, 2)
+                for s in strokes_2d]
+    if not pts_list:
+        return []
+    lengths = np.array([len(p) for p in pts_list], dtype=np.int64)
 
-    if not coords_3d:
-        return None
+    coords_3d, valid = unproject_points_to_plane(np.concatenate(pts_list),
+                                                 camera, z)
+    # 按笔画切分，各自只保留有效点
+    stroke_idx = np.repeat(np.arange(len(strokes_2d)), lengths)
+    kept = coords_3d[valid]
+    kept_counts = np.bincount(stroke_idx[valid], minlength=len(strokes_2d))
+    pieces = np.split(kept, np.cumsum(kept_counts)[:-1])
 
-    coords_3d = np.array(coords_3d, dtype=np.float32)
-    stroke_3d = Stroke3D(coords_3d, stroke_id=stroke_2d.stroke_id)
-    return stroke_3d
+    result = []
+    for s, coords in zip(strokes_2d, pieces):
+        if len(coords) == 0:
+            result.append(None)
+        else:
+            result.append(Stroke3D(coords, stroke_id=s.stroke_id))
+    return result
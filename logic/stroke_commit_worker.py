@@ -0,0 +1,158 @@
+# coding=utf-8
+# logic/stroke_commit_worker.py
+
+import queue
+
+from PyQt5.QtCore import QThread, \
+    pyqtSignal
+
+
+class StrokeCommitContext:
+    """
+    在后台线程中代替 canvas_widget 传给 Modifier 的只读上下文。
+    只暴露 Modifier 需要的接口，内容都在 GUI 线程提交时取好快照:
+      - get_camera()            -> CameraSnapshot
+      - width() / height()
+      - get_stroke_endpoints()  -> StrokeEndpoints (已有 3D 笔画首尾端点)
+    """
+
+    def __init__(self, camera, stroke_endpoints):
+        self.camera = camera
+        self.stroke_endpoints = stroke_endpoints
+
+    def get_camera(self):
+        return self.camera
+
+    def width(self):
+        return self.camera.width
+
+    def height(self):
+        return self.camera.height
+
+    def get_stroke_endpoints(self):
+        return self.stroke_endpoints
+
+
+class StrokeCommitJob:
+    """
+    一次笔画提交:
+      输入  seq / stroke2d / camera / stroke_endpoints / lift_to_3d / landed_seq
+      输出  processed_2d / stroke3d / error (由后台线程填写)
+    user_data 由提交者自由使用 (后台线程不会读取)。
+    """
+
+    def __init__(self, seq, stroke2d, camera, stroke_endpoints,
+                 lift_to_3d=True, landed_seq=0, user_data=None):
+        self.seq = seq
+        self.stroke2d = stroke2d
+        self.camera = camera
+        self.stroke_endpoints = stroke_endpoints
+        self.lift_to_3d = lift_to_3d
+        # 提交时已经落地的任务数: seq 在 [landed_seq, seq) 的任务结果还不在快照里
+        self.landed_seq = landed_seq
+        self.user_data = user_data
+
+        self.processed_2d = None
+        self.stroke3d = None
+        self.error = None
+
+
+class StrokeCommitWorker(QThread):
+    """
+    笔画提交队列: 在后台线程中依次执行 2D 管线与 2D->3D 提升，
+    GUI 线程不再因为耗时的 Modifier 卡住。
+
+    - submit() 在 GUI 线程调用，立即返回 StrokeCommitJob
+    - 单个后台线程按提交顺序处理；stroke_committed 信号经 Qt 队列连接
+      回到 GUI 线程，因此结果也按提交顺序到达
+    - 排在前面、尚未落地的笔画也会并入后面任务的端点快照，
+      快速连续绘制时后一笔仍能与前一笔相交
+
+    信号:
+      stroke_committed(job) -> 任务完成 (GUI 线程中处理 job.stroke3d 并加入管理器)
+      commit_failed(job)    -> Modifier 抛出异常 (job.error)，在 stroke_committed 之前发出
+    """
+
+    stroke_committed = pyqtSignal(
+        object)
+    commit_failed = pyqtSignal(
+        object)
+
+    def __init__(self, stroke_processor,
+                 parent=None):
+        super().__init__(parent)
+        self.stroke_processor = stroke_processor
+        self._queue = queue.Queue()
+        self._next_seq = 0
+        self._landed_seq = 0
+        # 后台线程产出、可能尚未落地的 3D 笔画: seq -> Stroke3D
+        self._results = {}
+
+    def submit(self, stroke2d, canvas_widget,
+               lift_to_3d=True, user_data=None):
+        """
+        在 GUI 线程中调用: 取相机与已有笔画端点的快照，排入队列。
+        """
+        if not self.isRunning():
+            self.start()
+        job = StrokeCommitJob(
+            self._next_seq, stroke2d,
+            canvas_widget.get_camera(),
+            canvas_widget.get_stroke_endpoints(),
+            lift_to_3d=lift_to_3d,
+            landed_seq=self._landed_seq,
+            user_data=user_data)
+        self._next_seq += 1
+        self._queue.put(job)
+        return job
+
+    def mark_landed(self, job):
+        """
+        GUI 线程处理完 job 后调用，之后提交的任务将从实际的笔画集合中看到它。
+        """
+        self._landed_seq = max(self._landed_seq, job.seq + 1)
+
+    def pending_count(self):
+        return self._next_seq - self._landed_seq
+
+    def shutdown(self, wait_ms=5000):
+        """
+        停止后台线程 (已排队的任务仍会先处理完)。
+        """
+        if self.isRunning():
+            self._queue.put(None)
+            self.wait(wait_ms)
+
+    def run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+
+            # 提交时尚未落地的前序结果 (按顺序) 并入端点快照
+            pending = [self._results[seq]
+                       for seq in range(job.landed_seq, job.seq)
+                       if self._results.get(seq) is not None]
+            endpoints = job.stroke_endpoints
+            if pending:
+                endpoints = endpoints.extended(pending)
+            context = StrokeCommitContext(job.camera, endpoints)
+
+            try:
+                job.processed_2d = self.stroke_processor.process_2d_stroke(
+                    job.stroke2d, context)
+                if job.lift_to_3d:
+                    job.stroke3d = self.stroke_processor.process_2dto3d_stroke(
+                        job.processed_2d, context)
+            except Exception as e:
+                job.error = e
+                job.stroke3d = None
+
+            self._results[job.seq] = job.stroke3d
+            # 之后的任务不会再需要已落地任务的结果
+            for seq in [s for s in self._results if s < job.landed_seq]:
+                self._results.pop(seq, None)
+
+            if job.error is not None:
+                self.commit_failed.emit(job)
+            self.stroke_committed.emit(job)
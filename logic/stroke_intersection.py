@@ -0,0 +1,181 @@
+# logic/stroke_intersection.py
+
+import numpy as np
+
+from data.stroke_3d import Stroke3D
+from data.stroke_events import StrokeChangeQueue
+
+
+def stroke_endpoints(strokes_3d):
+    """
+    批量取出每条笔画的首尾 3D 端点。
+    绑定在 StrokeCoordArena 上的笔画直接按 offset/length 从坐标池中一次性取出。
+    :return: (strokes, p0 (M,3), p1 (M,3)) - 只包含至少两个点的笔画
+    """
+    strokes_3d = list(strokes_3d)
+    if not strokes_3d:
+        empty = np.empty((0, 3), dtype=np.float64)
+        return [], empty, empty
+
+    arena = getattr(strokes_3d[0], "_arena", None)
+    if arena is not None and all(s._arena is arena for s in strokes_3d):
+        slots = np.fromiter((s.arena_slot for s in strokes_3d),
+                            dtype=np.int64, count=len(strokes_3d))
+        lengths = arena.lengths[slots]
+        keep = np.flatnonzero(lengths >= 2)
+        first = arena.offsets[slots[keep]]
+        p0 = arena.coords[first].astype(np.float64)
+        p1 = arena.coords[first + lengths[keep] - 1].astype(np.float64)
+        return [strokes_3d[i] for i in keep], p0, p1
+
+    kept, p0, p1 = [], [], []
+    for s in strokes_3d:
+        coords = s.coords_3d
+        if len(coords) < 2:
+            continue
+        kept.append(s)
+        p0.append(coords[0])
+        p1.append(coords[-1])
+    if not kept:
+        empty = np.empty((0, 3), dtype=np.float64)
+        return [], empty, empty
+    return (kept,
+            np.asarray(p0, dtype=np.float64).reshape(-1, 3),
+            np.asarray(p1, dtype=np.float64).reshape(-1, 3))
+
+
+class StrokeEndpoints:
+    """
+    已有 3D 笔画首尾端点的只读拷贝 (与 Stroke3D 和 arena 脱钩)，
+    可以在 GUI 线程取出后交给后台线程使用。
+      - stroke_ids: 长度 M 的列表
+      - p0, p1: (M,3) float64
+    """
+
+    def __init__(self, stroke_ids, p0, p1):
+        self.stroke_ids = list(stroke_ids)
+        self.p0 = p0
+        self.p1 = p1
+
+    def __len__(self):
+        return len(self.stroke_ids)
+
+    @classmethod
+    def from_strokes(cls, strokes_3d):
+        strokes, p0, p1 = stroke_endpoints(strokes_3d)
+        return cls([s.stroke_id for s in strokes], p0, p1)
+
+    @classmethod
+    def from_stroke_manager(cls, stroke_manager_3d):
+        return cls.from_strokes(stroke_manager_3d.get_all_strokes())
+
+    def extended(self, strokes_3d):
+        """
+        返回追加了 strokes_3d 端点的新集合 (自身不变)。
+        """
+        other = StrokeEndpoints.from_strokes(strokes_3d)
+        if len(other) == 0:
+            return self
+        return StrokeEndpoints(self.stroke_ids + other.stroke_ids,
+                               np.concatenate([self.p0, other.p0]),
+                               np.concatenate([self.p1, other.p1]))
+
+    def without(self, stroke_ids):
+        """
+        返回去掉 stroke_ids 中笔画的新集合 (自身不变)。
+        """
+        stroke_ids = set(stroke_ids)
+        keep = [i for i, sid in enumerate(self.stroke_ids)
+                if sid not in stroke_ids]
+        if len(keep) == len(self.stroke_ids):
+            return self
+        return StrokeEndpoints([self.stroke_ids[i] for i in keep],
+                               self.p0[keep], self.p1[keep])
+
+    def segment(self, i):
+        """
+        第 i 条线段，以两点 Stroke3D 的形式返回 (供反投影辅助函数使用)。
+        """
+        return Stroke3D(np.stack([self.p0[i], self.p1[i]]),
+                        stroke_id=self.stroke_ids[i])
+
+
+class StrokeEndpointTracker:
+    """
+    订阅 StrokeManager3D 的变化事件，增量维护 StrokeEndpoints:
+    新增笔画只取自己的端点追加，删除/修改只去掉对应行，整体替换时才全量重建。
+    每次返回的 StrokeEndpoints 都是新对象，已交给后台线程的旧快照不受影响。
+    """
+
+    def __init__(self):
+        self._queue = StrokeChangeQueue()
+        self.endpoints = None
+
+    def get(self, stroke_manager_3d):
+        rebuild = self._queue.track(stroke_manager_3d.changes)
+        reset, changed, removed = self._queue.collect()
+        if rebuild or reset or self.endpoints is None:
+            self.endpoints = StrokeEndpoints.from_stroke_manager(
+                stroke_manager_3d)
+        elif changed or removed:
+            self.endpoints = self.endpoints.without(
+                removed.union(changed)).extended(changed.values())
+        return self.endpoints
+
+
+def intersect_segment_with_segments(p0_2d, p1_2d, seg_a, seg_b):
+    """
+    一条 2D 线段与 M 条线段同时求交(规则同 intersect_2d_lines)。
+    :return: (hit (M,) bool, inter_pts (M,2)) - 未相交处的交点无意义
+    """
+    p0_2d = np.asarray(p0_2d, dtype=np.float64)
+    d1 = np.asarray(p1_2d, dtype=np.float64) - p0_2d
+    d2 = seg_b - seg_a
+    cross = d1[0] * d2[:, 1] - d1[1] * d2[:, 0]
+    rel = seg_a - p0_2d
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = (rel[:, 0] * d2[:, 1] - rel[:, 1] * d2[:, 0]) / cross
+        u = (rel[:, 0] * d1[1] - rel[:, 1] * d1[0]) / cross
+        hit = (np.abs(cross) >= 1e-9) \
+            & (t >= 0.0) & (t <= 1.0) & (u >= 0.0) & (u <= 1.0)
+    inter_pts = p0_2d + t[:, None] * d1
+    return hit, inter_pts
+
+
+def find_stroke_intersections(p0_2d, p1_2d, endpoints,
+                              camera, extend=1e-2):
+    """
+    把已有 3D 笔画的首尾端点沿自身方向各延长 extend 后用相机快照投影到屏幕，
+    与 2D 线段 (p0_2d, p1_2d) 求交。投影与求交全部是数组运算。
+
+    :param endpoints: StrokeEndpoints
+    :return: (segments, inter_pts (K,2)) - 按原顺序排列的命中结果，
+             segments 为命中笔画首尾端点组成的两点 Stroke3D
+    """
+    if len(endpoints) == 0:
+        return [], np.empty((0, 2), dtype=np.float64)
+    a3d, b3d = endpoints.p0, endpoints.p1
+
+    direction = b3d - a3d
+    with np.errstate(divide='ignore', invalid='ignore'):
+        unit = direction / np.linalg.norm(direction, axis=1)[:, None]
+    ext = np.concatenate([a3d - extend * unit, b3d + extend * unit])
+
+    screen = camera.project_points(ext)
+    m = len(endpoints)
+    hit, inter_pts = intersect_segment_with_segments(
+        p0_2d, p1_2d, screen[:m], screen[m:])
+
+    idx = np.flatnonzero(hit)
+    return [endpoints.segment(i) for i in idx], inter_pts[idx]
+
+
+def nearest_intersection(inter_pts, pt_2d):
+    """
+    返回距离 pt_2d 最近的交点下标(距离相同取靠前者)，没有交点时返回 None。
+    """
+    if len(inter_pts) == 0:
+        return None
+    diff = inter_pts - np.asarray(pt_2d, dtype=np.float64)
+    return int(np.argmin(np.einsum('ij,ij->i', diff, diff)))
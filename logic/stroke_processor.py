@@ -1,7 +1,28 @@
 # logic/stroke_processor.py
 
-from data.stroke_2d import Stroke2D
+from data.stroke_2d import Stroke2D, as_points_2d
 from data.stroke_3d import Stroke3D
+from logic.frame_profiler import FrameProfiler
+from logic.interaction_tracer import InteractionTracer
+from logic.Modifier.axis_2dto3d_modifier import Axis2Dto3DModifier
+from logic.Modifier.free_hand_line import FreeHandModifier
+from logic.Modifier.smoothing_2d_modifier import Smoothing2DModifier
+
+
+class IncrementalStroke2D:
+    """
+    一条正在绘制的笔画的增量预览状态:
+      - preview: 预览用的 Stroke2D (points_2d 为最后一级的输出)
+      - consumed: 上一次已处理的原始点数量
+      - stage_ids: 上一次参与处理的 modifier 顺序 (开关变化时全部重算)
+      - states: mod_id -> dict，各 modifier 的增量缓存
+    """
+
+    def __init__(self, stroke_id):
+        self.preview = Stroke2D(stroke_id=stroke_id, points_2d=[])
+        self.consumed = 0
+        self.stage_ids = None
+        self.states = {}
 
 
 class StrokeProcessor:
@@ -13,25 +34,74 @@ class StrokeProcessor:
       - process_2d_stroke
       - process_2dto3d_stroke
       - process_3d_stroke
+    以及绘制过程中的增量预览:
+      - begin_2d_preview / update_2d_preview
 
     对应地会从 pipelineList 中依次找可用的modifier，并调用对应 apply_xxx 方法。
     """
 
     def __init__(self,
-                 feature_toggle_manager):
+                 feature_toggle_manager,
+                 profiler=None,
+                 tracer=None):
         self.feature_toggle_manager = feature_toggle_manager
+        # 计时开启时每个 modifier 的耗时计入阶段 "modifier.<mod_id>.<管线>"
+        self.profiler = profiler if profiler is not None else FrameProfiler()
+        # 跟踪开启时记录 process_* 与各 modifier apply_* 的 span
+        self.tracer = tracer if tracer is not None else InteractionTracer()
+        self.tracer.instrument(self, ("process_2d_stroke",
+                                      "process_2dto3d_stroke",
+                                      "process_3d_stroke",
+                                      "update_2d_preview"))
+        # 编译后的管线持有绑定方法，开关跟踪后需重新编译以换上/去掉包装
+        self.tracer.add_listener(lambda enabled: self.invalidate_pipelines())
 
         # pipelineList: 例如 ["smooth_2d", "basic_2dto3d", "snap3d_x"]
-        # 具体由外部进行配置/赋值
-        self.pipelineList_2d = []
-        self.pipelineList_2d_to_3d = []
-        self.pipelineList_3d = []
+        # 具体由外部进行配置/赋值 (整体赋值，不要原地修改列表)
+        self._pipelineList_2d = []
+        self._pipelineList_2d_to_3d = []
+        self._pipelineList_3d = []
 
 
 
         # modifier_pool: key=modifier_id, val=BaseModifier子类实例
         self.modifier_pool = {}
 
+        # 编译后的管线: 已过滤掉缺失/未启用的 modifier，只剩绑定好的方法。
+        # 开关变化、注册 modifier、重新赋值 pipelineList 时置为 None，下次使用时重新编译
+        self._compiled = None
+        self._compiled_profiled = False
+        if hasattr(feature_toggle_manager, "add_listener"):
+            feature_toggle_manager.add_listener(
+                self._on_feature_changed)
+
+    @property
+    def pipelineList_2d(self):
+        return self._pipelineList_2d
+
+    @pipelineList_2d.setter
+    def pipelineList_2d(self, mod_ids):
+        self._pipelineList_2d = list(mod_ids)
+        self.invalidate_pipelines()
+
+    @property
+    def pipelineList_2d_to_3d(self):
+        return self._pipelineList_2d_to_3d
+
+    @pipelineList_2d_to_3d.setter
+    def pipelineList_2d_to_3d(self, mod_ids):
+        self._pipelineList_2d_to_3d = list(mod_ids)
+        self.invalidate_pipelines()
+
+    @property
+    def pipelineList_3d(self):
+        return self._pipelineList_3d
+
+    @pipelineList_3d.setter
+    def pipelineList_3d(self, mod_ids):
+        self._pipelineList_3d = list(mod_ids)
+        self.invalidate_pipelines()
+
     def register_modifier(self,
                           modifier):
         """
@@ -40,13 +110,22 @@ class StrokeProcessor:
         """
         self.modifier_pool[
             modifier.mod_id] = modifier
+        self.tracer.instrument(modifier, ("apply_2d",
+                                          "apply_2d_incremental",
+                                          "apply_2dto3d",
+                                          "apply_3d"),
+                               prefix="modifier.%s" % modifier.mod_id)
+        self.invalidate_pipelines()
 
-    def process_2d_stroke(self,
-                          stroke2d,canvas_widget):
-        """
-        依照 pipelineList 的顺序，调用2D Modifiers
-        """
-        for mod_id in self.pipelineList_2d:
+    def invalidate_pipelines(self):
+        self._compiled = None
+
+    def _on_feature_changed(self, feature_name, enabled):
+        self.invalidate_pipelines()
+
+    def _enabled_modifiers(self, mod_ids):
+        mods = []
+        for mod_id in mod_ids:
             mod = self.modifier_pool.get(
                 mod_id, None)
             if mod is None:
@@ -55,11 +134,91 @@ class StrokeProcessor:
             if not mod.check_enabled(
                     self.feature_toggle_manager):
                 continue
-            # 调用 apply_2d
-            stroke2d = mod.apply_2d(
+            mods.append(mod)
+        return mods
+
+    def _compile(self):
+        """
+        把各 pipelineList 展开成绑定方法的列表。
+        计时开启时每个方法包一层计时，关闭时直接使用原方法 (没有额外开销)。
+        """
+        profiled = self.profiler.enabled
+
+        def bind(mod, method, pipeline):
+            if not profiled:
+                return method
+            return self.profiler.timed(
+                "modifier.%s.%s" % (mod.mod_id, pipeline), method)
+
+        mods_2d = self._enabled_modifiers(self._pipelineList_2d)
+        self._compiled = {
+            "2d": [bind(mod, mod.apply_2d, "2d") for mod in mods_2d],
+            "2d_incremental": [
+                (mod.mod_id,
+                 bind(mod, mod.apply_2d_incremental, "preview"))
+                for mod in mods_2d],
+            "2d_to_3d": [bind(mod, mod.apply_2dto3d, "2d_to_3d")
+                         for mod in self._enabled_modifiers(
+                             self._pipelineList_2d_to_3d)],
+            "3d": [bind(mod, mod.apply_3d, "3d") for mod in
+                   self._enabled_modifiers(self._pipelineList_3d)],
+        }
+        self._compiled_profiled = profiled
+        return self._compiled
+
+    def compiled_pipeline(self, name):
+        """
+        :param name: "2d" / "2d_incremental" / "2d_to_3d" / "3d"
+        """
+        compiled = self._compiled
+        if compiled is None or \
+                self._compiled_profiled != self.profiler.enabled:
+            compiled = self._compile()
+        return compiled[name]
+
+    def process_2d_stroke(self,
+                          stroke2d,canvas_widget):
+        """
+        依照 pipelineList 的顺序，调用2D Modifiers
+        """
+        for apply_2d in self.compiled_pipeline("2d"):
+            stroke2d = apply_2d(
                 stroke2d,canvas_widget)
         return stroke2d
 
+    def begin_2d_preview(self, stroke_id):
+        """
+        开始一条新笔画的实时预览，返回 IncrementalStroke2D。
+        """
+        return IncrementalStroke2D(stroke_id)
+
+    def update_2d_preview(self, session, raw_points, canvas_widget):
+        """
+        raw_points 为到目前为止的全部原始点 (N,2) (只会在尾部追加)。
+        每个 modifier 只处理新增 / 受影响的点，返回更新后的预览 Stroke2D。
+        松开鼠标时仍应对完整笔画调用 process_2d_stroke。
+        """
+        stages = self.compiled_pipeline("2d_incremental")
+        stage_ids = [mod_id for mod_id, _ in stages]
+        dirty_from = session.consumed
+        if stage_ids != session.stage_ids or dirty_from > len(raw_points):
+            # 开关或点列发生了非追加式变化 => 从头重算
+            session.states = {}
+            session.preview.meta = {}
+            session.stage_ids = stage_ids
+            dirty_from = 0
+
+        points = as_points_2d(raw_points)
+        for mod_id, apply_incremental in stages:
+            state = session.states.setdefault(mod_id, {})
+            points, dirty_from = apply_incremental(
+                session.preview, points, dirty_from, state,
+                canvas_widget)
+
+        session.consumed = len(raw_points)
+        session.preview.points_2d = points
+        return session.preview
+
     def process_2dto3d_stroke(self,
                               stroke2d,
                               canvas_widget):
@@ -71,16 +230,9 @@ class StrokeProcessor:
         stroke3d = None
 
         # 找第一个2d->3d mod
-        for mod_id in self.pipelineList_2d_to_3d:
-            mod = self.modifier_pool.get(
-                mod_id, None)
-            if mod is None:
-                continue
-            if not mod.check_enabled(
-                    self.feature_toggle_manager):
-                continue
+        for apply_2dto3d in self.compiled_pipeline("2d_to_3d"):
             # 调用 apply_2dto3d
-            possible_3d = mod.apply_2dto3d(
+            possible_3d = apply_2dto3d(
                 stroke2d,
                 canvas_widget
             )
@@ -100,15 +252,8 @@ class StrokeProcessor:
         """
         依照 pipelineList 的顺序，调用3D Modifiers
         """
-        for mod_id in self.pipelineList_3d:
-            mod = self.modifier_pool.get(
-                mod_id, None)
-            if mod is None:
-                continue
-            if not mod.check_enabled(
-                    self.feature_toggle_manager):
-                continue
-            stroke3d = mod.apply_3d(
+        for apply_3d in self.compiled_pipeline("3d"):
+            stroke3d = apply_3d(
                 stroke3d,
                 canvas_width,
                 canvas_height,
@@ -117,3 +262,28 @@ class StrokeProcessor:
                 model_matrix
             )
         return stroke3d
+
+
+def create_default_stroke_processor(feature_toggle_manager, profiler=None,
+                                    tracer=None):
+    """
+    主窗口使用的 StrokeProcessor: 注册内置 modifier 并设置默认管线
+    (输入回放等无界面工具也用它，保证与应用中的处理一致)。
+    """
+    stroke_processor = StrokeProcessor(feature_toggle_manager,
+                                       profiler=profiler, tracer=tracer)
+
+    stroke_processor.register_modifier(Smoothing2DModifier())
+    stroke_processor.register_modifier(Axis2Dto3DModifier())
+    stroke_processor.register_modifier(FreeHandModifier())
+
+    stroke_processor.pipelineList_2d = [
+        "smooth_2d",
+        "axis_2d_to_3d",
+        "free_hand_line"
+    ]
+    stroke_processor.pipelineList_2d_to_3d = [
+        "axis_2d_to_3d",
+        "free_hand_line"
+    ]
+    return stroke_processor
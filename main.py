@@ -1,9 +1,17 @@
 import sys
 from PyQt5.QtWidgets import QApplication
+from PyQt5.QtGui import QSurfaceFormat
 from ui.main_window import MainWindow
 
 
 def main():
+    # 宽线着色器需要 GLSL 330；使用兼容模式以保留固定管线的 overlay 绘制
+    fmt = QSurfaceFormat()
+    fmt.setVersion(3, 3)
+    fmt.setProfile(QSurfaceFormat.CompatibilityProfile)
+    fmt.setDepthBufferSize(24)
+    QSurfaceFormat.setDefaultFormat(fmt)
+
     app = QApplication(sys.argv)
 
     window = MainWindow()
@@ -0,0 +1,53 @@
+# coding=utf-8
+# overlay/frame_stats_element.py
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QColor, QFont, QFontMetrics, QPainter
+import OpenGL.GL as gl
+
+from .base_overlay_element import BaseOverlayElement
+
+
+class FrameStatsElement(BaseOverlayElement):
+    """
+    左上角显示 FrameProfiler 各阶段耗时 (p50 / p95 / p99，毫秒) 的 HUD。
+    文字用 QPainter 画在 canvas_widget 上，应作为最后一个 overlay 元素添加，
+    以免 QPainter 改动的 GL 状态影响之后的绘制。不可交互。
+    """
+
+    def __init__(self, profiler, canvas_widget, x=8, y=8):
+        super().__init__(x, y)
+        self.profiler = profiler
+        self.canvas_widget = canvas_widget
+        self.visible = False
+        self.font = QFont("Monospace", 9)
+        self.font.setStyleHint(QFont.TypeWriter)
+
+    def set_visible(self, visible):
+        self.visible = visible
+
+    def render(self, viewport_size):
+        if not self.visible:
+            return
+        rows = self.profiler.summary()
+        lines = ["%-24s %7s %7s %7s" % ("stage (ms)", "p50", "p95", "p99")]
+        for name, p50, p95, p99, _ in rows:
+            lines.append("%-24s %7.2f %7.2f %7.2f" % (name[:24], p50, p95,
+                                                      p99))
+
+        metrics = QFontMetrics(self.font)
+        line_h = metrics.height()
+        width = max(metrics.width(line) for line in lines) + 12
+        height = line_h * len(lines) + 8
+
+        painter = QPainter(self.canvas_widget)
+        painter.setFont(self.font)
+        painter.fillRect(self.x, self.y, width, height,
+                         QColor(0, 0, 0, 160))
+        painter.setPen(QColor(220, 220, 220))
+        for i, line in enumerate(lines):
+            painter.drawText(self.x + 6, self.y + 4 + i * line_h, width,
+                             line_h, Qt.AlignLeft | Qt.AlignVCenter, line)
+        painter.end()
+        # QPainter 结束时把 GL 状态重置为默认值，恢复渲染器在 initialize 中设置的深度测试
+        gl.glEnable(gl.GL_DEPTH_TEST)
@@ -2,6 +2,8 @@
 # overlay/overlay_manager.py
 # Overlay管理器：维护多个Overlay元素并处理其事件和渲染。
 
+from ui.repaint_scheduler import REPAINT_OVERLAY
+
 class OverlayManager:
     """
     Manages all overlay elements on top of the canvas.
@@ -40,7 +42,7 @@ class OverlayManager:
                 self.elements):
             if e.hit_test(mx, my):
                 e.on_mouse_press(mx, my)
-                canvas_widget.update()
+                canvas_widget.request_repaint(REPAINT_OVERLAY)
                 return True
         return False
 
@@ -48,7 +50,7 @@ class OverlayManager:
                          last_pos,canvas_widget):
         """
         鼠标移动事件，如果有正在拖拽的元素则移动它。
-        同时更新hover状态。
+        同时更新hover状态。拖拽中或hover状态变化时才请求重绘。
 
         :param event: QMouseEvent
         :param last_pos: QPoint 上次鼠标位置
@@ -59,6 +61,7 @@ class OverlayManager:
         dy = my - last_pos.y()
 
         consumed = False
+        changed = False
         dragging_elem = None
         # 先查看有没有在拖拽的元素
         for e in self.elements:
@@ -70,30 +73,36 @@ class OverlayManager:
             dragging_elem.on_mouse_move(
                 mx, my, dx, dy)
             consumed = True
+            changed = True
         else:
             # 更新hover状态
             hit_any = False
             for e in self.elements:
                 hovered = e.hit_test(mx,
                                      my)
+                if hovered != getattr(e, 'is_hovered', False):
+                    changed = True
                 e.is_hovered = hovered
                 if hovered:
                     hit_any = True
             if hit_any:
                 consumed = True
-        if consumed:
-            canvas_widget.update()
+        if changed:
+            canvas_widget.request_repaint(REPAINT_OVERLAY)
         return consumed
 
     def mouse_release_event(self,
                             event,canvas_widget):
         mx, my = event.x(), event.y()
+        released = False
         for e in self.elements:
             if getattr(e, 'dragging',
                        False):
                 e.on_mouse_release(mx,
                                    my)
-        canvas_widget.update()
+                released = True
+        if released:
+            canvas_widget.request_repaint(REPAINT_OVERLAY)
         return False
 
     def get_vanishing_points(self):
@@ -0,0 +1,115 @@
+# rendering/camera_snapshot.py
+
+import numpy as np
+
+
+class CameraSnapshot:
+    """
+    某一帧相机状态的只读快照，由 Renderer3D 在视图变化时生成一次:
+      - view_matrix / projection_matrix / mvp / inv_mvp : (4,4)
+      - viewport_size : (w, h)
+      - eye : (3,) 相机位置
+
+    MVP 与其逆矩阵只在构造时计算一次，所有投影 / 反投影辅助函数都以它为参数，
+    而不是每个点重新做 projection_matrix @ view_matrix 和 np.linalg.inv。
+    所有数组均设为不可写，可放心在线程间或缓存中共享。
+    """
+
+    __slots__ = ("view_matrix", "projection_matrix", "mvp", "inv_mvp",
+                 "viewport_size", "eye", "key")
+
+    def __init__(self, view_matrix, projection_matrix, viewport_size,
+                 eye=(0.0, 0.0, 0.0)):
+        view = _frozen(view_matrix, np.float32)
+        proj = _frozen(projection_matrix, np.float32)
+        mvp = proj.astype(np.float64) @ view.astype(np.float64)
+        inv_mvp = np.linalg.inv(mvp)
+        w, h = viewport_size
+
+        _set = object.__setattr__
+        _set(self, "view_matrix", view)
+        _set(self, "projection_matrix", proj)
+        _set(self, "mvp", _frozen(mvp, np.float64))
+        _set(self, "inv_mvp", _frozen(inv_mvp, np.float64))
+        _set(self, "viewport_size", (int(w), int(h)))
+        _set(self, "eye", _frozen(np.asarray(eye).reshape(3), np.float32))
+        # 用于缓存比较: 两个快照 key 相同即屏幕投影结果相同
+        _set(self, "key", (view.tobytes(), proj.tobytes(),
+                           (int(w), int(h))))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CameraSnapshot is immutable")
+
+    def __eq__(self, other):
+        return isinstance(other, CameraSnapshot) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    @property
+    def width(self):
+        return self.viewport_size[0]
+
+    @property
+    def height(self):
+        return self.viewport_size[1]
+
+    # -----------------------------
+    # 3D -> 屏幕
+    # -----------------------------
+    def project_points(self, points_3d):
+        """
+        批量投影到屏幕坐标 (Y轴向下)。w 接近 0 的点返回 (9999, 9999)。
+        :param points_3d: (N,3)
+        :return: (N,2) float64
+        """
+        w, h = self.viewport_size
+        points_3d = np.asarray(points_3d, dtype=np.float64).reshape(-1, 3)
+        clip = points_3d @ self.mvp[:, :3].T + self.mvp[:, 3]
+
+        screen = np.full((len(points_3d), 2), 9999.0)
+        ok = np.abs(clip[:, 3]) >= 1e-9
+        ndc = clip[ok, :2] / clip[ok, 3:4]
+        screen[ok, 0] = (ndc[:, 0] * 0.5 + 0.5) * w
+        screen[ok, 1] = (1.0 - (ndc[:, 1] * 0.5 + 0.5)) * h
+        return screen
+
+    def project_point(self, pt3d):
+        return self.project_points(pt3d)[0]
+
+    # -----------------------------
+    # 屏幕 -> 3D 射线
+    # -----------------------------
+    def screen_rays(self, points_2d):
+        """
+        把屏幕点批量反投影为世界空间射线 (near 平面上的起点, 指向 far 平面的方向)。
+        :param points_2d: (N,2)
+        :return: (origins (N,3), directions (N,3))
+        """
+        w, h = self.viewport_size
+        pts = np.asarray(points_2d, dtype=np.float64).reshape(-1, 2)
+        n = len(pts)
+
+        clip = np.empty((2 * n, 4))
+        clip[:n, 0] = clip[n:, 0] = (pts[:, 0] / w) * 2.0 - 1.0
+        clip[:n, 1] = clip[n:, 1] = 1.0 - (pts[:, 1] / h) * 2.0
+        clip[:n, 2] = -1.0
+        clip[n:, 2] = 1.0
+        clip[:, 3] = 1.0
+
+        world = clip @ self.inv_mvp.T
+        hw = world[:, 3:4]
+        world = np.where(np.abs(hw) > 1e-9, world / np.where(hw == 0, 1, hw),
+                         world)
+        origins = world[:n, :3]
+        return origins, world[n:, :3] - origins
+
+    def screen_ray(self, pt2d):
+        origins, dirs = self.screen_rays(pt2d)
+        return origins[0], dirs[0]
+
+
+def _frozen(arr, dtype):
+    out = np.array(arr, dtype=dtype)
+    out.setflags(write=False)
+    return out
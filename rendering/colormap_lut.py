@@ -0,0 +1,73 @@
+# rendering/colormap_lut.py
+
+import numpy as np
+import matplotlib.pyplot as plt
+
+
+# (colormap名, 采样数) -> (size, 3) float32 颜色表，进程内共享
+_LUT_TABLES = {}
+
+
+def get_colormap_table(colormap='viridis', size=256):
+    """
+    把 Matplotlib colormap 采样一次成 (size, 3) 的 float32 颜色表，并缓存。
+    """
+    key = (colormap, size)
+    table = _LUT_TABLES.get(key)
+    if table is None:
+        cmap = plt.get_cmap(colormap)
+        rgba = np.asarray(cmap(np.linspace(0.0, 1.0, size)))
+        table = np.ascontiguousarray(rgba[:, :3], dtype=np.float32)
+        table.flags.writeable = False
+        _LUT_TABLES[key] = table
+    return table
+
+
+class ColormapLUT:
+    """
+    Depth colormap lookup table.
+    把距离值映射为颜色：先归一化到 [0,1]，再查表，整个过程都是向量化的数组运算。
+
+    Example:
+        lut = ColormapLUT('viridis', min_value=0.0, max_value=50.0)
+        colors = lut.map_distances(points, eye)   # (N,3) float32
+    """
+
+    def __init__(self, colormap='viridis',
+                 min_value=0.0,
+                 max_value=50.0,
+                 size=256):
+        self.colormap = colormap
+        self.min_value = min_value
+        self.max_value = max_value
+        self.size = size
+        self.table = get_colormap_table(colormap, size)
+
+    def sample(self, norm_values):
+        """
+        norm_values: 标量或数组, 取值 [0,1]
+        :return: (3,) 或 (N,3) float32
+        """
+        idx = np.rint(np.clip(norm_values, 0.0, 1.0) * (self.size - 1))
+        return self.table[idx.astype(np.intp)]
+
+    def map_values(self, values):
+        span = self.max_value - self.min_value
+        if span == 0:
+            span = 1.0
+        norm = (np.asarray(values, dtype=np.float32) - self.min_value) / span
+        return self.sample(norm)
+
+    def map_distances(self, points, eye):
+        """
+        一次性计算所有顶点到 eye 的距离并查表。
+        :param points: (N,3)
+        :param eye: (3,)
+        :return: (N,3) float32
+        """
+        points = np.asarray(points, dtype=np.float32)
+        if len(points) == 0:
+            return np.empty((0, 3), dtype=np.float32)
+        diff = points - np.asarray(eye, dtype=np.float32)
+        dists = np.sqrt(np.einsum('ij,ij->i', diff, diff))
+        return self.map_values(dists)
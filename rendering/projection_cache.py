@@ -0,0 +1,182 @@
+# rendering/projection_cache.py
+
+import numpy as np
+
+from data.stroke_events import StrokeChangeQueue
+
+
+def project_points_to_screen(points_3d, mvp, viewport_size):
+    """
+    批量把世界坐标投影到屏幕坐标。
+    :param points_3d: (N,3)
+    :param mvp: (4,4)
+    :param viewport_size: (w,h)
+    :return: (N,2) 屏幕坐标 (Y轴向下)
+    """
+    w, h = viewport_size
+    points_3d = np.asarray(points_3d, dtype=np.float32)
+    if len(points_3d) == 0:
+        return np.empty((0, 2), dtype=np.float32)
+
+    # 齐次坐标 => clip 坐标: 直接用 (N,3)@(3,4) + 平移列，避免拼接第四维
+    mvp = np.asarray(mvp, dtype=np.float32)
+    clip = points_3d @ mvp[:, :3].T + mvp[:, 3]  # (N,4)
+
+    # 透视除法，忽略 w=0 的情况
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ndc = np.where(clip[:, 3:4] != 0,
+                       clip[:, :2] / clip[:, 3:4],
+                       0)
+
+    screen = np.empty((len(points_3d), 2), dtype=np.float32)
+    screen[:, 0] = (ndc[:, 0] * 0.5 + 0.5) * w
+    screen[:, 1] = (1.0 - (ndc[:, 1] * 0.5 + 0.5)) * h  # Y轴翻转
+    return screen
+
+
+class ScreenProjectionCache:
+    """
+    Stroke3D.screen_coords 的缓存。
+
+    缓存键 = CameraSnapshot.key (view、projection、viewport)，再加上笔画集合的 version:
+      - 相机与笔画集合都没变: 不做任何投影 (例如选择工具悬停时的重绘)
+      - 相机没变、只增删改了笔画: 只投影新加入或被修改的笔画
+      - 相机变化: 全部重新投影
+    传入 StrokeCoordArena 时直接对整个坐标池做一次投影，结果保存在
+    screen_coords (与 arena.coords 一一对应)，每条笔画的 screen_coords 是其切片；
+    同时传入笔画管理器的 changes 时按变化事件只重投影变化的笔画区间。
+    revision 在屏幕坐标发生任何变化时自增；camera_revision 只在全部重新投影时自增，
+    供下游(如空间索引)区分"需要重建"与"只需增量更新"。
+    """
+
+    def __init__(self):
+        self.camera_key = None
+        self.stroke_version = None
+        self.revision = 0
+        self.camera_revision = 0
+        # stroke_id -> stroke 对象, 表示该笔画的 screen_coords 在当前相机下有效
+        self.projected = {}
+
+        # arena 模式下的整体屏幕坐标
+        self.arena = None
+        self.arena_generation = None
+        self.projected_used = 0
+        self.screen_coords = np.empty((0, 2), dtype=np.float32)
+        self._changes = StrokeChangeQueue()
+
+    def invalidate(self):
+        self.camera_key = None
+        self.stroke_version = None
+        self.projected.clear()
+        self.arena = None
+
+    def update(self, strokes_3d, stroke_version, camera, arena=None,
+               changes=None):
+        """
+        :param strokes_3d: 当前全部 Stroke3D
+        :param stroke_version: 笔画集合版本号 (None 表示未知, 每次全量投影)
+        :param camera: CameraSnapshot
+        :param arena: 笔画所在的 StrokeCoordArena (可选)
+        :param changes: 笔画管理器的 StrokeChangeBus (可选，配合 arena 使用)
+        :return: bool - 本次是否做了投影
+        """
+        camera_key = camera.key
+        if (stroke_version is not None
+                and camera_key == self.camera_key
+                and stroke_version == self.stroke_version):
+            return False
+
+        mvp = camera.mvp
+        viewport_size = camera.viewport_size
+        if arena is not None:
+            self._update_arena(strokes_3d, arena, camera_key, mvp,
+                               viewport_size, changes)
+        else:
+            self._update_strokes(strokes_3d, stroke_version, camera_key,
+                                 mvp, viewport_size)
+
+        self.camera_key = camera_key
+        self.stroke_version = stroke_version
+        self.revision += 1
+        return True
+
+    def _update_arena(self, strokes_3d, arena, camera_key, mvp,
+                      viewport_size, changes=None):
+        reset = False
+        changed = None
+        if changes is not None:
+            reset = self._changes.track(changes)
+            queued_reset, changed, _ = self._changes.collect()
+            reset = reset or queued_reset
+        full = (reset
+                or camera_key != self.camera_key
+                or arena is not self.arena
+                or arena.generation != self.arena_generation
+                or len(self.screen_coords) != arena.capacity)
+        used = arena.used
+        if full:
+            self.screen_coords = np.zeros((arena.capacity, 2),
+                                          dtype=np.float32)
+            self.screen_coords[:used] = project_points_to_screen(
+                arena.coords[:used], mvp, viewport_size)
+            todo = strokes_3d
+            self.camera_revision += 1
+        elif changed is not None:
+            # 只重投影新增/修改的笔画区间 (修改可能是原地写入，不一定在尾部)
+            todo = list(changed.values())
+            for s in todo:
+                off = int(arena.offsets[s.arena_slot])
+                n = int(arena.lengths[s.arena_slot])
+                self.screen_coords[off:off + n] = project_points_to_screen(
+                    arena.coords[off:off + n], mvp, viewport_size)
+        else:
+            # 不知道哪些笔画变了: 新增的笔画总是追加在上次投影的位置之后
+            start = self.projected_used
+            if used > start:
+                self.screen_coords[start:used] = project_points_to_screen(
+                    arena.coords[start:used], mvp, viewport_size)
+            todo = [s for s in strokes_3d
+                    if arena.offsets[s.arena_slot] >= start]
+
+        for s in todo:
+            off = int(arena.offsets[s.arena_slot])
+            s.screen_coords = self.screen_coords[
+                off:off + int(arena.lengths[s.arena_slot])]
+
+        self.arena = arena
+        self.arena_generation = arena.generation
+        self.projected_used = used
+
+    def _update_strokes(self, strokes_3d, stroke_version, camera_key, mvp,
+                        viewport_size):
+        if camera_key != self.camera_key or stroke_version is None:
+            todo = list(strokes_3d)
+            self.projected = {}
+            self.camera_revision += 1
+        else:
+            # 相机未变: 只投影新增(或被替换)的笔画，丢掉已删除的记录
+            current = {s.stroke_id: s for s in strokes_3d}
+            self.projected = {sid: s for sid, s in self.projected.items()
+                              if current.get(sid) is s}
+            todo = [s for sid, s in current.items()
+                    if self.projected.get(sid) is not s]
+
+        self._project(todo, mvp, viewport_size)
+        for s in todo:
+            self.projected[s.stroke_id] = s
+
+    def _project(self, strokes, mvp, viewport_size):
+        if not strokes:
+            return
+        lengths = [len(s.coords_3d) for s in strokes]
+        non_empty = [s.coords_3d for s, n in zip(strokes, lengths) if n > 0]
+        if non_empty:
+            screen = project_points_to_screen(np.vstack(non_empty), mvp,
+                                              viewport_size)
+        start = 0
+        for s, n in zip(strokes, lengths):
+            if n > 0:
+                s.screen_coords = screen[start:start + n]
+            else:
+                s.screen_coords = np.empty((0, 2), dtype=np.float32)
+            start += n
@@ -2,33 +2,107 @@
 
 import OpenGL.GL as gl
 import numpy as np
-import matplotlib.pyplot as plt
+
+from rendering.camera_snapshot import \
+    CameraSnapshot
+from rendering.colormap_lut import \
+    ColormapLUT
+from rendering.projection_cache import \
+    ScreenProjectionCache, project_points_to_screen
+from rendering.shader_manager import \
+    ShaderProgramManager
+from rendering.stroke_vertex_buffer import \
+    StrokeVertexBuffer
+from rendering.wide_line_renderer import \
+    WideLineRenderer
+from logic.frame_profiler import \
+    FrameProfiler
 
 class Renderer3D:
-    def __init__(self):
+    def __init__(self, profiler=None):
         self.projection_matrix = np.eye(4, dtype=np.float32)
         self.view_matrix = np.eye(4, dtype=np.float32)
+        self.eye = np.zeros(3, dtype=np.float32)
+        # 当前帧的只读相机快照，只在视图/投影/视口变化时重新生成
+        self.camera = None
         self.use_depth_color = True
+        # 深度着色查找表: colormap 只采样一次
+        self.depth_lut = ColormapLUT('viridis',
+                                     min_value=0.0,
+                                     max_value=50.0)
+        self._extra_luts = {}
+
+        # 屏幕坐标投影缓存 (按相机 + 笔画集合版本)
+        self.projection_cache = ScreenProjectionCache()
+
+        # 保留模式(VBO)绘制；initialize 时检测上下文是否支持缓冲对象
+        self.stroke_buffer = StrokeVertexBuffer()
+        self.use_vbo = False
+        self._vbo_color_key = None
+
+        # 几何着色器宽线管线 (需要 GLSL 330)，不可用时退回固定管线 VBO 绘制
+        self.shader_manager = ShaderProgramManager()
+        self.wide_line_renderer = WideLineRenderer(self.shader_manager)
+        self.use_wide_lines = False
+
+        # 阶段计时 (投影 / 笔画绘制)，默认是一个关闭的 FrameProfiler
+        self.profiler = profiler if profiler is not None else FrameProfiler()
 
     def initialize(self):
         gl.glClearColor(0.1,0.1,0.1,1.0)
         gl.glEnable(gl.GL_DEPTH_TEST)
 
+        try:
+            if not bool(gl.glGenBuffers) or not bool(gl.glMultiDrawArrays):
+                raise RuntimeError("buffer objects not supported")
+            self.stroke_buffer.create()
+            self.use_vbo = True
+        except Exception as e:
+            # 回退到立即模式
+            print("VBO path disabled:", e)
+            self.use_vbo = False
+
+        self.use_wide_lines = False
+        if self.use_vbo:
+            try:
+                self.wide_line_renderer.initialize(self.depth_lut)
+                self.use_wide_lines = True
+            except Exception as e:
+                print("Wide-line shader path disabled:", e)
+
     def resize(self, w, h):
         gl.glViewport(0,0,w,h)
         aspect = w/h if h!=0 else 1.0
         # 构建透视投影
         self.projection_matrix = perspective(45.0, aspect, 0.1, 100.0)
 
+    def get_camera_snapshot(self, viewport_size):
+        """
+        返回当前 view/projection/视口 对应的 CameraSnapshot。
+        与上一次的快照相同时直接复用，不重新求逆。
+        """
+        key = (np.asarray(self.view_matrix, dtype=np.float32).tobytes(),
+               np.asarray(self.projection_matrix,
+                          dtype=np.float32).tobytes(),
+               (int(viewport_size[0]), int(viewport_size[1])))
+        if self.camera is None or self.camera.key != key:
+            self.camera = CameraSnapshot(self.view_matrix,
+                                         self.projection_matrix,
+                                         viewport_size,
+                                         eye=self.eye)
+        return self.camera
+
     def render(self,
                               strokes_3d,
                               camera_rot,
                               camera_dist,
                               viewport_size,
                               lookat,
-                              activated_tool=None):
+                              activated_tool=None,
+                              stroke_manager_3d=None):
         """
         渲染所有笔画，并根据选择状态设置颜色。同时批量维护每个笔画的屏幕坐标。
+        传入 stroke_manager_3d 且上下文支持缓冲对象时走 VBO 路径，否则逐点立即模式绘制。
         """
         w, h = viewport_size
         gl.glViewport(0, 0, w, h)
@@ -47,9 +121,11 @@ class Renderer3D:
                       dtype=np.float32)
         self.view_matrix = look_at(
             eye, center, up)
+        self.eye = eye
 
-        # 计算 MVP 矩阵
-        mvp = self.projection_matrix @ self.view_matrix  # (4,4)
+        # 相机快照携带 MVP 与其逆矩阵，相机不动时沿用上一帧的对象
+        camera = self.get_camera_snapshot((w, h))
+        mvp = camera.mvp  # (4,4)
         '''
         if ground_plane is not None:
             model_mat = np.eye(4,
@@ -60,140 +136,142 @@ class Renderer3D:
                 self.projection_matrix)
         '''
         # 批量投影所有笔画的 3D 坐标到 2D 屏幕坐标
-        # 首先收集所有坐标
+        # 相机和笔画集合都没变时直接复用缓存，不做任何投影
         if len(strokes_3d) > 0:
-            # 批量投影所有笔画的 3D 坐标到 2D 屏幕坐标
-            all_coords_3d = np.vstack(
-                [stroke.coords_3d for
-                 stroke in
-                 strokes_3d])  # (Total_N, 3)
-            stroke_lengths = [
-                len(stroke.coords_3d)
-                for stroke in
-                strokes_3d]
-
-            # 添加第四维齐次坐标
-            all_coords_homog = np.hstack(
-                (all_coords_3d, np.ones(
-                    (
-                    all_coords_3d.shape[
-                        0], 1),
-                    dtype=np.float32)))  # (Total_N, 4)
-
-            # 计算 Clip 坐标
-            clip_coords = (
-                        mvp @ all_coords_homog.T).T  # (Total_N, 4)
-
-            # 透视除法，忽略 w=0 的情况
-            with np.errstate(
-                    divide='ignore',
-                    invalid='ignore'):
-                ndc = np.where(
-                    clip_coords[:,
-                    3:4] != 0,
-                    clip_coords[:,
-                    :3] / clip_coords[:,
-                          3:4],
-                    0)  # (Total_N, 3)
-
-            # 转换为屏幕坐标
-            x_screen = (ndc[:,
-                        0] * 0.5 + 0.5) * w
-            y_screen = (1.0 - (ndc[:,
-                               1] * 0.5 + 0.5)) * h  # Y轴翻转
-            screen_coords = np.stack(
-                (x_screen, y_screen),
-                axis=-1)  # (Total_N, 2)
-
-            # 将屏幕坐标分配回各个笔画
-            start = 0
-            for stroke, length in zip(
-                    strokes_3d,
-                    stroke_lengths):
-                if length > 0:
-                    stroke.screen_coords = screen_coords[
-                                           start:start + length]
+            with self.profiler.stage("render3d.projection"):
+                if stroke_manager_3d is not None:
+                    self.projection_cache.update(
+                        strokes_3d, stroke_manager_3d.version, camera,
+                        arena=stroke_manager_3d.arena,
+                        changes=stroke_manager_3d.changes)
                 else:
-                    stroke.screen_coords = np.empty(
-                        (0, 2),
-                        dtype=np.float32)
-                start += length
+                    self.projection_cache.update(
+                        strokes_3d, None, camera)
 
             # 遍历所有笔画，设置颜色并绘制
-            for stroke in strokes_3d:
-                # 如果未启用深度映射，就用 stroke 原有的选中/悬停/默认颜色
-                if not self.use_depth_color:
-                    if stroke.is_selected:
-                        r, g, b = (
-                        1.0, 1.0,
-                        0.0)  # 选中：黄色
-                    elif stroke.is_hovered:
-                        r, g, b = (
-                        0.0, 1.0,
-                        0.0)  # 悬停：绿色
-                    else:
-                        r, g, b = stroke.color  # 普通：自定义
-
-                    gl.glColor3f(r, g,
-                                 b)
-                    gl.glLoadMatrixf(
-                        mvp.T)
-
-                    if len(stroke.coords_3d) > 0:
-                        gl.glBegin(
-                            gl.GL_LINE_STRIP)
-                        for p in stroke.coords_3d:
-                            gl.glVertex3f(
-                                p[0],
-                                p[1],
-                                p[2])
-                        gl.glEnd()
-
+            with self.profiler.stage("render3d.strokes"):
+                if self.use_vbo and stroke_manager_3d is not None:
+                    self._render_strokes_vbo(
+                        stroke_manager_3d, mvp, eye, viewport_size)
                 else:
-                    # 如果开启深度映射，每个顶点根据与 eye 的距离计算颜色 (R,0,B)
-
-
-                    gl.glLoadMatrixf(
-                        mvp.T)
-                    if len(stroke.coords_3d) > 0:
-                        gl.glBegin(
-                            gl.GL_LINE_STRIP)
-                        for p in stroke.coords_3d:
-                            dist = np.linalg.norm(
-                                p - eye)
-                            # 使用一个简易函数：蓝色分量在近处~1，随 dist 增加衰减
-                            # (可调节 0.2, 0.3 等让近处变化更明显)
-                            rgb = self.distance_to_rgb(dist)
-
-                            if stroke.is_selected:
-                                r, g, b = (
-                                    1.0,
-                                    1.0,
-                                    0.0)  # 选中：黄色
-                            elif stroke.is_hovered:
-                                r, g, b = (
-                                    0.0,
-                                    1.0,
-                                    0.0)  # 悬停：绿色
-                            else:
-                                r, g, b = (
-                                    rgb[0],rgb[1],rgb[2]
-                                )
-                            gl.glColor3f(
-                                r,
-                                g,
-                                b)
-                            gl.glVertex3f(
-                                p[0],
-                                p[1],
-                                p[2])
-                        gl.glEnd()
+                    self._render_strokes_immediate(
+                        strokes_3d, mvp, eye)
 
             # 绘制选择圆（如果有）
         if activated_tool is not None:
             activated_tool.render_tool_icon(self,viewport_size)
 
 
+    def _render_strokes_immediate(self, strokes_3d, mvp, eye):
+        """
+        立即模式(glBegin/glVertex)逐点绘制，作为不支持缓冲对象时的回退路径。
+        """
+        for stroke in strokes_3d:
+            # 如果未启用深度映射，就用 stroke 原有的选中/悬停/默认颜色
+            if not self.use_depth_color:
+                if stroke.is_selected:
+                    r, g, b = (
+                    1.0, 1.0,
+                    0.0)  # 选中：黄色
+                elif stroke.is_hovered:
+                    r, g, b = (
+                    0.0, 1.0,
+                    0.0)  # 悬停：绿色
+                else:
+                    r, g, b = stroke.color  # 普通：自定义
+
+                gl.glColor3f(r, g,
+                             b)
+                gl.glLoadMatrixf(
+                    mvp.T)
+
+                if len(stroke.coords_3d) > 0:
+                    gl.glBegin(
+                        gl.GL_LINE_STRIP)
+                    for p in stroke.coords_3d:
+                        gl.glVertex3f(
+                            p[0],
+                            p[1],
+                            p[2])
+                    gl.glEnd()
+
+            else:
+                # 如果开启深度映射，每个顶点根据与 eye 的距离查表得到颜色
+                gl.glLoadMatrixf(
+                    mvp.T)
+                if len(stroke.coords_3d) > 0:
+                    if stroke.is_selected:
+                        gl.glColor3f(1.0, 1.0, 0.0)  # 选中：黄色
+                    elif stroke.is_hovered:
+                        gl.glColor3f(0.0, 1.0, 0.0)  # 悬停：绿色
+                    highlighted = stroke.is_selected or stroke.is_hovered
+                    if not highlighted:
+                        # 整条笔画的颜色一次性向量化计算
+                        colors = self.depth_lut.map_distances(
+                            stroke.coords_3d, eye)
+                    gl.glBegin(
+                        gl.GL_LINE_STRIP)
+                    for i, p in enumerate(stroke.coords_3d):
+                        if not highlighted:
+                            gl.glColor3f(*colors[i])
+                        gl.glVertex3f(
+                            p[0],
+                            p[1],
+                            p[2])
+                    gl.glEnd()
+
+    def _render_strokes_vbo(self, stroke_manager_3d, mvp, eye,
+                            viewport_size):
+        """
+        保留模式: 所有笔画存放在 StrokeVertexBuffer 中，
+        先用逐顶点颜色一次性绘制全部笔画，再把选中/悬停的笔画用统一颜色覆盖绘制一遍。
+        着色器管线可用时，线宽扩展和深度着色都交给 GPU。
+        """
+        buffer = self.stroke_buffer
+        changed = buffer.sync(stroke_manager_3d)
+
+        if self.use_wide_lines:
+            buffer.upload()
+            self.wide_line_renderer.render(
+                buffer, mvp, eye, viewport_size,
+                self.depth_lut,
+                use_depth_color=self.use_depth_color)
+            return
+
+        # 颜色只在视点/笔画集合/着色模式变化时重新计算
+        color_key = (self.use_depth_color, tuple(np.round(eye, 6)),
+                     buffer.synced_version)
+        if changed or color_key != self._vbo_color_key:
+            if self.use_depth_color:
+                n = buffer.vertex_count
+                buffer.update_colors(self.depth_lut.map_distances(
+                    buffer.positions[:n], eye))
+            else:
+                buffer.apply_stroke_colors()
+            self._vbo_color_key = color_key
+        buffer.upload()
+
+        gl.glLoadMatrixf(mvp.T)
+        buffer.draw(use_colors=True)
+
+        selected_ids = []
+        hovered_ids = []
+        for sid, stroke in buffer.strokes.items():
+            if stroke.is_selected:
+                selected_ids.append(sid)
+            elif stroke.is_hovered:
+                hovered_ids.append(sid)
+        if selected_ids or hovered_ids:
+            # 高亮笔画与原笔画深度完全相同，用 LEQUAL 让后画的覆盖先画的
+            gl.glDepthFunc(gl.GL_LEQUAL)
+            if hovered_ids:
+                gl.glColor3f(0.0, 1.0, 0.0)  # 悬停：绿色
+                buffer.draw(use_colors=False, stroke_ids=hovered_ids)
+            if selected_ids:
+                gl.glColor3f(1.0, 1.0, 0.0)  # 选中：黄色
+                buffer.draw(use_colors=False, stroke_ids=selected_ids)
+            gl.glDepthFunc(gl.GL_LESS)
+
     def render_tools_hover_icon(self,tool):
         pass
     def render_selection_circle(self, cx, cy, radius, viewport_size):
@@ -243,6 +321,7 @@ class Renderer3D:
 
         Returns:
             tuple: A tuple of (R, G, B) values, each in the range [0, 1].
+                   If distance is an array of shape (N,), an (N, 3) array is returned.
         """
         # Normalize the distance value to [0, 1]
         norm_distance = (
@@ -252,13 +331,15 @@ class Renderer3D:
             norm_distance, 0.0,
             1.0)  # Ensure within [0, 1]
 
-        # Get the colormap
-        cmap = plt.get_cmap(colormap)
-
-        # Convert normalized distance to an RGB color
-        rgba = cmap(norm_distance)
-        return rgba[
-               :3]  # Exclude the alpha channel
+        # Look up the pre-sampled colormap table instead of calling Matplotlib
+        if colormap == self.depth_lut.colormap:
+            lut = self.depth_lut
+        else:
+            lut = self._extra_luts.get(colormap)
+            if lut is None:
+                lut = ColormapLUT(colormap)
+                self._extra_luts[colormap] = lut
+        return lut.sample(norm_distance)
 
     def project_to_screen_batch(self,
                                 strokes_3d,
@@ -267,44 +348,19 @@ class Renderer3D:
         """
         批量计算所有笔画的屏幕坐标，并更新 Stroke3D 对象。
         """
-        w, h = viewport_size
+        if len(strokes_3d) == 0:
+            return
         # 收集所有坐标
         all_coords_3d = np.vstack(
             [stroke.coords_3d for stroke in
              strokes_3d])  # (Total_N, 3)
-        num_strokes = len(strokes_3d)
         stroke_lengths = [
             len(stroke.coords_3d) for stroke
             in strokes_3d]
 
-        # 添加第四维齐次坐标
-        all_coords_homog = np.hstack((
-                                     all_coords_3d,
-                                     np.ones(
-                                         (
-                                         all_coords_3d.shape[
-                                             0],
-                                         1),
-                                         dtype=np.float32)))  # (Total_N, 4)
-
-        # 计算 Clip 坐标
-        clip_coords = (
-                    mvp_matrix @ all_coords_homog.T).T  # (Total_N, 4)
-
-        # 透视除法
-        ndc = clip_coords[:,
-              :3] / clip_coords[:,
-                    3].reshape(-1,
-                               1)  # (Total_N, 3)
-
-        # 转换为屏幕坐标
-        x_screen = (ndc[:,
-                    0] * 0.5 + 0.5) * w
-        y_screen = (1.0 - (ndc[:,
-                           1] * 0.5 + 0.5)) * h  # Y轴翻转
-        screen_coords = np.stack(
-            (x_screen, y_screen),
-            axis=-1)  # (Total_N, 2)
+        screen_coords = project_points_to_screen(
+            all_coords_3d, mvp_matrix,
+            viewport_size)  # (Total_N, 2)
 
         # 将屏幕坐标分配回各个笔画
         start = 0
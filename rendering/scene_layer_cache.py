@@ -0,0 +1,115 @@
+# rendering/scene_layer_cache.py
+
+import OpenGL.GL as gl
+
+
+class SceneLayerCache:
+    """
+    3D 场景层的离屏缓存 (颜色 + 深度/模板 renderbuffer 组成的 FBO)。
+    只有场景、悬停/选中或相机变化时才重新渲染 3D 层，
+    其余帧 (如只有选择圈、绘制中的 2D 笔画、overlay 变化) 直接把缓存
+    blit 到画布的帧缓冲，再在上面画 2D 层。深度也一起拷贝，2D 层的深度测试结果不变。
+
+    上下文不支持 FBO / blit (或格式不匹配导致 blit 失败) 时 supported 置为 False，
+    画布回退为每帧直接渲染 3D 层。
+    """
+
+    def __init__(self):
+        self.fbo = None
+        self.color_rb = None
+        self.depth_rb = None
+        self.size = (0, 0)
+        self.valid = False
+        self.supported = True
+
+    def ensure(self, w, h):
+        """
+        保证缓存与视口大小一致 (大小变化时重建并置为无效)。
+        :return: bool - 是否可用
+        """
+        if not self.supported or w <= 0 or h <= 0:
+            return False
+        if self.fbo is not None and self.size == (w, h):
+            return True
+        self.release()
+        try:
+            self.fbo = gl.glGenFramebuffers(1)
+            self.color_rb, self.depth_rb = gl.glGenRenderbuffers(2)
+            gl.glBindRenderbuffer(gl.GL_RENDERBUFFER, self.color_rb)
+            gl.glRenderbufferStorage(gl.GL_RENDERBUFFER, gl.GL_RGBA8, w, h)
+            gl.glBindRenderbuffer(gl.GL_RENDERBUFFER, self.depth_rb)
+            gl.glRenderbufferStorage(gl.GL_RENDERBUFFER,
+                                     gl.GL_DEPTH24_STENCIL8, w, h)
+            gl.glBindRenderbuffer(gl.GL_RENDERBUFFER, 0)
+
+            gl.glBindFramebuffer(gl.GL_FRAMEBUFFER, self.fbo)
+            gl.glFramebufferRenderbuffer(gl.GL_FRAMEBUFFER,
+                                         gl.GL_COLOR_ATTACHMENT0,
+                                         gl.GL_RENDERBUFFER, self.color_rb)
+            gl.glFramebufferRenderbuffer(gl.GL_FRAMEBUFFER,
+                                         gl.GL_DEPTH_STENCIL_ATTACHMENT,
+                                         gl.GL_RENDERBUFFER, self.depth_rb)
+            status = gl.glCheckFramebufferStatus(gl.GL_FRAMEBUFFER)
+            if status != gl.GL_FRAMEBUFFER_COMPLETE:
+                raise RuntimeError("incomplete framebuffer: 0x%x" % status)
+        except Exception as e:
+            print("Scene layer cache disabled:", e)
+            self.disable()
+            return False
+        self.size = (w, h)
+        self.valid = False
+        return True
+
+    def begin(self):
+        """
+        之后的绘制进入缓存。
+        """
+        gl.glBindFramebuffer(gl.GL_FRAMEBUFFER, self.fbo)
+
+    def end(self, target_fbo):
+        """
+        结束向缓存绘制，切回 target_fbo (画布的帧缓冲)。
+        """
+        gl.glBindFramebuffer(gl.GL_FRAMEBUFFER, target_fbo)
+        self.valid = True
+
+    def blit(self, target_fbo):
+        """
+        把缓存的颜色与深度拷贝到 target_fbo，之后 target_fbo 处于绑定状态。
+        :return: bool - 失败时缓存被停用，调用方应直接渲染 3D 层
+        """
+        w, h = self.size
+        try:
+            gl.glBindFramebuffer(gl.GL_READ_FRAMEBUFFER, self.fbo)
+            gl.glBindFramebuffer(gl.GL_DRAW_FRAMEBUFFER, target_fbo)
+            gl.glBlitFramebuffer(0, 0, w, h, 0, 0, w, h,
+                                 gl.GL_COLOR_BUFFER_BIT
+                                 | gl.GL_DEPTH_BUFFER_BIT,
+                                 gl.GL_NEAREST)
+        except Exception as e:
+            print("Scene layer cache disabled:", e)
+            gl.glBindFramebuffer(gl.GL_FRAMEBUFFER, target_fbo)
+            self.disable()
+            return False
+        gl.glBindFramebuffer(gl.GL_FRAMEBUFFER, target_fbo)
+        return True
+
+    def invalidate(self):
+        self.valid = False
+
+    def disable(self):
+        self.release()
+        self.supported = False
+
+    def release(self):
+        if self.fbo is not None:
+            gl.glDeleteFramebuffers(1, [self.fbo])
+        renderbuffers = [rb for rb in (self.color_rb, self.depth_rb)
+                         if rb is not None]
+        if renderbuffers:
+            gl.glDeleteRenderbuffers(len(renderbuffers), renderbuffers)
+        self.fbo = None
+        self.color_rb = None
+        self.depth_rb = None
+        self.size = (0, 0)
+        self.valid = False
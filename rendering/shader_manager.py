@@ -0,0 +1,82 @@
+# rendering/shader_manager.py
+
+import os
+
+import OpenGL.GL as gl
+from OpenGL.GL import shaders as gl_shaders
+
+
+SHADER_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "shaders")
+
+
+class ShaderProgramManager:
+    """
+    编译并缓存 shaders/ 目录下的着色器程序。
+
+    程序名 name 对应文件:
+        shaders/{name}_vs.glsl   (必需)
+        shaders/{name}_gs.glsl   (可选)
+        shaders/{name}_fs.glsl   (必需)
+
+    同一个程序只编译一次；uniform location 也会缓存，避免每帧 glGetUniformLocation。
+    """
+
+    def __init__(self, shader_dir=SHADER_DIR):
+        self.shader_dir = shader_dir
+        self.programs = {}
+        self._uniform_locations = {}
+
+    def _read_source(self, filename):
+        path = os.path.join(self.shader_dir, filename)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def get_program(self, name):
+        """
+        返回已编译的程序；第一次调用时编译。编译/链接失败会抛出异常。
+        """
+        program = self.programs.get(name)
+        if program is not None:
+            return program
+
+        stages = [
+            (f"{name}_vs.glsl", gl.GL_VERTEX_SHADER),
+            (f"{name}_gs.glsl", gl.GL_GEOMETRY_SHADER),
+            (f"{name}_fs.glsl", gl.GL_FRAGMENT_SHADER),
+        ]
+        compiled = []
+        for filename, stage in stages:
+            source = self._read_source(filename)
+            if source is None:
+                if stage == gl.GL_GEOMETRY_SHADER:
+                    continue
+                raise FileNotFoundError(
+                    os.path.join(self.shader_dir, filename))
+            compiled.append(
+                gl_shaders.compileShader(source, stage))
+
+        # validate=False: 链接时还没有绑定 VAO，部分驱动会误报校验失败
+        program = gl_shaders.compileProgram(*compiled, validate=False)
+        for shader in compiled:
+            gl.glDeleteShader(shader)
+
+        self.programs[name] = program
+        return program
+
+    def uniform_location(self, program, uniform_name):
+        key = (program, uniform_name)
+        loc = self._uniform_locations.get(key)
+        if loc is None:
+            loc = gl.glGetUniformLocation(program, uniform_name)
+            self._uniform_locations[key] = loc
+        return loc
+
+    def release(self):
+        for program in self.programs.values():
+            gl.glDeleteProgram(program)
+        self.programs.clear()
+        self._uniform_locations.clear()
@@ -0,0 +1,282 @@
+# rendering/stroke_vertex_buffer.py
+
+import numpy as np
+import OpenGL.GL as gl
+
+from data.stroke_events import StrokeChangeQueue
+
+
+class StrokeVertexBuffer:
+    """
+    把 StrokeManager3D 的坐标池(StrokeCoordArena)镜像到顶点缓冲(VBO)，
+    用 glMultiDrawArrays 一次性绘制全部笔画。
+
+    - 位置数据直接就是 arena.coords，不再逐笔画拷贝/拼接；
+      ranges: stroke_id -> (first, count) 即笔画在 arena 中的区间
+    - 订阅 StrokeManager3D 的变化事件: arena 的 generation 不变时只处理
+      新增/修改/删除的笔画，上传它们覆盖的区间；generation 变化或整体替换时整块重传。
+    - 顶点颜色放在另一块等长的 color VBO 中(深度着色 / 笔画自身颜色)。
+    - params: 每个顶点沿笔画的归一化弧长 [0,1]，作为宽线着色器的 inParam。
+    """
+
+    def __init__(self):
+        self.arena = None
+        self.arena_generation = None
+        self.capacity = 0
+        # 已同步到 GPU 的顶点数(arena.used)
+        self.vertex_count = 0
+
+        self.colors = np.empty((0, 3), dtype=np.float32)
+        self.params = np.empty(0, dtype=np.float32)
+
+        self.ranges = {}
+        self.strokes = {}
+        self.firsts = np.empty(0, dtype=np.int32)
+        self.counts = np.empty(0, dtype=np.int32)
+
+        self.position_vbo = None
+        self.color_vbo = None
+        self.param_vbo = None
+        self.synced_version = -1
+        self._changes = StrokeChangeQueue()
+
+        # 待上传的区间 [start, end)，以及是否需要整块重新分配
+        self._dirty_start = None
+        self._dirty_end = 0
+        self._needs_realloc = True
+        self._colors_dirty = False
+
+    @property
+    def positions(self):
+        if self.arena is None:
+            return np.empty((0, 3), dtype=np.float32)
+        return self.arena.coords
+
+    # -----------------------------
+    # GL 资源
+    # -----------------------------
+    def create(self):
+        """
+        在有效的 GL 上下文中创建缓冲对象。失败时抛出异常，由调用方回退到立即模式。
+        """
+        self.position_vbo, self.color_vbo, self.param_vbo = gl.glGenBuffers(3)
+        self._needs_realloc = True
+
+    def release(self):
+        if self.position_vbo is not None:
+            gl.glDeleteBuffers(3, [self.position_vbo, self.color_vbo,
+                                   self.param_vbo])
+        self.position_vbo = None
+        self.color_vbo = None
+        self.param_vbo = None
+
+    # -----------------------------
+    # 同步
+    # -----------------------------
+    def sync(self, stroke_manager_3d):
+        """
+        和 StrokeManager3D 对齐：version 未变化时直接返回。
+        返回 True 表示缓冲内容发生了变化。
+        """
+        if stroke_manager_3d.version == self.synced_version:
+            return False
+
+        arena = stroke_manager_3d.arena
+        rebuild = self._changes.track(stroke_manager_3d.changes)
+        reset, changed, removed = self._changes.collect()
+
+        if (rebuild or reset
+                or arena is not self.arena
+                or arena.generation != self.arena_generation
+                or arena.capacity != self.capacity):
+            # arena 被重新分配或压缩 => 所有区间都可能移动，整块重传
+            self.arena = arena
+            self.arena_generation = arena.generation
+            self.capacity = arena.capacity
+            self.colors = np.zeros((self.capacity, 3), dtype=np.float32)
+            self.params = np.zeros(self.capacity, dtype=np.float32)
+            self._needs_realloc = True
+            self.strokes = {}
+            self.ranges = {}
+            changed = stroke_manager_3d.strokes_3d
+            self._mark_dirty(0, arena.used)
+        else:
+            for sid in removed:
+                self.strokes.pop(sid, None)
+                self.ranges.pop(sid, None)
+
+        for sid, s in changed.items():
+            off = int(arena.offsets[s.arena_slot])
+            n = int(arena.lengths[s.arena_slot])
+            self.strokes[sid] = s
+            if n > 0:
+                self.ranges[sid] = (off, n)
+            else:
+                self.ranges.pop(sid, None)
+            self.colors[off:off + n] = s.color
+            self.params[off:off + n] = arc_length_params(
+                arena.coords[off:off + n])
+            self._mark_dirty(off, off + n)
+
+        self.vertex_count = arena.used
+        self._rebuild_draw_ranges()
+        self.synced_version = stroke_manager_3d.version
+        return True
+
+    def _mark_dirty(self, start, end):
+        if self._dirty_start is None:
+            self._dirty_start = start
+        else:
+            self._dirty_start = min(self._dirty_start, start)
+        self._dirty_end = max(self._dirty_end, end)
+
+    def _rebuild_draw_ranges(self):
+        if self.ranges:
+            arr = np.array(list(self.ranges.values()), dtype=np.int32)
+            self.firsts = np.ascontiguousarray(arr[:, 0])
+            self.counts = np.ascontiguousarray(arr[:, 1])
+        else:
+            self.firsts = np.empty(0, dtype=np.int32)
+            self.counts = np.empty(0, dtype=np.int32)
+
+    # -----------------------------
+    # 颜色
+    # -----------------------------
+    def update_colors(self, colors):
+        """
+        colors: (vertex_count, 3) 与 positions 对齐的逐顶点颜色
+        """
+        self.colors[:self.vertex_count] = colors
+        self._colors_dirty = True
+
+    def apply_stroke_colors(self):
+        """
+        用每条笔画自身的 color 填充颜色缓冲(未开启深度着色时使用)。
+        """
+        for sid, (first, count) in self.ranges.items():
+            self.colors[first:first + count] = self.strokes[sid].color
+        self._colors_dirty = True
+
+    # -----------------------------
+    # 上传 & 绘制
+    # -----------------------------
+    def upload(self):
+        """
+        把 CPU 镜像中变化的区间上传到 GPU。
+        """
+        if self.position_vbo is None or self.arena is None:
+            return
+        float_size = 3 * 4
+        if self._needs_realloc:
+            gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.position_vbo)
+            gl.glBufferData(gl.GL_ARRAY_BUFFER, self.arena.coords,
+                            gl.GL_DYNAMIC_DRAW)
+            gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.color_vbo)
+            gl.glBufferData(gl.GL_ARRAY_BUFFER, self.colors,
+                            gl.GL_DYNAMIC_DRAW)
+            gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.param_vbo)
+            gl.glBufferData(gl.GL_ARRAY_BUFFER, self.params,
+                            gl.GL_DYNAMIC_DRAW)
+            self._needs_realloc = False
+            self._colors_dirty = False
+        else:
+            if self._dirty_start is not None and self._dirty_end > self._dirty_start:
+                start, end = self._dirty_start, self._dirty_end
+                gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.position_vbo)
+                gl.glBufferSubData(gl.GL_ARRAY_BUFFER, start * float_size,
+                                   (end - start) * float_size,
+                                   self.arena.coords[start:end])
+                gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.param_vbo)
+                gl.glBufferSubData(gl.GL_ARRAY_BUFFER, start * 4,
+                                   (end - start) * 4,
+                                   self.params[start:end])
+                if not self._colors_dirty:
+                    gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.color_vbo)
+                    gl.glBufferSubData(gl.GL_ARRAY_BUFFER, start * float_size,
+                                       (end - start) * float_size,
+                                       self.colors[start:end])
+            if self._colors_dirty and self.vertex_count > 0:
+                gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.color_vbo)
+                gl.glBufferSubData(gl.GL_ARRAY_BUFFER, 0,
+                                   self.vertex_count * float_size,
+                                   self.colors[:self.vertex_count])
+            self._colors_dirty = False
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, 0)
+        self._dirty_start = None
+        self._dirty_end = 0
+
+    def _select_ranges(self, stroke_ids):
+        if stroke_ids is None:
+            return self.firsts, self.counts
+        sel = [self.ranges[sid] for sid in stroke_ids
+               if sid in self.ranges]
+        if not sel:
+            return self.firsts[:0], self.counts[:0]
+        arr = np.array(sel, dtype=np.int32)
+        return (np.ascontiguousarray(arr[:, 0]),
+                np.ascontiguousarray(arr[:, 1]))
+
+    def draw(self, use_colors=True, stroke_ids=None):
+        """
+        glMultiDrawArrays 一次绘制全部(或指定 stroke_ids 的)笔画。
+        use_colors=False 时使用当前 glColor 的统一颜色(用于选中/悬停高亮)。
+        """
+        firsts, counts = self._select_ranges(stroke_ids)
+        if len(firsts) == 0:
+            return
+
+        gl.glEnableClientState(gl.GL_VERTEX_ARRAY)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.position_vbo)
+        gl.glVertexPointer(3, gl.GL_FLOAT, 0, None)
+        if use_colors:
+            gl.glEnableClientState(gl.GL_COLOR_ARRAY)
+            gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.color_vbo)
+            gl.glColorPointer(3, gl.GL_FLOAT, 0, None)
+
+        gl.glMultiDrawArrays(gl.GL_LINE_STRIP, firsts, counts,
+                             len(firsts))
+
+        if use_colors:
+            gl.glDisableClientState(gl.GL_COLOR_ARRAY)
+        gl.glDisableClientState(gl.GL_VERTEX_ARRAY)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, 0)
+
+    def draw_attributes(self, position_location=0, param_location=1,
+                        stroke_ids=None):
+        """
+        以通用顶点属性(inPosition / inParam)绘制，供着色器管线使用。
+        """
+        firsts, counts = self._select_ranges(stroke_ids)
+        if len(firsts) == 0:
+            return
+
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.position_vbo)
+        gl.glEnableVertexAttribArray(position_location)
+        gl.glVertexAttribPointer(position_location, 3, gl.GL_FLOAT,
+                                 gl.GL_FALSE, 0, None)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.param_vbo)
+        gl.glEnableVertexAttribArray(param_location)
+        gl.glVertexAttribPointer(param_location, 1, gl.GL_FLOAT,
+                                 gl.GL_FALSE, 0, None)
+
+        gl.glMultiDrawArrays(gl.GL_LINE_STRIP, firsts, counts,
+                             len(firsts))
+
+        gl.glDisableVertexAttribArray(position_location)
+        gl.glDisableVertexAttribArray(param_location)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, 0)
+
+
+def arc_length_params(coords):
+    """
+    每个顶点沿折线的归一化弧长 [0,1]。
+    """
+    n = len(coords)
+    if n < 2:
+        return np.zeros(n, dtype=np.float32)
+    seg = np.linalg.norm(np.diff(coords, axis=0), axis=1)
+    cum = np.concatenate(([0.0], np.cumsum(seg)))
+    total = cum[-1]
+    if total <= 0:
+        return np.zeros(n, dtype=np.float32)
+    return (cum / total).astype(np.float32)
@@ -0,0 +1,147 @@
+# rendering/wide_line_renderer.py
+
+import numpy as np
+import OpenGL.GL as gl
+
+
+class WideLineRenderer:
+    """
+    基于 shaders/line_width_*.glsl 的宽线绘制管线:
+      - 顶点着色器读取 inPosition(location=0) / inParam(location=1)
+      - 几何着色器把每段线扩展成屏幕空间固定像素宽度的四边形
+      - 片元着色器用 1D colormap 纹理做深度着色，或使用统一颜色 uColor
+
+    顶点数据直接复用 StrokeVertexBuffer 中打包好的 VBO，
+    所有 uniform 都是每次 draw 设置一次，而不是每个顶点。
+    """
+
+    PROGRAM_NAME = "line_width"
+
+    def __init__(self, shader_manager,
+                 base_width=1.5,
+                 scale_factor=0.0):
+        """
+        :param base_width: float - 线的半宽(像素)
+        :param scale_factor: float - 线宽随 inParam 变化的系数
+        """
+        self.shader_manager = shader_manager
+        self.base_width = base_width
+        self.scale_factor = scale_factor
+
+        self.program = None
+        self.vao = None
+        self.colormap_texture = None
+        self._colormap_table = None
+
+    def initialize(self, depth_lut):
+        """
+        编译着色器、创建 VAO 与 colormap 纹理。上下文不支持 GLSL 330 时抛出异常。
+        """
+        self.program = self.shader_manager.get_program(self.PROGRAM_NAME)
+        if bool(gl.glGenVertexArrays):
+            self.vao = gl.glGenVertexArrays(1)
+        self.colormap_texture = gl.glGenTextures(1)
+        self.upload_colormap(depth_lut)
+
+    def upload_colormap(self, depth_lut):
+        """
+        把 ColormapLUT 的颜色表上传为 1D 纹理；同一张表只上传一次。
+        """
+        if self._colormap_table is depth_lut.table:
+            return
+        gl.glBindTexture(gl.GL_TEXTURE_1D, self.colormap_texture)
+        gl.glTexParameteri(gl.GL_TEXTURE_1D, gl.GL_TEXTURE_MIN_FILTER,
+                           gl.GL_LINEAR)
+        gl.glTexParameteri(gl.GL_TEXTURE_1D, gl.GL_TEXTURE_MAG_FILTER,
+                           gl.GL_LINEAR)
+        gl.glTexParameteri(gl.GL_TEXTURE_1D, gl.GL_TEXTURE_WRAP_S,
+                           gl.GL_CLAMP_TO_EDGE)
+        gl.glTexImage1D(gl.GL_TEXTURE_1D, 0, gl.GL_RGB32F,
+                        len(depth_lut.table), 0, gl.GL_RGB,
+                        gl.GL_FLOAT, depth_lut.table)
+        gl.glBindTexture(gl.GL_TEXTURE_1D, 0)
+        self._colormap_table = depth_lut.table
+
+    def _set_uniform(self, name, setter, *values):
+        loc = self.shader_manager.uniform_location(self.program, name)
+        if loc >= 0:
+            setter(loc, *values)
+
+    def render(self, stroke_buffer, mvp, eye, viewport_size,
+               depth_lut, use_depth_color=True):
+        """
+        先绘制全部笔画，再把选中/悬停笔画以统一颜色覆盖绘制。
+        stroke_buffer 需已 sync + upload。
+        """
+        w, h = viewport_size
+        self.upload_colormap(depth_lut)
+
+        gl.glUseProgram(self.program)
+        if self.vao is not None:
+            gl.glBindVertexArray(self.vao)
+
+        self._set_uniform("uMVP", gl.glUniformMatrix4fv, 1, gl.GL_TRUE,
+                          np.ascontiguousarray(mvp, dtype=np.float32))
+        self._set_uniform("uBaseWidth", gl.glUniform1f,
+                          float(self.base_width))
+        self._set_uniform("uScaleFactor", gl.glUniform1f,
+                          float(self.scale_factor))
+        self._set_uniform("uViewport", gl.glUniform2f,
+                          float(max(w, 1)), float(max(h, 1)))
+        self._set_uniform("uEye", gl.glUniform3f,
+                          float(eye[0]), float(eye[1]), float(eye[2]))
+        self._set_uniform("uDepthMin", gl.glUniform1f,
+                          float(depth_lut.min_value))
+        self._set_uniform("uDepthMax", gl.glUniform1f,
+                          float(depth_lut.max_value))
+
+        gl.glActiveTexture(gl.GL_TEXTURE0)
+        gl.glBindTexture(gl.GL_TEXTURE_1D, self.colormap_texture)
+        self._set_uniform("uColormap", gl.glUniform1i, 0)
+
+        selected_ids = []
+        hovered_ids = []
+        color_groups = {}
+        for sid, stroke in stroke_buffer.strokes.items():
+            if stroke.is_selected:
+                selected_ids.append(sid)
+            elif stroke.is_hovered:
+                hovered_ids.append(sid)
+            if not use_depth_color:
+                color_groups.setdefault(tuple(stroke.color), []).append(sid)
+
+        if use_depth_color:
+            self._set_uniform("uUseDepthColor", gl.glUniform1i, 1)
+            stroke_buffer.draw_attributes()
+        else:
+            self._set_uniform("uUseDepthColor", gl.glUniform1i, 0)
+            for color, ids in color_groups.items():
+                self._set_uniform("uColor", gl.glUniform3f, *color)
+                stroke_buffer.draw_attributes(stroke_ids=ids)
+
+        if selected_ids or hovered_ids:
+            gl.glDepthFunc(gl.GL_LEQUAL)
+            self._set_uniform("uUseDepthColor", gl.glUniform1i, 0)
+            if hovered_ids:
+                self._set_uniform("uColor", gl.glUniform3f,
+                                  0.0, 1.0, 0.0)  # 悬停：绿色
+                stroke_buffer.draw_attributes(stroke_ids=hovered_ids)
+            if selected_ids:
+                self._set_uniform("uColor", gl.glUniform3f,
+                                  1.0, 1.0, 0.0)  # 选中：黄色
+                stroke_buffer.draw_attributes(stroke_ids=selected_ids)
+            gl.glDepthFunc(gl.GL_LESS)
+
+        gl.glBindTexture(gl.GL_TEXTURE_1D, 0)
+        if self.vao is not None:
+            gl.glBindVertexArray(0)
+        gl.glUseProgram(0)
+
+    def release(self):
+        if self.vao is not None:
+            gl.glDeleteVertexArrays(1, [self.vao])
+            self.vao = None
+        if self.colormap_texture is not None:
+            gl.glDeleteTextures([self.colormap_texture])
+            self.colormap_texture = None
+        self._colormap_table = None
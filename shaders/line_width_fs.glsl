@@ -2,14 +2,26 @@
 
 in GS_OUT {
     float param;   // GS中插值输出的 param
+    float depth;   // 到视点的距离，用于深度着色
 } fs_in;
 
 uniform vec3 uColor;  // 每条笔画的整体颜色 (示例：由 Python 动态传入)
 
+// 深度着色：colormap 查找表以 1D 纹理形式上传
+uniform bool uUseDepthColor;
+uniform sampler1D uColormap;
+uniform float uDepthMin;
+uniform float uDepthMax;
+
 out vec4 fragColor;
 
 void main()
 {
-    // 简单使用 uniform 颜色，也可以结合 param 做颜色渐变
-    fragColor = vec4(uColor, 1.0);
+    if (uUseDepthColor) {
+        float t = clamp((fs_in.depth - uDepthMin) / (uDepthMax - uDepthMin), 0.0, 1.0);
+        fragColor = vec4(texture(uColormap, t).rgb, 1.0);
+    } else {
+        // 简单使用 uniform 颜色，也可以结合 param 做颜色渐变
+        fragColor = vec4(uColor, 1.0);
+    }
 }
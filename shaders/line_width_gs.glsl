@@ -11,11 +11,14 @@ in VS_OUT {
 // 传给片元着色器
 out GS_OUT {
     float param;
+    float depth;
 } gs_out;
 
 uniform mat4 uMVP;
-uniform float uBaseWidth;    // 基础线宽
+uniform float uBaseWidth;    // 基础线宽 (像素，半宽)
 uniform float uScaleFactor;  // 线宽缩放系数
+uniform vec2 uViewport;      // 视口大小 (像素)，用于把像素线宽换算到 NDC
+uniform vec3 uEye;           // 视点位置，用于深度着色
 
 void main()
 {
@@ -24,18 +27,24 @@ void main()
     vec3 p1 = gs_in[1].worldPos;
     float param0 = gs_in[0].param;
     float param1 = gs_in[1].param;
+    float depth0 = distance(p0, uEye);
+    float depth1 = distance(p1, uEye);
 
     // 2) 分别计算两端点在 Clip Space 下的坐标
     vec4 clip0 = uMVP * vec4(p0, 1.0);
     vec4 clip1 = uMVP * vec4(p1, 1.0);
 
-    // 3) 在 NDC 中求线段方向
+    // 3) 在屏幕(像素)空间中求线段方向，避免宽高比导致线宽不一致
     vec2 ndcPos0 = clip0.xy / clip0.w;
     vec2 ndcPos1 = clip1.xy / clip1.w;
-    vec2 dir = normalize(ndcPos1 - ndcPos0);
+    vec2 screenDelta = (ndcPos1 - ndcPos0) * uViewport;
+    if (dot(screenDelta, screenDelta) < 1e-12) {
+        screenDelta = vec2(1.0, 0.0);
+    }
+    vec2 dir = normalize(screenDelta);
 
-    // 与方向垂直的向量
-    vec2 perp = vec2(-dir.y, dir.x);
+    // 与方向垂直的向量 (像素 -> NDC)
+    vec2 perp = vec2(-dir.y, dir.x) * 2.0 / uViewport;
 
     // 4) 计算两端的线宽 (示例：width = baseWidth + param * scaleFactor)
     float w0 = uBaseWidth + param0 * uScaleFactor;
@@ -52,6 +61,7 @@ void main()
         outClip.xy += offset0;
         gl_Position = outClip;
         gs_out.param = param0;
+        gs_out.depth = depth0;
         EmitVertex();
     }
     // --- p0 right ---
@@ -60,6 +70,7 @@ void main()
         outClip.xy -= offset0;
         gl_Position = outClip;
         gs_out.param = param0;
+        gs_out.depth = depth0;
         EmitVertex();
     }
     // --- p1 left ---
@@ -68,6 +79,7 @@ void main()
         outClip.xy += offset1;
         gl_Position = outClip;
         gs_out.param = param1;
+        gs_out.depth = depth1;
         EmitVertex();
     }
     // --- p1 right ---
@@ -76,6 +88,7 @@ void main()
         outClip.xy -= offset1;
         gl_Position = outClip;
         gs_out.param = param1;
+        gs_out.depth = depth1;
         EmitVertex();
     }
 
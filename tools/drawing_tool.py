@@ -6,14 +6,19 @@ import uuid
 
 from logic.stroke_processor import \
     StrokeProcessor
+from logic.stroke_commit_worker import \
+    StrokeCommitWorker
 from .base_tool import BaseTool
-from data.stroke_2d import Stroke2D
+from ui.repaint_scheduler import REPAINT_SCENE, REPAINT_CAMERA, \
+    REPAINT_LIVE_STROKE
+from data.stroke_2d import PointBuffer2D, Stroke2D
 from logic.stroke_2d_to_3d import convert_2d_stroke_to_3d
 
 class DrawingTool(BaseTool):
     """
     Drawing tool with stroke preprocessing and feature toggles.
     在用户释放鼠标时，对当前笔划进行预处理（防抖、辅助线对齐）然后再进行2D->3D转换。
+    预处理与转换在 StrokeCommitWorker 的后台线程中进行，落地前笔画以 2D 占位显示。
     """
 
     def __init__(self, stroke_manager_2d, stroke_manager_3d, stroke_processor,feature_toggle_manager):
@@ -27,12 +32,19 @@ class DrawingTool(BaseTool):
 
         self.is_drawing = False
         self.is_viewing = False
-        self.current_points_2d = []
+        # 原始输入点 (float32 缓冲，逐点追加)
+        self.current_points_2d = PointBuffer2D()
         self.current_stroke_id = None
         self.temp_stroke_2d = None
+        # 实时预览的增量处理状态
+        self.preview_session = None
 
         self.last_mouse_pos = None
 
+        # 笔画提交队列 (后台线程)，结果按提交顺序回到 GUI 线程
+        self.commit_worker = StrokeCommitWorker(stroke_processor)
+        self.commit_worker.stroke_committed.connect(
+            self.on_stroke_committed)
 
     def new_stroke_id(self):
         self.global_stroke_id = self.global_stroke_id + 1
@@ -40,31 +52,34 @@ class DrawingTool(BaseTool):
     def mouse_press(self, event, canvas_widget):
         if event.button() == Qt.LeftButton:
             self.is_drawing = True
-            self.current_points_2d = [(event.x(), event.y())]
+            self.current_points_2d = PointBuffer2D()
+            self.current_points_2d.append(event.x(), event.y())
             self.current_stroke_id = self.new_stroke_id()
             self.temp_stroke_2d = Stroke2D(
                 stroke_id=self.current_stroke_id,
-                points_2d=self.current_points_2d
+                points_2d=self.current_points_2d.view()
             )
             # 记录当下的camera信息
             self.temp_stroke_2d.camera_rot = tuple(canvas_widget.camera_rot)
             self.temp_stroke_2d.camera_dist = canvas_widget.camera_distance
+            self.preview_session = self.stroke_processor.begin_2d_preview(
+                self.current_stroke_id)
         elif event.button() == Qt.RightButton or event.button() == Qt.MidButton:
             self.is_viewing = True
             self.last_mouse_pos = event.pos()
 
     def mouse_move(self, event, canvas_widget):
         if self.is_drawing:
-            self.current_points_2d.append((event.x(), event.y()))
-            self.temp_stroke_2d.points_2d = self.current_points_2d
+            self.current_points_2d.append(event.x(), event.y())
 
-            processed_temp_stroke_2d = self.stroke_processor.process_2d_stroke(self.temp_stroke_2d,canvas_widget)
-            # 实时转换可省去预处理（实时显示原始轨迹），预处理只在最终确定时进行
-            # 这里用原始点直接显示临时3D曲线(非必要)
+            # 预览只增量处理新加入的点；完整的预处理在松开鼠标时进行
+            processed_temp_stroke_2d = self.stroke_processor.update_2d_preview(
+                self.preview_session, self.current_points_2d.view(),
+                canvas_widget)
 
             if processed_temp_stroke_2d:
                 canvas_widget.temp_stroke_2d = processed_temp_stroke_2d
-            canvas_widget.update()
+            canvas_widget.request_repaint(REPAINT_LIVE_STROKE)
         elif self.is_viewing:
             dx = event.x() - self.last_mouse_pos.x()
             dy = event.y() - self.last_mouse_pos.y()
@@ -75,40 +90,76 @@ class DrawingTool(BaseTool):
                     0] += dx * 0.5
                 canvas_widget.camera_rot[
                     1] += dy * 0.5
-                canvas_widget.update()
+                canvas_widget.request_repaint(REPAINT_CAMERA)
 
 
             if event.buttons() & Qt.MidButton:
                 self.pan_camera(canvas_widget,dx,dy)
-                canvas_widget.update()
+                canvas_widget.request_repaint(REPAINT_CAMERA)
 
             self.last_mouse_pos = event.pos()
 
     def mouse_release(self, event, canvas_widget):
         if event.button() == Qt.LeftButton and self.is_drawing:
             self.is_drawing = False
-            # 在最终提交前，对2D点列进行预处理
-            processed_temp_stroke_2d = self.stroke_processor.process_2d_stroke(self.temp_stroke_2d,canvas_widget)
-            processed_final_stroke_3d = self.stroke_processor.process_2dto3d_stroke(processed_temp_stroke_2d,canvas_widget)
-            # 转换为3D笔画
-            self.stroke_manager_2d.add_stroke(self.temp_stroke_2d)
-            if self.feature_toggle_manager.is_enabled("adv_sbm"):
-                canvas_widget.viewable2d_stroke.append(processed_temp_stroke_2d)
-            else:
-                if processed_final_stroke_3d:
-                    processed_final_stroke_3d.color = (
-                    1.0, 1.0, 1.0)
-                    self.stroke_manager_3d.add_stroke(
-                        processed_final_stroke_3d)
-                canvas_widget.viewable2d_stroke = []
+            # 在最终提交前，对2D点列进行预处理并转换为3D (后台线程)
+            # 占位笔画持有原始点的拷贝，后台线程的 modifier 可以随意修改 temp_stroke_2d
+            points = self.current_points_2d.view()
+            self.temp_stroke_2d.points_2d = points
+            placeholder = Stroke2D(stroke_id=self.temp_stroke_2d.stroke_id,
+                                   points_2d=points.copy())
+            canvas_widget.pending_strokes_2d.append(placeholder)
+            self.commit_worker.submit(
+                self.temp_stroke_2d, canvas_widget,
+                lift_to_3d=not self.feature_toggle_manager.is_enabled(
+                    "adv_sbm"),
+                user_data=(canvas_widget, placeholder))
 
             self.temp_stroke_2d = None
-            self.current_points_2d = []
+            self.preview_session = None
+            self.current_points_2d = PointBuffer2D()
             canvas_widget.temp_stroke_2d = None
-            canvas_widget.update()
+            canvas_widget.request_repaint(REPAINT_LIVE_STROKE)
         elif (event.button() == Qt.RightButton or event.button() == Qt.MidButton) and self.is_viewing:
           self.is_viewing = False
 
+    def on_stroke_committed(self, job):
+        """
+        GUI 线程: 后台提交完成 (按提交顺序到达)，把结果加入管理器并移除占位笔画。
+        """
+        canvas_widget, placeholder = job.user_data
+        if placeholder in canvas_widget.pending_strokes_2d:
+            canvas_widget.pending_strokes_2d.remove(placeholder)
+
+        if job.error is not None:
+            # Modifier 失败 (已经由 commit_failed 信号报告): 保留用户画的原始 2D 笔画。
+            # 用占位笔画 (提交时的点拷贝)，job.stroke2d 可能已被失败的 Modifier 改了一半
+            with self.stroke_manager_2d.history.transaction("add stroke"):
+                self.stroke_manager_2d.add_stroke(placeholder)
+            canvas_widget.viewable2d_stroke.append(placeholder)
+        else:
+            # 2D 笔画与对应的 3D 笔画是一条撤销记录
+            with self.stroke_manager_2d.history.transaction("add stroke"):
+                self.stroke_manager_2d.add_stroke(job.stroke2d)
+                if not job.lift_to_3d:
+                    canvas_widget.viewable2d_stroke.append(job.processed_2d)
+                else:
+                    if job.stroke3d:
+                        job.stroke3d.color = (
+                        1.0, 1.0, 1.0)
+                        self.stroke_manager_3d.add_stroke(
+                            job.stroke3d)
+                    canvas_widget.viewable2d_stroke = []
+
+        self.commit_worker.mark_landed(job)
+        canvas_widget.request_repaint(REPAINT_SCENE | REPAINT_LIVE_STROKE)
+
+    def shutdown(self):
+        """
+        停止笔画提交线程 (已排队的笔画会先处理完)。
+        """
+        self.commit_worker.shutdown()
+
     def wheelEvent(self, event,
                          canvas_widget):
         delta = event.angleDelta().y()
@@ -124,7 +175,7 @@ class DrawingTool(BaseTool):
             # 向后滚动，增大距离（缩小视图）
             canvas_widget.camera_distance += zoom_speed
         canvas_widget.camera_distance = max(10.0, min(canvas_widget.camera_distance, 40.0))
-        canvas_widget.update()
+        canvas_widget.request_repaint(REPAINT_CAMERA)
 
     def render_tool_icon(self, render, viewport_size):
         pass
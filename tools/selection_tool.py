@@ -6,6 +6,7 @@ import OpenGL.GL as gl
 import numpy as np
 
 from .base_tool import BaseTool
+from ui.repaint_scheduler import REPAINT_SCENE, REPAINT_HOVER, REPAINT_TOOL
 
 class SelectionTool(BaseTool):
     def __init__(self, selection_manager, radius=50):
@@ -24,14 +25,15 @@ class SelectionTool(BaseTool):
             else:
                 # 覆盖式选择
                 self.selection_manager.set_selection(hovered)
-            canvas_widget.update()
+            canvas_widget.request_repaint(REPAINT_SCENE)
         elif event.button() == Qt.RightButton:
             # 获取当前 hovered_strokes
             selected = self.selection_manager.selected_strokes
 
-            for s in selected:
-                canvas_widget.stroke_manager_3d.remove_stroke(s.stroke_id)
-            canvas_widget.update()
+            # 一次批量删除，一条撤销记录
+            canvas_widget.stroke_manager_3d.remove_strokes(
+                [s.stroke_id for s in selected])
+            canvas_widget.request_repaint(REPAINT_SCENE)
         self.mouse_pos = (event.x(),event.y())
 
     def mouse_move(self, event, canvas_widget):
@@ -40,10 +42,16 @@ class SelectionTool(BaseTool):
         # 需要先做3D->2D投影, stroke.screen_coords 应该由 canvas_widget / renderer维护
         strokes_3d = canvas_widget.get_all_strokes_for_selection()
         hovered = self.selection_manager.find_strokes_in_circle(
-            strokes_3d, self.mouse_pos, self.radius
+            strokes_3d, self.mouse_pos, self.radius,
+            index_key=canvas_widget.get_selection_index_key(),
+            changes=canvas_widget.stroke_manager_3d.changes
         )
-        self.selection_manager.set_hovered(hovered)
-        canvas_widget.update()
+        # 悬停集合不变时只需重画选择圈，3D 场景层沿用缓存
+        flags = REPAINT_TOOL
+        if set(hovered) != self.selection_manager.hovered_strokes:
+            self.selection_manager.set_hovered(hovered)
+            flags |= REPAINT_HOVER
+        canvas_widget.request_repaint(flags)
 
     def mouse_release(self, event, canvas_widget):
         pass  # 点击时已经处理完选择逻辑
@@ -10,6 +10,11 @@ from data.stroke_manager_2d import \
     StrokeManager2D
 from data.stroke_manager_3d import \
     StrokeManager3D
+from data.input_trace import \
+    InputTraceRecorder, EVENT_PRESS, EVENT_MOVE, EVENT_RELEASE, \
+    EVENT_WHEEL, EVENT_FLAG_OVERLAY
+from data.stroke_history import \
+    StrokeHistory
 from logic.vanishing_point_manager import \
     VanishingPointManager
 
@@ -17,16 +22,30 @@ from rendering.ground_plane_3d import \
     GroundPlane3D
 from rendering.renderer_3d import \
     Renderer3D
+from rendering.scene_layer_cache import \
+    SceneLayerCache
 from logic.selection_manager import \
     SelectionManager
+from logic.stroke_intersection import \
+    StrokeEndpointTracker
+from logic.frame_profiler import \
+    FrameProfiler
+from logic.interaction_tracer import \
+    InteractionTracer
+from ui.repaint_scheduler import \
+    RepaintScheduler, REPAINT_ALL, REPAINT_3D, REPAINT_CAMERA, \
+    REPAINT_SCENE, REPAINT_OVERLAY, REPAINT_TOOL
 
 # 新增
 from overlay.overlay_manager import \
     OverlayManager
 from overlay.vanishing_point_element import \
     VanishingPointElement
+from overlay.frame_stats_element import \
+    FrameStatsElement
 
 import OpenGL.GL as gl
+import numpy as np
 
 class CanvasWidget(QOpenGLWidget):
     """
@@ -39,16 +58,38 @@ class CanvasWidget(QOpenGLWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
 
-        self.stroke_manager_2d = StrokeManager2D()
-        self.stroke_manager_3d = StrokeManager3D()
+        # 2D/3D 管理器共享一份命令日志，一次操作 (如 2D+3D 笔画对) 是一条撤销记录
+        self.command_log = StrokeHistory()
+        self.stroke_manager_2d = StrokeManager2D(history=self.command_log)
+        self.stroke_manager_3d = StrokeManager3D(history=self.command_log)
         self.axis = None
 
         self.viewable2d_stroke = []
+        # 已提交、正在后台提升为 3D 的 2D 笔画 (落地前作为占位显示)
+        self.pending_strokes_2d = []
 
         self.selection_manager = SelectionManager()
         self.stroke_filemanager = StrokeFileManager(self.stroke_manager_2d,self.stroke_manager_3d)
         parent.stroke_filemanager = self.stroke_filemanager
-        self.renderer = Renderer3D()
+        # 各绘制阶段的耗时统计 (默认关闭，打开 HUD 时启用)
+        self.profiler = FrameProfiler()
+        self.renderer = Renderer3D(profiler=self.profiler)
+        # 3D 场景层的离屏缓存，只有 2D 层变化的帧直接复用
+        self.scene_cache = SceneLayerCache()
+        # 合并重绘请求，每个显示刷新周期最多 paint 一次
+        self.repaint_scheduler = RepaintScheduler(
+            super().update, refresh_rate=self._screen_refresh_rate)
+        # 交互时间线 (默认关闭)，可导出为 Chrome trace
+        self.tracer = InteractionTracer()
+        for manager in (self.stroke_manager_2d, self.stroke_manager_3d):
+            self.tracer.instrument(manager, (
+                "add_stroke", "add_strokes", "remove_stroke",
+                "remove_strokes", "clear", "undo", "redo"))
+        self.tracer.instrument(self.stroke_manager_2d,
+                               ("update_stroke_points",))
+        self.tracer.instrument(self.stroke_manager_3d,
+                               ("update_stroke_coords", "load_block"))
+        self.tracer.instrument(self.renderer, ("render",))
 
         self.setMouseTracking(True)
         self.current_tool = None
@@ -68,12 +109,42 @@ class CanvasWidget(QOpenGLWidget):
         self.vanishing_point_manager = VanishingPointManager()
         self.vanishing_point_manager.set_overlay_manager(
             self.overlay_manager)
+        # 耗时 HUD 用 QPainter 绘制，放在最后
+        self.frame_stats = FrameStatsElement(self.profiler, self)
+        self.overlay_manager.add_element(self.frame_stats)
 
         self.last_mouse_pos = QPoint()
+        # 输入事件记录 (开启时为 InputTraceRecorder)，用于离线回放
+        self.input_recorder = None
+
+        # 已有 3D 笔画端点的快照，按笔画变化事件增量维护
+        self._stroke_endpoints = StrokeEndpointTracker()
 
     def set_tool(self, tool):
         self.current_tool = tool
-        self.update()
+        self.request_repaint(REPAINT_TOOL)
+
+    def request_repaint(self, flags):
+        """
+        报告画布哪些部分变了 (ui.repaint_scheduler 中的 REPAINT_* 标记)，
+        同一刷新周期内的请求合并为一次 paint。
+        """
+        self.repaint_scheduler.mark(flags)
+
+    def update(self, *args):
+        """
+        不带参数时按全部内容都变了处理 (同样经过合并)。
+        能确定变化范围的调用方应使用 request_repaint。
+        """
+        if args:
+            super().update(*args)
+        else:
+            self.request_repaint(REPAINT_ALL)
+
+    def _screen_refresh_rate(self):
+        window = self.window().windowHandle()
+        screen = window.screen() if window is not None else None
+        return screen.refreshRate() if screen is not None else 0
 
     def get_all_strokes_for_selection(
             self):
@@ -81,23 +152,87 @@ class CanvasWidget(QOpenGLWidget):
 
         return strokes
 
+    def get_selection_index_key(self):
+        """
+        屏幕坐标状态的标识：投影缓存每次全部重新投影 (相机变化) 时 camera_revision 自增。
+        笔画的增删改由选择管理器订阅 stroke_manager_3d.changes 增量处理。
+        """
+        return self.renderer.projection_cache.camera_revision
+
+    def get_camera(self):
+        """
+        当前相机的只读快照 (MVP / 逆 MVP / 视口 / 相机位置)，供投影与反投影辅助函数使用。
+        """
+        return self.renderer.get_camera_snapshot((self.width(),
+                                                  self.height()))
+
+    def get_stroke_endpoints(self):
+        """
+        已有 3D 笔画首尾端点的只读拷贝 (StrokeEndpoints)，可交给后台线程使用。
+        笔画集合不变时复用上一次的结果，变化时只处理变化的笔画。
+        """
+        return self._stroke_endpoints.get(self.stroke_manager_3d)
+
     def initializeGL(self):
         self.renderer.initialize()
 
     def resizeGL(self, w, h):
         self.renderer.resize(w, h)
+        self.scene_cache.invalidate()
+        self.repaint_scheduler.dirty |= REPAINT_CAMERA
+
+    def set_frame_stats_visible(self, visible):
+        """
+        显示/隐藏耗时 HUD，同时开启/关闭计时。
+        """
+        self.profiler.set_enabled(visible)
+        self.frame_stats.set_visible(visible)
+        if not visible:
+            self.profiler.reset()
+        self.request_repaint(REPAINT_OVERLAY)
 
     def paintGL(self):
-        self.render3d_strokes()
-        self.render2d_strokes()
-
-        # Render overlay elements on top
-        self.overlay_manager.render((
-                                    self.width(),
-                                    self.height()))
-
-        if self.axis is not None:
-            self.axis.update()
+        dirty = self.repaint_scheduler.begin_frame()
+        profiler = self.profiler
+        with profiler.stage("frame"):
+            with profiler.stage("paint.render3d"):
+                self.paint_scene_layer(dirty)
+            with profiler.stage("paint.render2d"):
+                self.render2d_strokes()
+                if self.current_tool is not None:
+                    self.current_tool.render_tool_icon(
+                        self.renderer, (self.width(), self.height()))
+
+            # Render overlay elements on top
+            with profiler.stage("paint.overlay"):
+                self.overlay_manager.render((
+                                            self.width(),
+                                            self.height()))
+
+            with profiler.stage("paint.axis"):
+                if self.axis is not None and dirty & REPAINT_CAMERA:
+                    self.axis.update()
+
+    def paint_scene_layer(self, dirty):
+        """
+        画 3D 场景层: 场景/悬停/相机变化 (或缓存失效) 时渲染到离屏缓存，
+        然后把缓存 (颜色 + 深度) 拷贝到画布；缓存不可用时直接渲染。
+        """
+        cache = self.scene_cache
+        ratio = self.devicePixelRatioF()
+        if not cache.ensure(int(self.width() * ratio),
+                            int(self.height() * ratio)):
+            self.render3d_strokes()
+            return
+        target = self.defaultFramebufferObject()
+        if dirty & REPAINT_3D or not cache.valid:
+            cache.begin()
+            self.render3d_strokes()
+            cache.end(target)
+        if not cache.blit(target):
+            self.render3d_strokes()
+            return
+        gl.glViewport(0, 0, self.width(), self.height())
 
     def render2d_strokes(self):
         # 这里可以用一个 2D Renderer, 或者简单地在正交投影下画 line strips:
@@ -115,14 +250,10 @@ class CanvasWidget(QOpenGLWidget):
         gl.glLoadIdentity()
 
         for s2d in strokes_2d:
-            pts = s2d.points_2d
-            if len(pts) < 2:
-                continue
-            gl.glColor3f(1.0, 1.0, 1.0)
-            gl.glBegin(gl.GL_LINE_STRIP)
-            for (x, y) in pts:
-                gl.glVertex2f(x, y)
-            gl.glEnd()
+            self._draw_stroke_2d(s2d, (1.0, 1.0, 1.0))
+        # 占位笔画用暗色显示，等待后台提升完成
+        for s2d in self.pending_strokes_2d:
+            self._draw_stroke_2d(s2d, (0.5, 0.5, 0.5))
 
         gl.glPopMatrix()
         gl.glMatrixMode(
@@ -130,6 +261,17 @@ class CanvasWidget(QOpenGLWidget):
         gl.glPopMatrix()
         gl.glMatrixMode(gl.GL_MODELVIEW)
 
+    def _draw_stroke_2d(self, s2d, color):
+        pts = s2d.points_2d
+        if len(pts) < 2:
+            return
+        # points_2d 本身就是 (N,2) float32，直接作为顶点数组一次绘制
+        gl.glColor3f(*color)
+        gl.glEnableClientState(gl.GL_VERTEX_ARRAY)
+        gl.glVertexPointer(2, gl.GL_FLOAT, 0, np.ascontiguousarray(pts))
+        gl.glDrawArrays(gl.GL_LINE_STRIP, 0, len(pts))
+        gl.glDisableClientState(gl.GL_VERTEX_ARRAY)
+
     def render3d_strokes(self):
         strokes_3d = list(
             self.stroke_manager_3d.get_all_strokes())
@@ -140,13 +282,45 @@ class CanvasWidget(QOpenGLWidget):
             viewport_size=(self.width(),
                            self.height()),
             lookat=self.look_at,
-            activated_tool=self.current_tool
+            stroke_manager_3d=self.stroke_manager_3d
         )
     # Event handling
+    def start_input_recording(self, meta=None):
+        """
+        开始记录鼠标/滚轮事件 (带时间戳与相机状态)。
+        :param meta: 写入文件头的附加信息 (如特性开关状态)
+        """
+        self.input_recorder = InputTraceRecorder(meta)
+
+    def stop_input_recording(self):
+        """
+        停止记录，返回 InputTraceRecorder (调用 save(path) 写出)，未在记录时返回 None。
+        """
+        recorder, self.input_recorder = self.input_recorder, None
+        return recorder
+
+    def _record_input(self, kind, event, delta=0, overlay=False):
+        """
+        :param overlay: 事件已被 overlay 处理 (不会交给工具)
+        """
+        pos = event.pos()
+        button = int(event.button()) if kind != EVENT_WHEEL else 0
+        if overlay:
+            kind |= EVENT_FLAG_OVERLAY
+        self.input_recorder.record(
+            kind, pos.x(), pos.y(), self.current_tool, self.camera_rot,
+            self.camera_distance, self.look_at,
+            (self.width(), self.height()), button=button,
+            buttons=int(event.buttons()), modifiers=int(event.modifiers()),
+            delta=delta)
+
     def mousePressEvent(self, event):
         # First let overlay try to handle
-        if self.overlay_manager.mouse_press_event(
-                event,self):
+        consumed = self.overlay_manager.mouse_press_event(
+            event,self)
+        if self.input_recorder is not None:
+            self._record_input(EVENT_PRESS, event, overlay=consumed)
+        if consumed:
             return
         # If not handled by overlay, pass to tool
         if self.current_tool:
@@ -159,6 +333,9 @@ class CanvasWidget(QOpenGLWidget):
     def mouseMoveEvent(self, event):
         consumed = self.overlay_manager.mouse_move_event(
             event, self.last_mouse_pos,self)
+        # overlay 不改相机，此时记录的仍是事件到达时的相机状态
+        if self.input_recorder is not None:
+            self._record_input(EVENT_MOVE, event, overlay=consumed)
         if not consumed:
             if self.current_tool:
                 self.current_tool.mouse_move(
@@ -169,6 +346,8 @@ class CanvasWidget(QOpenGLWidget):
         self.last_mouse_pos = event.pos()
 
     def mouseReleaseEvent(self, event):
+        if self.input_recorder is not None:
+            self._record_input(EVENT_RELEASE, event)
         self.overlay_manager.mouse_release_event(
             event,self)
         if self.current_tool:
@@ -179,6 +358,9 @@ class CanvasWidget(QOpenGLWidget):
                 event)
 
     def wheelEvent(self, event):
+        if self.input_recorder is not None:
+            self._record_input(EVENT_WHEEL, event,
+                               delta=event.angleDelta().y())
         if self.current_tool:
             self.current_tool.wheelEvent(
                 event, self)
@@ -187,12 +369,16 @@ class CanvasWidget(QOpenGLWidget):
                 event)
         pass
     def undo_stroke(self):
-        self.stroke_manager_3d.undo()
-        self.stroke_manager_2d.undo()
-        self.update()
+        self.command_log.undo()
+        self.request_repaint(REPAINT_SCENE)
+
+    def get_history_memory_bytes(self):
+        """
+        撤销/重做历史 (2D + 3D 共用) 当前占用的估算内存。
+        """
+        return self.command_log.memory_bytes
 
     def redo_stroke(self):
-        self.stroke_manager_3d.redo()
-        self.stroke_manager_2d.redo()
-        self.update()
+        self.command_log.redo()
+        self.request_repaint(REPAINT_SCENE)
 
@@ -4,16 +4,18 @@ from PyQt5.QtWidgets import QMainWindow, \
     QToolBar, QAction, QSpinBox, \
     QVBoxLayout, QWidget, QFileDialog, \
     QMenu, QMenuBar, QHBoxLayout, \
-    QButtonGroup, QRadioButton,QProgressBar
+    QButtonGroup, QRadioButton,QProgressBar, \
+    QProgressDialog, QApplication
+from PyQt5.QtCore import Qt, pyqtSignal
 
 from data.file_manager import \
     StrokeFileManager
-from logic.Modifier.axis_2dto3d_modifier import \
-    Axis2Dto3DModifier
-from logic.Modifier.free_hand_line import \
-    FreeHandModifier
-from logic.Modifier.smoothing_2d_modifier import \
-    Smoothing2DModifier
+from data.sketch_journal import \
+    SketchJournal, has_recovery
+from data.sketch_binary import \
+    is_sketch_binary
+from data.stroke_stream_loader import \
+    LoadCancelled
 from .AxisIndicatorWidget import \
     AxisIndicatorWidget
 
@@ -25,9 +27,10 @@ from tools.selection_tool import SelectionTool
 from tools.view_tool import ViewTool
 from logic.selection_manager import SelectionManager
 
+import traceback
 import numpy as np
 from logic.feature_toggle_manager import FeatureToggleManager
-from logic.stroke_processor import StrokeProcessor
+from logic.stroke_processor import create_default_stroke_processor
 
 class MainWindow(QMainWindow):
     """
@@ -36,6 +39,9 @@ class MainWindow(QMainWindow):
     在主窗口中增加特性开关，对DrawingTool传入StrokePreprocessor以实现可选预处理。
     """
 
+    # 自动保存日志写盘失败 (由日志的后台线程发出，排队到 GUI 线程)
+    autosave_failed = pyqtSignal(str)
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle("3D Drawing App with Overlay & Preprocessing")
@@ -43,6 +49,11 @@ class MainWindow(QMainWindow):
 
         self.stroke_filemanager = None
         self.canvas_widget = CanvasWidget(self)
+        # 已保存/加载的草图旁边的自动保存日志
+        self.sketch_journal = SketchJournal(
+            self.stroke_filemanager,
+            on_error=lambda e: self.autosave_failed.emit(str(e)))
+        self.autosave_failed.connect(self.on_autosave_failed)
         central_widget = QWidget()
         layout = QVBoxLayout()
         layout.addWidget(self.canvas_widget)
@@ -104,28 +115,10 @@ class MainWindow(QMainWindow):
         self.feature_toggle_manager = FeatureToggleManager()
 
         # Stroke Preprocessor
-        self.stroke_processor = StrokeProcessor(self.feature_toggle_manager)
-
-        m_smooth2d = Smoothing2DModifier()
-        m_axis_2d_to_3d = Axis2Dto3DModifier()
-        free_hand_line =  FreeHandModifier()
-
-        self.stroke_processor.register_modifier(m_smooth2d)
-        self.stroke_processor.register_modifier(m_axis_2d_to_3d)
-        self.stroke_processor.register_modifier(free_hand_line)
-
-        self.stroke_processor.pipelineList_2d = [
-            "smooth_2d",
-            "axis_2d_to_3d",
-            "free_hand_line"
-        ]
-        self.stroke_processor.pipelineList_2d_to_3d =[
-            "axis_2d_to_3d",
-            "free_hand_line"
-        ]
-
-
-
+        self.stroke_processor = create_default_stroke_processor(
+            self.feature_toggle_manager,
+            profiler=self.canvas_widget.profiler,
+            tracer=self.canvas_widget.tracer)
 
         # Tools
         self.toolbar = self.addToolBar("Tools")
@@ -143,6 +136,10 @@ class MainWindow(QMainWindow):
             self.stroke_processor,
             self.feature_toggle_manager
         )
+        self.canvas_widget.tracer.instrument(
+            self.draw_tool, ("mouse_press", "mouse_move", "mouse_release"))
+        self.draw_tool.commit_worker.commit_failed.connect(
+            self.on_stroke_commit_failed)
 
         self.select_action = QAction("Selection Tool", self, checkable=True)
         self.toolbar.addAction(self.select_action)
@@ -218,10 +215,65 @@ class MainWindow(QMainWindow):
         self.toolbar2.addAction(
             self.assist_action)
 
+        self.frame_stats_action = QAction("Show Frame Stats", self,
+                                          checkable=True)
+        self.frame_stats_action.setChecked(False)
+        self.frame_stats_action.triggered.connect(
+            self.canvas_widget.set_frame_stats_visible)
+        self.toolbar2.addAction(
+            self.frame_stats_action)
+
+        self.trace_action = QAction("Record Trace", self, checkable=True)
+        self.trace_action.setChecked(False)
+        self.trace_action.triggered.connect(self.on_trace_toggled)
+        self.toolbar2.addAction(
+            self.trace_action)
+
+        self.input_record_action = QAction("Record Input", self,
+                                           checkable=True)
+        self.input_record_action.setChecked(False)
+        self.input_record_action.triggered.connect(
+            self.on_input_record_toggled)
+        self.toolbar2.addAction(
+            self.input_record_action)
+
 
         self.worker = None  # 用于保存线程对象
 
 
+    def on_trace_toggled(self, checked):
+        """
+        开始记录交互时间线；停止时询问保存位置，导出为 Chrome trace JSON。
+        """
+        tracer = self.canvas_widget.tracer
+        tracer.set_enabled(checked)
+        if checked:
+            return
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "Save Trace", "", "Chrome Trace (*.json)")
+        if file_path:
+            count = tracer.dump_chrome_trace(file_path)
+            print("trace saved:", file_path, count, "spans")
+
+    def on_input_record_toggled(self, checked):
+        """
+        开始记录画布输入事件；停止时询问保存位置 (.skinput)，
+        之后可用 python -m benchmarks.replay_input 离线回放。
+        """
+        if checked:
+            self.canvas_widget.start_input_recording(meta={
+                "features": dict(self.feature_toggle_manager.features)})
+            return
+        recorder = self.canvas_widget.stop_input_recording()
+        if recorder is None or len(recorder) == 0:
+            return
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "Save Input Recording", "", "Input Recording (*.skinput)")
+        if file_path:
+            recorder.save(file_path)
+            print("input recording saved:", file_path, len(recorder),
+                  "events")
+
     def on_tool_changed(self):
         sender = self.sender()
         self.draw_action.setChecked(False)
@@ -240,19 +292,94 @@ class MainWindow(QMainWindow):
         self.select_tool.set_radius(val)
 
     def on_save_strokes(self):
-        filepath, _ = QFileDialog.getSaveFileName(self, "Save Strokes", "", "JSON Files (*.json)")
+        filepath, _ = QFileDialog.getSaveFileName(
+            self, "Save Strokes", "", "Sketch Files (*.skb);;JSON Files (*.json)")
         if filepath:
-            self.canvas_widget.stroke_manager_2d.undo_stack.clear() # 清空以免未同步
-            self.canvas_widget.stroke_manager_3d.undo_stack.clear()
-            self.stroke_filemanager.save_strokes(filepath)
-            pass
+            # 新文件落盘之后才丢弃自动保存数据；保存失败时日志继续记录
+            try:
+                self.stroke_filemanager.save_strokes(filepath)
+            except (OSError, ValueError) as e:
+                print("failed to save", filepath, e)
+                return
+            self.sketch_journal.discard()
+            self.sketch_journal.attach(filepath)
+
+    def on_autosave_failed(self, message):
+        self.statusBar().showMessage(
+            "Autosave failed: " + message + " - save the sketch manually")
+
+    def on_stroke_commit_failed(self, job):
+        traceback.print_exception(
+            type(job.error), job.error, job.error.__traceback__)
+        self.statusBar().showMessage(
+            "Stroke processing failed: " + repr(job.error)
+            + " - kept the raw 2D stroke")
 
     def on_load_strokes(self):
-        filepath, _ = QFileDialog.getOpenFileName(self, "Load Strokes", "", "JSON Files (*.json)")
+        filepath, _ = QFileDialog.getOpenFileName(
+            self, "Load Strokes", "", "Sketch Files (*.skb *.json);;All Files (*)")
         if filepath:
-            self.stroke_filemanager.load_strokes(filepath)
-            self.canvas_widget.update()
-            pass
+            # 加载会整体替换笔画，先停止为当前草图记录日志
+            previous = self.sketch_journal.sketch_path
+            self.sketch_journal.detach()
+            if self.load_sketch(filepath):
+                self.canvas_widget.update()
+            elif previous is not None:
+                # 加载失败，原有内容不变: 继续为原草图记录 (保留已有日志)
+                self.sketch_journal.attach(previous, reset=False)
+
+    def load_sketch(self, filepath):
+        """
+        加载草图 (有未合并的自动保存数据时先恢复)，成功后为它记录日志。
+        文件损坏、版本过新或读取失败时保留原有内容并返回 False。
+        """
+        try:
+            if has_recovery(filepath):
+                # 上次未正常保存: 快照 + 日志重放，并立即压缩成新快照
+                # 旧快照与日志要等新快照落盘后才清空
+                self.sketch_journal.recover(filepath)
+                self.sketch_journal.attach(filepath, reset=False)
+                self.sketch_journal.compact()
+                return True
+            if is_sketch_binary(filepath):
+                self.stroke_filemanager.load_strokes(filepath)
+                self.sketch_journal.attach(filepath)
+                return True
+        except (ValueError, KeyError, OSError) as e:
+            print("failed to load", filepath, e)
+            return False
+        if self.load_strokes_with_progress(filepath):
+            self.sketch_journal.attach(filepath)
+            return True
+        return False
+
+    def load_strokes_with_progress(self, filepath):
+        """
+        流式加载JSON文件，显示进度并允许取消。取消或失败时保留原有内容。
+        """
+        dialog = QProgressDialog("Loading strokes...", "Cancel", 0, 100, self)
+        dialog.setWindowModality(Qt.WindowModal)
+        dialog.setMinimumDuration(300)
+
+        def on_progress(fraction):
+            dialog.setValue(int(fraction * 100))
+            QApplication.processEvents()
+
+        try:
+            self.stroke_filemanager.load_strokes_streaming(
+                filepath,
+                progress_callback=on_progress,
+                is_cancelled=dialog.wasCanceled)
+        except LoadCancelled:
+            print("loading cancelled:", filepath)
+            return False
+        except (ValueError, KeyError, TypeError) as e:
+            # TypeError: 结构不对的条目 (如笔画写成了数组而不是对象)
+            print("failed to load", filepath, e)
+            return False
+        finally:
+            dialog.close()
+        return True
 
     def toggle_debounce(self, checked):
         self.feature_toggle_manager.set_feature("debounce", checked)
@@ -393,4 +520,6 @@ class MainWindow(QMainWindow):
     def closeEvent(self, event):
         # 保存当前设置
         self.canvas_widget.vanishing_point_manager.save_config()
+        self.draw_tool.shutdown()
+        self.sketch_journal.detach()
         super().closeEvent(event)
\ No newline at end of file
@@ -0,0 +1,80 @@
+# coding=utf-8
+# ui/repaint_scheduler.py
+
+import time
+
+from PyQt5.QtCore import QTimer
+
+# 画布各部分的脏标记
+REPAINT_SCENE = 1 << 0        # 笔画集合 / 选中状态
+REPAINT_HOVER = 1 << 1        # 悬停高亮的笔画集合
+REPAINT_CAMERA = 1 << 2       # 视角 / 视口
+REPAINT_OVERLAY = 1 << 3      # overlay 元素 (消失点、HUD 等)
+REPAINT_LIVE_STROKE = 1 << 4  # 正在绘制的笔画与待落地的占位笔画 (2D)
+REPAINT_TOOL = 1 << 5         # 工具图标 (如选择圈跟随鼠标)
+REPAINT_ALL = (REPAINT_SCENE | REPAINT_HOVER | REPAINT_CAMERA
+               | REPAINT_OVERLAY | REPAINT_LIVE_STROKE | REPAINT_TOOL)
+
+# 需要重画 3D 场景层的标记；其余只影响叠加在其上的 2D 层
+REPAINT_3D = REPAINT_SCENE | REPAINT_HOVER | REPAINT_CAMERA
+
+DEFAULT_REFRESH_RATE = 60.0
+
+
+class RepaintScheduler:
+    """
+    合并重绘请求: 各子系统用 mark(flags) 报告哪些部分变了，
+    同一显示刷新周期内的多次请求只触发一次 paint，paint 开始时 begin_frame()
+    取走累计的标记，画布据此决定是否重画 3D 场景层。
+
+    request_paint: 真正发起重绘的函数 (QOpenGLWidget.update)
+    refresh_rate: 返回当前屏幕刷新率 (Hz) 的函数，两次 paint 至少间隔一个刷新周期
+    """
+
+    def __init__(self, request_paint, refresh_rate=None):
+        self._request_paint = request_paint
+        self._refresh_rate = refresh_rate
+        # 第一帧画全部内容
+        self.dirty = REPAINT_ALL
+        # 已经调用过 request_paint、paint 尚未开始
+        self._requested = False
+        self._last_frame = None
+        self._timer = QTimer()
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._fire)
+
+    def frame_interval(self):
+        rate = self._refresh_rate() if self._refresh_rate else 0
+        if not rate or rate <= 0:
+            rate = DEFAULT_REFRESH_RATE
+        return 1.0 / rate
+
+    def mark(self, flags):
+        if not flags:
+            return
+        self.dirty |= flags
+        if self._requested or self._timer.isActive():
+            return
+        wait = 0.0
+        if self._last_frame is not None:
+            wait = (self._last_frame + self.frame_interval()
+                    - time.perf_counter())
+        if wait <= 0:
+            self._fire()
+        else:
+            self._timer.start(max(int(wait * 1000.0 + 0.5), 1))
+
+    def _fire(self):
+        self._requested = True
+        self._request_paint()
+
+    def begin_frame(self):
+        """
+        paint 开始时调用: 返回并清空累计的脏标记。
+        (窗口暴露等非 mark 触发的 paint 返回 0)
+        """
+        dirty = self.dirty
+        self.dirty = 0
+        self._requested = False
+        self._last_frame = time.perf_counter()
+        return dirty